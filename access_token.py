@@ -0,0 +1,91 @@
+"""
+유아플랜 설문 매직링크 서명 토큰
+- 형식: v1.<payload>.<signature> (base64url, 패딩 없음)
+  payload = {"r": 1차 접수번호, "u": uuid, "s": 단계, "exp": 만료 epoch초}
+  signature = HMAC-SHA256(ACCESS_TOKEN_SECRET, payload 문자열)
+- GAS(apps/access_token.gs)가 발급, 설문 앱은 로컬에서 서명/만료만 확인 (네트워크 없음)
+- 서명 형식이 아닌 기존 토큰은 호출 측에서 GAS 검증으로 처리
+- 서명 키 미설정/서명 불일치(키 교체·오설정)는 실패 응답에 key_error=True → 호출 측이 GAS 검증으로 대체
+"""
+
+from __future__ import annotations
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Optional
+
+from config_loader import get_config
+
+TOKEN_PREFIX = "v1."
+# 서명 키/기본 만료(분)는 config_loader의 ACCESS_TOKEN_SECRET / ACCESS_TOKEN_TTL_MINUTES
+# (TTL은 apps/_config.gs ACCESS_TOKEN_TTL_MINUTES와 일치)
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload_b64: str, secret: str) -> str:
+    digest = hmac.new(secret.encode("utf-8"), payload_b64.encode("ascii"), hashlib.sha256).digest()
+    return _b64encode(digest)
+
+
+def is_signed_token(token: Optional[str]) -> bool:
+    return bool(token) and token.startswith(TOKEN_PREFIX) and token.count(".") == 2
+
+
+def sign_access_token(receipt_no: str, uuid: str = "", stage: int = 2,
+                      ttl_minutes: Optional[int] = None,
+                      secret: Optional[str] = None, now: Optional[float] = None) -> str:
+    """서명 토큰 발급 (GAS signAccessToken_과 같은 형식)"""
+    cfg = get_config()
+    secret = secret if secret is not None else cfg.ACCESS_TOKEN_SECRET
+    ttl_minutes = ttl_minutes or cfg.ACCESS_TOKEN_TTL_MINUTES
+    if not secret:
+        raise ValueError("ACCESS_TOKEN_SECRET이 설정되지 않았습니다.")
+    issued = int(now if now is not None else time.time())
+    payload = {"r": receipt_no, "u": uuid, "s": stage, "exp": issued + ttl_minutes * 60}
+    payload_b64 = _b64encode(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    return f"{TOKEN_PREFIX}{payload_b64}.{_sign(payload_b64, secret)}"
+
+
+def verify_access_token(token: str, secret: Optional[str] = None,
+                        now: Optional[float] = None) -> Dict[str, Any]:
+    """서명 토큰 로컬 검증 → GAS validate 응답과 같은 형식
+
+    성공: {"ok": True, "parent_receipt_no": ..., "uuid": ..., "stage": ..., "expires_at": ...}
+    실패: {"ok": False, "message": ...} (서명 키 문제일 수 있으면 "key_error": True)
+    """
+    if secret is None:
+        secret = get_config().ACCESS_TOKEN_SECRET
+    if not secret:
+        return {"ok": False, "message": "서명 키 미설정", "key_error": True}
+    if not is_signed_token(token):
+        return {"ok": False, "message": "토큰 형식 오류"}
+
+    payload_b64, signature = token[len(TOKEN_PREFIX):].split(".", 1)
+    if not hmac.compare_digest(_sign(payload_b64, secret), signature):
+        return {"ok": False, "message": "토큰 서명 불일치", "key_error": True}
+
+    try:
+        payload = json.loads(_b64decode(payload_b64).decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return {"ok": False, "message": "토큰 형식 오류"}
+
+    expires_at = int(payload.get("exp", 0))
+    if expires_at <= (now if now is not None else time.time()):
+        return {"ok": False, "message": "토큰이 만료되었습니다."}
+
+    return {
+        "ok": True,
+        "parent_receipt_no": payload.get("r", ""),
+        "uuid": payload.get("u", ""),
+        "stage": payload.get("s"),
+        "expires_at": expires_at
+    }
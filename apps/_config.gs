@@ -12,6 +12,19 @@ const SHEET_ID_3 = '';
 const EDIT_LOCK_MINUTES = 2;
 const ACCESS_TOKEN_TTL_MINUTES = 30;
 
+// Bulk integrated view (see bulk_integrated_view.gs / integrated_bulk.py)
+const BULK_MAX_RECEIPTS = 200;
+const COMM_LOG_SHEET_NAME = 'comm_logs';
+
+// Delta client list (see client_sync.gs / client_sync.py)
+const CLIENT_SYNC_SHEET_NAME = '_client_versions';
+const CLIENT_SYNC_RECHECK_SECONDS = 60;   // full-table rehash at most once per window
+
+// Shared receipt number blocks (see receipt_seq.gs / receipt_allocator.py)
+const RECEIPT_SEQ_LIMIT = 900000;   // seq >= this is the apps' local fallback range
+const RECEIPT_BLOCK_MAX = 500;
+const RECEIPT_SEQ_KEEP_DAYS = 3;
+
 // Unified API endpoint (if used by GAS)
 const UNIFIED_API_URL = '';
 
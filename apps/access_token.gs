@@ -0,0 +1,65 @@
+/**
+ * Signed, self-validating magic-link tokens (see access_token.py).
+ *
+ * Format: v1.<payload>.<signature>, both base64url without padding.
+ *   payload   = JSON { r: parent receipt_no, u: uuid, s: stage, exp: epoch seconds }
+ *   signature = HMAC-SHA256(ACCESS_TOKEN_SECRET, payload string)
+ *
+ * Survey apps verify these locally, so page loads no longer call the
+ * 'validate' action. Set the script property ACCESS_TOKEN_SECRET to the
+ * same value as the ACCESS_TOKEN_SECRET env var of the survey apps.
+ *
+ * Use in the issue_token action:
+ *   const token = signAccessToken_(receiptNo, uuid, stage, hours ? hours * 60 : ACCESS_TOKEN_TTL_MINUTES);
+ *
+ * Use in the validate action (survey apps fall back to it when their own
+ * secret is unset or does not match, e.g. during a key rotation):
+ *   if (String(body.token).indexOf('v1.') === 0) return verifyAccessToken_(body.token);
+ */
+
+function signAccessToken_(receiptNo, uuid, stage, ttlMinutes) {
+  const secret = PropertiesService.getScriptProperties().getProperty('ACCESS_TOKEN_SECRET');
+  if (!secret) throw new Error('ACCESS_TOKEN_SECRET is not set');
+
+  const ttl = ttlMinutes || ACCESS_TOKEN_TTL_MINUTES;
+  const payload = {
+    r: String(receiptNo || ''),
+    u: String(uuid || ''),
+    s: Number(stage || 2),
+    exp: Math.floor(Date.now() / 1000) + ttl * 60
+  };
+  const payloadB64 = base64UrlNoPad_(Utilities.newBlob(JSON.stringify(payload)).getBytes());
+  const signature = Utilities.computeHmacSha256Signature(
+    Utilities.newBlob(payloadB64).getBytes(),
+    Utilities.newBlob(secret).getBytes()
+  );
+  return 'v1.' + payloadB64 + '.' + base64UrlNoPad_(signature);
+}
+
+/**
+ * Server-side check with the same rules as access_token.verify_access_token.
+ * Returns the same shape as the 'validate' action.
+ */
+function verifyAccessToken_(token) {
+  const secret = PropertiesService.getScriptProperties().getProperty('ACCESS_TOKEN_SECRET');
+  const parts = String(token || '').split('.');
+  if (!secret || parts.length !== 3 || parts[0] !== 'v1') {
+    return { ok: false, message: 'invalid token' };
+  }
+  const expected = base64UrlNoPad_(Utilities.computeHmacSha256Signature(
+    Utilities.newBlob(parts[1]).getBytes(),
+    Utilities.newBlob(secret).getBytes()
+  ));
+  if (expected !== parts[2]) return { ok: false, message: 'bad signature' };
+
+  const padded = parts[1] + '==='.slice((parts[1].length + 3) % 4);
+  const payload = JSON.parse(Utilities.newBlob(Utilities.base64DecodeWebSafe(padded)).getDataAsString());
+  if (!payload.exp || payload.exp <= Math.floor(Date.now() / 1000)) {
+    return { ok: false, message: 'expired' };
+  }
+  return { ok: true, parent_receipt_no: payload.r, uuid: payload.u, stage: payload.s, expires_at: payload.exp };
+}
+
+function base64UrlNoPad_(bytes) {
+  return Utilities.base64EncodeWebSafe(bytes).replace(/=+$/, '');
+}
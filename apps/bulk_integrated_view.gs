@@ -0,0 +1,143 @@
+/**
+ * Bulk integrated view handler for the dashboard (integrated_bulk.py).
+ *
+ * Request (POST JSON):
+ *   { action: 'get_integrated_view_bulk', receipt_nos: [...], api_token: '...' }
+ * Response:
+ *   { ok: true, data: { <receipt_no>: <view> }, missing: [...] }
+ *
+ * Each stage sheet is read once per request and indexed by receipt number,
+ * so a batch costs one read per sheet instead of one read per receipt.
+ * The view shape matches the single get_integrated_view action
+ * (receipt_no, progress_pct, stage1, stage2, stage3, comm_logs), and sheet
+ * headers are renamed to the same field names through INTEGRATED_FIELDS_
+ * (the dashboard's client_export.STAGE_FIELDS keys; headers that already are
+ * field names are kept as they are).
+ *
+ * These views are rebuilt from sheet headers, not by the single
+ * get_integrated_view handler, so they are only used for CSV/Parquet export
+ * and summary ZIPs. The dashboard detail card, its view cache and prefetch
+ * always call get_integrated_view per receipt.
+ *
+ * Wire into doPost:
+ *   if (body.action === 'get_integrated_view_bulk') {
+ *     return ContentService.createTextOutput(JSON.stringify(handleIntegratedViewBulk_(body)))
+ *       .setMimeType(ContentService.MimeType.JSON);
+ *   }
+ */
+
+// Sheet header (Korean label) -> get_integrated_view field name, per section.
+const INTEGRATED_FIELDS_ = {
+  common: {
+    '접수번호': 'receipt_no', '부모접수번호': 'parent_receipt_no', '1차접수번호': 'parent_receipt_no',
+    '타임스탬프': 'created_at', '접수일시': 'created_at', '제출일시': 'created_at', '작성일시': 'created_at'
+  },
+  stage1: {
+    '성명': 'name', '대표자 성함': 'name', '이름': 'name', '연락처': 'phone', '이메일': 'email',
+    '성별': 'gender', '생년월일': 'birthdate', '사업자유형': 'business_type', '사업자 형태': 'business_type',
+    '지역': 'region', '사업장 지역': 'region', '관심사항': 'interest', '유입경로': 'referral_source',
+    '개업연월': 'open_date'
+  },
+  stage2: {
+    '성명': 'name', '대표자 성함': 'name', '연락처': 'phone', '상호명': 'company_name',
+    '사업자번호': 'business_number', '사업자등록번호': 'business_number', '개업연월': 'open_date',
+    '직원수': 'employee_count', '직원 수': 'employee_count', '연매출': 'annual_revenue',
+    '업종': 'business_category', '자금용도': 'funding_purpose', '희망금액': 'desired_amount',
+    '정책자금이력': 'past_policy_fund', '추가정보': 'additional_info'
+  },
+  stage3: {
+    '성명': 'name', '연락처': 'phone', '자금시기': 'funding_timeline', '담보유형': 'collateral_type',
+    '신용상태': 'credit_status', '세금상태': 'tax_status', '상담요청': 'consulting_request',
+    '추천자금': 'recommended_fund', '예상한도': 'expected_limit', '의사결정': 'decision_status',
+    '준비도': 'readiness_score'
+  },
+  comm_logs: {
+    '작성자': 'author', '내용': 'content', '작성일': 'created_at', '로그ID': 'local_id'
+  }
+};
+
+function handleIntegratedViewBulk_(body) {
+  const expected = PropertiesService.getScriptProperties().getProperty('API_TOKEN');
+  if (!expected || body.api_token !== expected) {
+    return { ok: false, error: 'unauthorized' };
+  }
+
+  const receiptNos = (body.receipt_nos || []).map(String).filter(String);
+  if (receiptNos.length === 0) {
+    return { ok: true, data: {}, missing: [] };
+  }
+  if (receiptNos.length > BULK_MAX_RECEIPTS) {
+    return { ok: false, error: 'too many receipt_nos (max ' + BULK_MAX_RECEIPTS + ')' };
+  }
+
+  const stage1 = indexSheetByReceipt_(SHEET_ID_1, ['receipt_no'], false, 'stage1');
+  const stage2 = indexSheetByReceipt_(SHEET_ID_2, ['parent_receipt_no', 'receipt_no'], false, 'stage2');
+  const stage3 = indexSheetByReceipt_(SHEET_ID_3, ['receipt_no'], false, 'stage3');
+  const commLogs = indexSheetByReceipt_(SHEET_ID_1, ['receipt_no'], true, 'comm_logs', COMM_LOG_SHEET_NAME);
+
+  const data = {};
+  const missing = [];
+  receiptNos.forEach(function (receiptNo) {
+    const s1 = stage1[receiptNo] || null;
+    const s2 = stage2[receiptNo] || null;
+    const s3 = stage3[receiptNo] || null;
+    if (!s1 && !s2 && !s3) {
+      missing.push(receiptNo);
+      return;
+    }
+    data[receiptNo] = {
+      receipt_no: receiptNo,
+      progress_pct: s3 ? 100 : (s2 ? 66 : 33),
+      stage1: s1,
+      stage2: s2,
+      stage3: s3,
+      comm_logs: commLogs[receiptNo] || []
+    };
+  });
+
+  return { ok: true, data: data, missing: missing };
+}
+
+/**
+ * Reads a sheet once and returns { receipt_no: rowObject } (or a list of rows
+ * per receipt when multi is true). Row objects are keyed by field name
+ * (header renamed through INTEGRATED_FIELDS_[section]); keyFields are field names.
+ * When a receipt appears more than once, the last row wins (latest submission).
+ */
+function indexSheetByReceipt_(sheetId, keyFields, multi, section, sheetName) {
+  const index = {};
+  if (!sheetId) return index;
+
+  const ss = SpreadsheetApp.openById(sheetId);
+  const sheet = sheetName ? ss.getSheetByName(sheetName) : ss.getSheets()[0];
+  if (!sheet) return index;
+
+  const values = sheet.getDataRange().getDisplayValues();
+  if (values.length < 2) return index;
+
+  const names = INTEGRATED_FIELDS_[section] || {};
+  const headers = values[0].map(function (h) {
+    const header = String(h).trim();
+    return names[header] || INTEGRATED_FIELDS_.common[header] || header;
+  });
+  let keyCol = -1;
+  for (let i = 0; i < keyFields.length && keyCol < 0; i++) {
+    keyCol = headers.indexOf(keyFields[i]);
+  }
+  if (keyCol < 0) return index;
+
+  for (let r = 1; r < values.length; r++) {
+    const key = String(values[r][keyCol]).trim();
+    if (!key) continue;
+    const row = {};
+    for (let c = 0; c < headers.length; c++) {
+      if (headers[c]) row[headers[c]] = values[r][c];
+    }
+    if (multi) {
+      (index[key] = index[key] || []).push(row);
+    } else {
+      index[key] = row;
+    }
+  }
+  return index;
+}
@@ -0,0 +1,205 @@
+/**
+ * Delta client list handler for the dashboard (client_sync.py).
+ *
+ * Request (GET params):
+ *   action=get_clients_delta, since=<version>, encoding=gzip|json, api_token=...
+ * Response:
+ *   { ok: true, version: <int>, full: <bool>, encoding: 'gzip+base64',
+ *     payload: base64(gzip(JSON { upserts: [row...], deletes: [receipt_no...] })) }
+ *   (encoding=json → upserts / deletes are returned inline instead of payload)
+ *
+ * Every row of the client list is hashed and compared with the hash kept in
+ * the hidden CLIENT_SYNC_SHEET_NAME sheet of SHEET_ID_1. Changed rows get the
+ * next version number, so a request with `since` only returns rows changed
+ * (or deleted) after that version. since=0, or a since newer than the stored
+ * version (e.g. after the version sheet was reset), returns the full list.
+ * Row shape matches the get_all_clients action (receipt_no, progress_pct, ...).
+ *
+ * Hashing every row (and rewriting the version sheet under the script lock)
+ * runs at most once per CLIENT_SYNC_RECHECK_SECONDS, not on every GET:
+ *   - since == current version within that window → empty delta, no sheet reads
+ *   - other requests within that window → rows with the stored versions, no lock
+ *   - a request after the window rehashes once; requests that waited on the
+ *     lock reuse that result
+ * Writers (survey submissions, comm logs) can call markClientsChanged_() so
+ * the next GET rehashes immediately instead of after the window.
+ *
+ * Wire into doGet:
+ *   if (e.parameter.action === 'get_clients_delta') {
+ *     return ContentService.createTextOutput(JSON.stringify(handleClientsDelta_(e.parameter)))
+ *       .setMimeType(ContentService.MimeType.JSON);
+ *   }
+ */
+
+function handleClientsDelta_(params) {
+  const props = PropertiesService.getScriptProperties();
+  const expected = props.getProperty('API_TOKEN');
+  if (!expected || params.api_token !== expected) {
+    return { ok: false, error: 'unauthorized' };
+  }
+
+  const since = Number(params.since || 0);
+  const windowMs = CLIENT_SYNC_RECHECK_SECONDS * 1000;
+  const checkedAt = Number(props.getProperty('CLIENT_SYNC_CHECKED_AT') || 0);
+  const current = Number(props.getProperty('CLIENT_SYNC_VERSION') || 0);
+  if (since && since === current && Date.now() - checkedAt < windowMs) {
+    return encodeClientsDelta_(params, { ok: true, version: current, full: false }, [], []);
+  }
+
+  const rows = buildClientRows_();
+  let delta;
+  if (Date.now() - checkedAt < windowMs) {
+    delta = readClientVersions_(rows);
+  } else {
+    const lock = LockService.getScriptLock();
+    lock.waitLock(20000);
+    try {
+      // Another request rehashed while this one waited for the lock → reuse it
+      if (Date.now() - Number(props.getProperty('CLIENT_SYNC_CHECKED_AT') || 0) < windowMs) {
+        delta = readClientVersions_(rows);
+      } else {
+        delta = updateClientVersions_(rows);
+        props.setProperties({ CLIENT_SYNC_VERSION: String(delta.version), CLIENT_SYNC_CHECKED_AT: String(Date.now()) });
+      }
+    } finally {
+      lock.releaseLock();
+    }
+  }
+
+  const full = !since || since > delta.version;
+  const upserts = [];
+  const deletes = [];
+  delta.entries.forEach(function (entry) {
+    if (!full && entry.version <= since) return;
+    if (entry.deleted) {
+      if (!full) deletes.push(entry.receiptNo);
+    } else {
+      upserts.push(entry.row);
+    }
+  });
+  return encodeClientsDelta_(params, { ok: true, version: delta.version, full: full }, upserts, deletes);
+}
+
+/**
+ * Forces the next get_clients_delta request to rehash (call after writing client rows).
+ */
+function markClientsChanged_() {
+  PropertiesService.getScriptProperties().setProperty('CLIENT_SYNC_CHECKED_AT', '0');
+}
+
+function encodeClientsDelta_(params, response, upserts, deletes) {
+  if (params.encoding === 'json') {
+    response.upserts = upserts;
+    response.deletes = deletes;
+    return response;
+  }
+  const body = { upserts: upserts, deletes: deletes };
+  const gzipped = Utilities.gzip(Utilities.newBlob(JSON.stringify(body), 'application/json'));
+  response.encoding = 'gzip+base64';
+  response.payload = Utilities.base64Encode(gzipped.getBytes());
+  return response;
+}
+
+/**
+ * Client list rows in sheet order (stage 1 row + progress), one per receipt.
+ */
+function buildClientRows_() {
+  const stage1 = indexSheetByReceipt_(SHEET_ID_1, ['receipt_no'], false, 'stage1');
+  const stage2 = indexSheetByReceipt_(SHEET_ID_2, ['parent_receipt_no', 'receipt_no'], false, 'stage2');
+  const stage3 = indexSheetByReceipt_(SHEET_ID_3, ['receipt_no'], false, 'stage3');
+
+  return Object.keys(stage1).map(function (receiptNo) {
+    const row = Object.assign({}, stage1[receiptNo]);
+    row.receipt_no = receiptNo;
+    row.progress_pct = stage3[receiptNo] ? 100 : (stage2[receiptNo] ? 66 : 33);
+    return row;
+  });
+}
+
+/**
+ * Reads the hidden version sheet → { sheet, stored: { receiptNo: { hash, version, deleted } }, version, rowCount }.
+ */
+function loadClientVersions_() {
+  const ss = SpreadsheetApp.openById(SHEET_ID_1);
+  let sheet = ss.getSheetByName(CLIENT_SYNC_SHEET_NAME);
+  if (!sheet) {
+    sheet = ss.insertSheet(CLIENT_SYNC_SHEET_NAME);
+    sheet.appendRow(['receipt_no', 'hash', 'version', 'deleted']);
+    sheet.hideSheet();
+  }
+
+  const stored = {};
+  let version = 0;
+  const values = sheet.getDataRange().getValues();
+  for (let r = 1; r < values.length; r++) {
+    const v = Number(values[r][2]) || 0;
+    stored[String(values[r][0])] = { hash: String(values[r][1]), version: v, deleted: values[r][3] === true };
+    if (v > version) version = v;
+  }
+  return { sheet: sheet, stored: stored, version: version, rowCount: values.length };
+}
+
+/**
+ * Stored versions without hashing (rows added since the last rehash wait for the next one).
+ * Same return shape as updateClientVersions_.
+ */
+function readClientVersions_(rows) {
+  const state = loadClientVersions_();
+  const entries = [];
+  rows.forEach(function (row) {
+    const prev = state.stored[row.receipt_no];
+    if (prev && !prev.deleted) {
+      entries.push({ receiptNo: row.receipt_no, version: prev.version, deleted: false, row: row, hash: prev.hash });
+    }
+  });
+  Object.keys(state.stored).forEach(function (receiptNo) {
+    const prev = state.stored[receiptNo];
+    if (prev.deleted) {
+      entries.push({ receiptNo: receiptNo, version: prev.version, deleted: true, row: null, hash: prev.hash });
+    }
+  });
+  return { version: state.version, entries: entries };
+}
+
+/**
+ * Compares row hashes with the version sheet and stamps changed rows.
+ * Returns { version, entries: [{ receiptNo, version, deleted, row }] } in sheet order.
+ */
+function updateClientVersions_(rows) {
+  const state = loadClientVersions_();
+  const stored = state.stored;
+  let version = state.version;
+
+  const next = version + 1;
+  let changed = false;
+  const entries = [];
+  const seen = {};
+  rows.forEach(function (row) {
+    const receiptNo = row.receipt_no;
+    const hash = Utilities.base64Encode(
+      Utilities.computeDigest(Utilities.DigestAlgorithm.MD5, JSON.stringify(row), Utilities.Charset.UTF_8));
+    const prev = stored[receiptNo];
+    let rowVersion = prev ? prev.version : next;
+    if (!prev || prev.hash !== hash || prev.deleted) {
+      rowVersion = next;
+      changed = true;
+    }
+    seen[receiptNo] = true;
+    entries.push({ receiptNo: receiptNo, version: rowVersion, deleted: false, row: row, hash: hash });
+  });
+  Object.keys(stored).forEach(function (receiptNo) {
+    if (seen[receiptNo]) return;
+    const prev = stored[receiptNo];
+    const rowVersion = prev.deleted ? prev.version : next;
+    if (!prev.deleted) changed = true;
+    entries.push({ receiptNo: receiptNo, version: rowVersion, deleted: true, row: null, hash: prev.hash });
+  });
+
+  if (changed) {
+    const out = entries.map(function (e) { return [e.receiptNo, e.hash, e.version, e.deleted]; });
+    state.sheet.getRange(2, 1, Math.max(state.rowCount - 1, 1), 4).clearContent();
+    if (out.length) state.sheet.getRange(2, 1, out.length, 4).setValues(out);
+    version = next;
+  }
+  return { version: version, entries: entries };
+}
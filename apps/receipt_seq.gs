@@ -0,0 +1,64 @@
+/**
+ * Shared receipt number blocks for all survey/landing apps (receipt_allocator.py).
+ *
+ * Request (POST JSON):
+ *   { action: 'reserve_receipt_block', day: 'YYMMDD', count: <int>, api_token: ... }
+ * Response:
+ *   { ok: true, start: <int>, end: <int> }   // seq range [start, end) for that day
+ *
+ * The next free seq of each day is kept in script properties
+ * ('receipt_seq_<YYMMDD>') and advanced under a script lock, so every app
+ * instance gets disjoint blocks no matter how often its local disk is wiped.
+ * Blocks stay below RECEIPT_SEQ_LIMIT; the apps use the range above it
+ * (9 + RECEIPT_NODE_ID + 4 digits) only while this action is unreachable,
+ * and only when RECEIPT_NODE_ID is set explicitly per app.
+ * Counters older than RECEIPT_SEQ_KEEP_DAYS are removed when a new day starts.
+ *
+ * Wire into doPost:
+ *   if (body.action === 'reserve_receipt_block') {
+ *     return ContentService.createTextOutput(JSON.stringify(handleReserveReceiptBlock_(body)))
+ *       .setMimeType(ContentService.MimeType.JSON);
+ *   }
+ */
+
+function handleReserveReceiptBlock_(body) {
+  const props = PropertiesService.getScriptProperties();
+  const expected = props.getProperty('API_TOKEN');
+  if (!expected || body.api_token !== expected) {
+    return { ok: false, error: 'unauthorized' };
+  }
+  const day = String(body.day || '');
+  if (!/^\d{6}$/.test(day)) {
+    return { ok: false, error: 'invalid day' };
+  }
+  const count = Math.max(1, Math.min(RECEIPT_BLOCK_MAX, Number(body.count) || 1));
+  const key = 'receipt_seq_' + day;
+
+  const lock = LockService.getScriptLock();
+  lock.waitLock(10000);
+  try {
+    const stored = props.getProperty(key);
+    const start = Number(stored || 1);
+    if (start >= RECEIPT_SEQ_LIMIT) {
+      return { ok: false, error: 'daily limit reached' };
+    }
+    const end = Math.min(start + count, RECEIPT_SEQ_LIMIT);
+    props.setProperty(key, String(end));
+    if (!stored) pruneReceiptSeq_(props, day);
+    return { ok: true, start: start, end: end };
+  } finally {
+    lock.releaseLock();
+  }
+}
+
+function pruneReceiptSeq_(props, today) {
+  const keep = {};
+  const base = new Date(2000 + Number(today.slice(0, 2)), Number(today.slice(2, 4)) - 1, Number(today.slice(4, 6)));
+  for (let i = 0; i < RECEIPT_SEQ_KEEP_DAYS; i++) {
+    const d = new Date(base.getTime() - i * 86400000);
+    keep['receipt_seq_' + Utilities.formatDate(d, Session.getScriptTimeZone(), 'yyMMdd')] = true;
+  }
+  props.getKeys().forEach(function (key) {
+    if (key.indexOf('receipt_seq_') === 0 && !keep[key]) props.deleteProperty(key);
+  });
+}
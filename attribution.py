@@ -0,0 +1,346 @@
+"""
+유아플랜 UTM 귀속 저장소 + 캠페인 퍼널
+- touchpoints: 추가 전용 기록 (랜딩 조회 → 신청 → 2차 → 3차 → 계약), utm_source/utm_campaign/날짜 색인
+- 2차/3차/계약은 접수번호만 알면 됨 → 기록 시 같은 접수번호의 신청(lead) UTM을 복사해 귀속
+- 단계별 접수번호 1건만 기록 (중복 제출/재실행 무시)
+- funnel_daily: (날짜, 소스, 캠페인, 단계)별 건수 사전 집계
+  refresh_funnel()은 마지막 집계 이후 추가된 행만 반영 (시트 재조회/전체 재집계 없음)
+- 저장소: ATTRIBUTION_DB_URL(postgresql://)이면 공용 PostgreSQL → 랜딩/설문/대시보드를 다른 호스트에 배포해도 같은 기록
+  미설정 시 접수번호 발급기와 같은 로컬 상태 파일(SURVEY_STATE_DB_PATH) → 모든 앱이 같은 호스트/디스크일 때만 유효
+  (대시보드 퍼널에 로컬 저장소 경고 표시)
+"""
+
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+
+from config_loader import get_config
+from receipt_allocator import STATE_DB_PATH, is_valid_receipt_no
+
+STAGES = ("view", "lead", "stage2", "stage3", "contract")
+UTM_KEYS = ("utm_source", "utm_campaign", "utm_medium", "utm_content", "utm_term")
+UNKNOWN = "unknown"
+OPEN_RETRY_SECONDS = 60   # 저장소 연결 실패 후 이 시간 동안은 다시 연결하지 않고 같은 오류
+
+DDL = """
+CREATE TABLE IF NOT EXISTS touchpoints (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  ts REAL NOT NULL,
+  day TEXT NOT NULL,                 -- YYYY-MM-DD
+  stage TEXT NOT NULL,               -- view | lead | stage2 | stage3 | contract
+  receipt_no TEXT NOT NULL DEFAULT '',
+  utm_source TEXT NOT NULL,
+  utm_campaign TEXT NOT NULL,
+  utm_medium TEXT NOT NULL DEFAULT '',
+  utm_content TEXT NOT NULL DEFAULT '',
+  utm_term TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_touchpoints_utm ON touchpoints(utm_source, utm_campaign, day);
+CREATE INDEX IF NOT EXISTS idx_touchpoints_day ON touchpoints(day);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_touchpoints_receipt ON touchpoints(receipt_no, stage) WHERE receipt_no != '';
+
+CREATE TABLE IF NOT EXISTS funnel_daily (
+  day TEXT NOT NULL,
+  utm_source TEXT NOT NULL,
+  utm_campaign TEXT NOT NULL,
+  stage TEXT NOT NULL,
+  count INTEGER NOT NULL,
+  PRIMARY KEY (day, utm_source, utm_campaign, stage)
+);
+
+CREATE TABLE IF NOT EXISTS funnel_state (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  last_id INTEGER NOT NULL
+);
+"""
+
+
+POSTGRES_DDL = """
+CREATE TABLE IF NOT EXISTS touchpoints (
+  id BIGSERIAL PRIMARY KEY,
+  ts DOUBLE PRECISION NOT NULL,
+  day TEXT NOT NULL,
+  stage TEXT NOT NULL,
+  receipt_no TEXT NOT NULL DEFAULT '',
+  utm_source TEXT NOT NULL,
+  utm_campaign TEXT NOT NULL,
+  utm_medium TEXT NOT NULL DEFAULT '',
+  utm_content TEXT NOT NULL DEFAULT '',
+  utm_term TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_touchpoints_utm ON touchpoints(utm_source, utm_campaign, day);
+CREATE INDEX IF NOT EXISTS idx_touchpoints_day ON touchpoints(day);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_touchpoints_receipt ON touchpoints(receipt_no, stage) WHERE receipt_no <> '';
+
+CREATE TABLE IF NOT EXISTS funnel_daily (
+  day TEXT NOT NULL,
+  utm_source TEXT NOT NULL,
+  utm_campaign TEXT NOT NULL,
+  stage TEXT NOT NULL,
+  count BIGINT NOT NULL,
+  PRIMARY KEY (day, utm_source, utm_campaign, stage)
+);
+
+CREATE TABLE IF NOT EXISTS funnel_state (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  last_id BIGINT NOT NULL
+);
+"""
+
+
+def _utm_values(utm: Optional[Mapping[str, Any]]) -> List[str]:
+    utm = utm or {}
+    return [str(utm.get(k) or (UNKNOWN if k in ("utm_source", "utm_campaign") else "")) for k in UTM_KEYS]
+
+
+def _build_funnels(rows) -> List[Dict[str, Any]]:
+    funnels: Dict[tuple, Dict[str, Any]] = {}
+    for source, campaign, stage, count in rows:
+        entry = funnels.setdefault((source, campaign), {
+            "utm_source": source, "utm_campaign": campaign, **{s: 0 for s in STAGES}
+        })
+        entry[stage] = int(count)
+    for entry in funnels.values():
+        entry["lead_rate"] = entry["lead"] / entry["view"] if entry["view"] else None
+        entry["contract_rate"] = entry["contract"] / entry["lead"] if entry["lead"] else None
+    return sorted(funnels.values(), key=lambda e: (e["lead"], e["view"]), reverse=True)
+
+
+class AttributionStore:
+    """귀속 기록 + 퍼널 집계 - 로컬 SQLite (스레드/프로세스 안전, 단일 호스트 전용)"""
+
+    shared = False
+
+    def __init__(self, db_path: str = STATE_DB_PATH):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        conn.executescript(DDL)
+        return conn
+
+    # ---------- 기록 ----------
+    def record(self, stage: str, receipt_no: str = "", utm: Optional[Mapping[str, Any]] = None,
+               when: Optional[datetime] = None) -> bool:
+        """터치포인트 1건 기록 → 새로 기록되었으면 True (같은 접수번호/단계는 1회)
+
+        utm 미지정 시 같은 접수번호의 신청(lead) 기록 UTM을 사용 (없으면 unknown)
+        """
+        if stage not in STAGES:
+            raise ValueError(f"알 수 없는 단계: {stage}")
+        when = when or datetime.now()
+        receipt_no = str(receipt_no or "").strip()
+        conn = self._connect()
+        try:
+            if utm is None and receipt_no:
+                row = conn.execute(
+                    f"SELECT {', '.join(UTM_KEYS)} FROM touchpoints WHERE receipt_no = ? AND stage = 'lead'",
+                    (receipt_no,)
+                ).fetchone()
+                utm = dict(zip(UTM_KEYS, row)) if row else None
+            values = _utm_values(utm)
+            cur = conn.execute(
+                f"INSERT OR IGNORE INTO touchpoints (ts, day, stage, receipt_no, {', '.join(UTM_KEYS)}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [when.timestamp(), when.strftime('%Y-%m-%d'), stage, receipt_no] + values
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    # ---------- 집계 ----------
+    def refresh_funnel(self) -> int:
+        """마지막 집계 이후 추가된 터치포인트만 funnel_daily에 반영 → 반영 행 수"""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute("SELECT last_id FROM funnel_state WHERE id = 1").fetchone()
+            last_id = row[0] if row else 0
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM touchpoints").fetchone()[0]
+            if max_id <= last_id:
+                conn.execute('COMMIT')
+                return 0
+            conn.execute(
+                "INSERT INTO funnel_daily (day, utm_source, utm_campaign, stage, count) "
+                "SELECT day, utm_source, utm_campaign, stage, COUNT(*) FROM touchpoints "
+                "WHERE id > ? AND id <= ? GROUP BY day, utm_source, utm_campaign, stage "
+                "ON CONFLICT(day, utm_source, utm_campaign, stage) DO UPDATE SET count = count + excluded.count",
+                (last_id, max_id)
+            )
+            conn.execute(
+                "INSERT INTO funnel_state (id, last_id) VALUES (1, ?) "
+                "ON CONFLICT(id) DO UPDATE SET last_id = excluded.last_id",
+                (max_id,)
+            )
+            added = conn.execute("SELECT COUNT(*) FROM touchpoints WHERE id > ? AND id <= ?", (last_id, max_id)).fetchone()[0]
+            conn.execute('COMMIT')
+            return added
+        finally:
+            conn.close()
+
+    def campaign_funnels(self, days: int = 30, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """최근 days일 캠페인별 퍼널 → [{utm_source, utm_campaign, view, lead, ..., lead_rate, contract_rate}]
+
+        단계별 건수는 해당 단계가 일어난 날짜 기준
+        """
+        self.refresh_funnel()
+        since = ((today or date.today()) - timedelta(days=days - 1)).isoformat()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT utm_source, utm_campaign, stage, SUM(count) FROM funnel_daily "
+                "WHERE day >= ? GROUP BY utm_source, utm_campaign, stage",
+                (since,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return _build_funnels(rows)
+
+
+class PostgresAttributionStore(AttributionStore):
+    """귀속 기록 + 퍼널 집계 - 공용 PostgreSQL (앱별 호스트가 달라도 같은 기록)"""
+
+    shared = True
+
+    def __init__(self, dsn: str, max_connections: int = 4):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+        except ImportError as e:
+            raise RuntimeError("PostgreSQL 귀속 저장소에는 psycopg2가 필요합니다. (pip install psycopg2-binary)") from e
+        self.pool = ThreadedConnectionPool(1, max_connections, dsn)
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _run(self, fn):
+        # 풀 연결 1개로 fn(cur) 실행 후 커밋 (실패 시 롤백)
+        conn = self.pool.getconn()
+        try:
+            if not self._schema_ready:
+                with self._lock, conn.cursor() as cur:
+                    cur.execute(POSTGRES_DDL)
+                    conn.commit()
+                    self._schema_ready = True
+            with conn.cursor() as cur:
+                result = fn(cur)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def record(self, stage: str, receipt_no: str = "", utm: Optional[Mapping[str, Any]] = None,
+               when: Optional[datetime] = None) -> bool:
+        if stage not in STAGES:
+            raise ValueError(f"알 수 없는 단계: {stage}")
+        when = when or datetime.now()
+        receipt_no = str(receipt_no or "").strip()
+
+        def insert(cur) -> bool:
+            values = utm
+            if values is None and receipt_no:
+                cur.execute(f"SELECT {', '.join(UTM_KEYS)} FROM touchpoints WHERE receipt_no = %s AND stage = 'lead'",
+                            (receipt_no,))
+                row = cur.fetchone()
+                values = dict(zip(UTM_KEYS, row)) if row else None
+            cur.execute(
+                f"INSERT INTO touchpoints (ts, day, stage, receipt_no, {', '.join(UTM_KEYS)}) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) "
+                "ON CONFLICT (receipt_no, stage) WHERE receipt_no <> '' DO NOTHING",
+                [when.timestamp(), when.strftime('%Y-%m-%d'), stage, receipt_no] + _utm_values(values)
+            )
+            return cur.rowcount == 1
+
+        return self._run(insert)
+
+    def refresh_funnel(self) -> int:
+        def refresh(cur) -> int:
+            # SHARE 잠금: 진행 중인 기록이 끝날 때까지 대기 → 늦게 커밋된 낮은 id를 건너뛰지 않음
+            cur.execute("LOCK TABLE funnel_state, touchpoints IN SHARE ROW EXCLUSIVE MODE")
+            cur.execute("SELECT last_id FROM funnel_state WHERE id = 1")
+            row = cur.fetchone()
+            last_id = row[0] if row else 0
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM touchpoints")
+            max_id = cur.fetchone()[0]
+            if max_id <= last_id:
+                return 0
+            cur.execute(
+                "INSERT INTO funnel_daily (day, utm_source, utm_campaign, stage, count) "
+                "SELECT day, utm_source, utm_campaign, stage, COUNT(*) FROM touchpoints "
+                "WHERE id > %s AND id <= %s GROUP BY day, utm_source, utm_campaign, stage "
+                "ON CONFLICT (day, utm_source, utm_campaign, stage) "
+                "DO UPDATE SET count = funnel_daily.count + excluded.count",
+                (last_id, max_id)
+            )
+            cur.execute(
+                "INSERT INTO funnel_state (id, last_id) VALUES (1, %s) "
+                "ON CONFLICT (id) DO UPDATE SET last_id = excluded.last_id",
+                (max_id,)
+            )
+            cur.execute("SELECT COUNT(*) FROM touchpoints WHERE id > %s AND id <= %s", (last_id, max_id))
+            return cur.fetchone()[0]
+
+        return self._run(refresh)
+
+    def campaign_funnels(self, days: int = 30, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        self.refresh_funnel()
+        since = ((today or date.today()) - timedelta(days=days - 1)).isoformat()
+
+        def select(cur):
+            cur.execute(
+                "SELECT utm_source, utm_campaign, stage, SUM(count) FROM funnel_daily "
+                "WHERE day >= %s GROUP BY utm_source, utm_campaign, stage",
+                (since,)
+            )
+            return cur.fetchall()
+
+        return _build_funnels(self._run(select))
+
+
+def open_attribution_store(url: Optional[str] = None) -> AttributionStore:
+    """ATTRIBUTION_DB_URL이 postgres면 공용 PostgreSQL, 아니면 로컬 상태 파일 (또는 지정 경로의 SQLite)"""
+    url = url if url is not None else get_config().ATTRIBUTION_DB_URL
+    if url.startswith(('postgres://', 'postgresql://')):
+        return PostgresAttributionStore(url)
+    return AttributionStore(url or STATE_DB_PATH)
+
+
+_default_store: Optional[AttributionStore] = None
+_open_failure: Optional[tuple] = None   # (실패 시각, 오류)
+_default_lock = threading.Lock()
+
+
+def get_attribution_store() -> AttributionStore:
+    """프로세스 공용 저장소 (연결 실패 시 OPEN_RETRY_SECONDS 동안은 재연결 없이 같은 오류)"""
+    global _default_store, _open_failure
+    with _default_lock:
+        if _default_store is None:
+            if _open_failure and time.monotonic() - _open_failure[0] < OPEN_RETRY_SECONDS:
+                raise _open_failure[1]
+            try:
+                _default_store = open_attribution_store()
+            except Exception as e:
+                _open_failure = (time.monotonic(), e)
+                raise
+            _open_failure = None
+    return _default_store
+
+
+def record_touchpoint(stage: str, receipt_no: str = "", utm: Optional[Mapping[str, Any]] = None) -> bool:
+    """사용자 화면용 기록 - 저장소 오류는 무시 (신청/제출 흐름을 막지 않음)
+
+    조회 이후 단계는 유효한 접수번호일 때만 기록 (테스트 모드/직접 입력 누락 제외)
+    """
+    if stage != "view" and not is_valid_receipt_no(receipt_no):
+        return False
+    try:
+        return get_attribution_store().record(stage, receipt_no, utm)
+    except Exception as e:
+        print(f"[WARN] touchpoint {stage} not recorded: {e}")
+        return False
@@ -1,12 +1,7 @@
-import os
-try:
-    from dotenv import load_dotenv  # optional
-    load_dotenv()
-except Exception:
-    pass
-# GAS/Webapp URLs (env → fallback empty)
-APPS_SCRIPT_URL_1 = os.getenv('FIRST_GAS_URL', '')
-APPS_SCRIPT_URL_2 = os.getenv('SECOND_GAS_URL', '')
-APPS_SCRIPT_URL_3 = os.getenv('THIRD_GAS_URL', '')
-# 1차 토큰 검증 API (2차/3차가 사용)
-TOKEN_API_URL     = os.getenv('FIRST_GAS_TOKEN_API_URL', '')
+# 기존 import 호환용 별칭 - 설정 해석은 config_loader에서 1회 (파일 변경 시 자동 재해석)
+# APPS_SCRIPT_URL_1/2/3, TOKEN_API_URL 등 Config 속성을 모듈 속성처럼 읽음
+from config_loader import get_config
+
+
+def __getattr__(name):
+    return getattr(get_config(), name)
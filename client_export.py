@@ -0,0 +1,187 @@
+"""
+유아플랜 고객 전체 내보내기 (CSV / Parquet)
+- 접수번호를 청크 단위로 일괄 조회 → 행 변환 → 파일에 바로 기록 (스트리밍)
+- 메모리에는 항상 청크 1개 분량만 유지 (10만 건도 프로세스 메모리 일정)
+- Parquet은 pyarrow가 설치된 경우에만 지원 (청크 = row group)
+- 새 파일을 만들 때 EXPORT_KEEP_HOURS(기본 24시간) 지난 내보내기/요약서 파일 정리
+"""
+
+from __future__ import annotations
+import csv
+import importlib.util
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# pyarrow는 설치 여부만 확인하고 Parquet 기록 시점에 import (대시보드 시작 시간 단축)
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# ==============================
+# 단계별 필드 정의 (대시보드 상세 카드와 공용)
+# ==============================
+STAGE_FIELDS: Dict[int, List[Tuple[str, str]]] = {
+    1: [
+        ("name", "성명"),
+        ("phone", "연락처"),
+        ("gender", "성별"),
+        ("birthdate", "생년월일"),
+        ("business_type", "사업자유형"),
+        ("region", "지역"),
+        ("interest", "관심사항"),
+        ("referral_source", "유입경로")
+    ],
+    2: [
+        ("company_name", "상호명"),
+        ("business_number", "사업자번호"),
+        ("open_date", "개업연월"),
+        ("employee_count", "직원수"),
+        ("annual_revenue", "연매출"),
+        ("business_category", "업종"),
+        ("funding_purpose", "자금용도"),
+        ("desired_amount", "희망금액"),
+        ("past_policy_fund", "정책자금이력"),
+        ("additional_info", "추가정보")
+    ],
+    3: [
+        ("funding_timeline", "자금시기"),
+        ("collateral_type", "담보유형"),
+        ("credit_status", "신용상태"),
+        ("tax_status", "세금상태"),
+        ("consulting_request", "상담요청"),
+        ("recommended_fund", "추천자금"),
+        ("expected_limit", "예상한도"),
+        ("decision_status", "의사결정"),
+        ("readiness_score", "준비도")
+    ]
+}
+
+BASE_COLUMNS = ["receipt_no", "progress_pct", "created_at", "fetch_status"]
+EXPORT_COLUMNS = BASE_COLUMNS + [
+    f"stage{stage}_{key}" for stage, fields in STAGE_FIELDS.items() for key, _ in fields
+]
+
+DEFAULT_CHUNK_SIZE = 1000
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "youareplan_exports"))
+EXPORT_KEEP_SECONDS = int(os.getenv("EXPORT_KEEP_HOURS", "24")) * 3600   # 이보다 오래된 내보내기 파일은 삭제
+
+BulkLoader = Callable[[List[str]], Dict[str, Dict[str, Any]]]
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value)
+
+
+def view_to_row(receipt_no: str, result: Optional[Dict[str, Any]], client: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """통합 조회 응답 1건 → 평탄화된 행 (모든 값 문자열)"""
+    client = client or {}
+    ok = bool(result) and result.get("status") == "success"
+    data = (result.get("data") or {}) if ok else {}
+
+    row = {
+        "receipt_no": receipt_no,
+        "progress_pct": _cell(data.get("progress_pct", client.get("progress_pct", ""))),
+        "created_at": _cell(client.get("created_at", "")),
+        "fetch_status": "ok" if ok else _cell((result or {}).get("message", "error"))
+    }
+    for stage, fields in STAGE_FIELDS.items():
+        stage_data = data.get(f"stage{stage}") or {}
+        for key, _ in fields:
+            row[f"stage{stage}_{key}"] = _cell(stage_data.get(key, ""))
+    return row
+
+
+def iter_row_chunks(
+    clients: List[Dict[str, Any]],
+    loader: BulkLoader,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[List[Dict[str, str]]]:
+    """고객 목록을 청크 단위로 일괄 조회해 행 묶음을 순차 생성"""
+    for start in range(0, len(clients), chunk_size):
+        chunk = clients[start:start + chunk_size]
+        receipt_nos = [str(c.get("receipt_no", "") or "") for c in chunk]
+        results = loader([r for r in receipt_nos if r])
+        yield [
+            view_to_row(receipt_no, results.get(receipt_no), client)
+            for receipt_no, client in zip(receipt_nos, chunk)
+            if receipt_no
+        ]
+
+
+def prune_exports(out_dir: str = EXPORT_DIR, max_age: int = EXPORT_KEEP_SECONDS) -> int:
+    """내보내기 폴더에서 max_age초 지난 youareplan_* 파일 삭제 → 삭제 수 (새 파일 생성 시 호출)"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(out_dir))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.name.startswith("youareplan_") and entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass   # 다른 워커가 먼저 지웠거나 다운로드 중인 파일
+    return removed
+
+
+def _parquet_schema(pa):
+    return pa.schema([(col, pa.string()) for col in EXPORT_COLUMNS])
+
+
+def export_clients(
+    clients: List[Dict[str, Any]],
+    loader: BulkLoader,
+    formats: Iterable[str] = ("csv", "parquet"),
+    out_dir: str = EXPORT_DIR,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, str]:
+    """고객 전체를 CSV/Parquet 파일로 스트리밍 기록 → {형식: 파일 경로}"""
+    formats = [f for f in formats if f == "csv" or (f == "parquet" and HAS_PYARROW)]
+    if not formats:
+        return {}
+
+    os.makedirs(out_dir, exist_ok=True)
+    prune_exports(out_dir)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    paths = {fmt: os.path.join(out_dir, f"youareplan_clients_{stamp}.{fmt}") for fmt in formats}
+
+    csv_file = None
+    csv_writer = None
+    parquet_writer = None
+    total = len(clients)
+    done = 0
+
+    try:
+        if "csv" in paths:
+            # utf-8-sig: 엑셀에서 한글 깨짐 방지
+            csv_file = open(paths["csv"], "w", newline="", encoding="utf-8-sig")
+            csv_writer = csv.DictWriter(csv_file, fieldnames=EXPORT_COLUMNS)
+            csv_writer.writeheader()
+        if "parquet" in paths:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = _parquet_schema(pa)
+            parquet_writer = pq.ParquetWriter(paths["parquet"], schema, compression="zstd")
+
+        for rows in iter_row_chunks(clients, loader, chunk_size):
+            if csv_writer is not None:
+                csv_writer.writerows(rows)
+            if parquet_writer is not None and rows:
+                columns = {col: [row[col] for row in rows] for col in EXPORT_COLUMNS}
+                parquet_writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            done = min(total, done + chunk_size)
+            if on_progress:
+                on_progress(done, total)
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    return paths
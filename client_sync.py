@@ -0,0 +1,111 @@
+"""
+유아플랜 고객 목록 증분 동기화 클라이언트
+- GAS get_clients_delta 액션: since(버전) 이후 변경/삭제된 행만 gzip+base64로 수신
+- 로컬 스냅샷(접수번호 → 행)에 적용 → 새로고침 비용이 전체 고객 수가 아닌 변경 건수에 비례
+- JSON 파싱은 orjson 설치 시 orjson 사용 (미설치 시 표준 json)
+- GAS가 "알 수 없는 액션"으로 응답할 때만 get_all_clients 전체 조회로 대체,
+  DELTA_REPROBE_SECONDS 후 증분 액션을 다시 시도 (GAS 재배포 반영) - 그 외 오류는 마지막 스냅샷 유지
+- 반환 형식은 get_all_clients 응답({"ok": True, "data": [...]})과 동일
+
+GAS 측 핸들러: apps/client_sync.gs
+"""
+
+from __future__ import annotations
+import base64
+import gzip
+import json
+import threading
+import time
+from typing import Any, Dict
+
+from request_helper import is_unknown_action, json_get
+
+try:
+    import orjson
+    _loads = orjson.loads
+    HAS_ORJSON = True
+except ImportError:  # optional
+    _loads = json.loads
+    HAS_ORJSON = False
+
+DELTA_ACTION = "get_clients_delta"
+FULL_ACTION = "get_all_clients"
+ENCODING_GZIP = "gzip+base64"
+DELTA_REPROBE_SECONDS = 600
+
+
+def decode_payload(response: Dict[str, Any]) -> Dict[str, Any]:
+    """증분 응답 → {"upserts": [...], "deletes": [...]}"""
+    if response.get("encoding") == ENCODING_GZIP:
+        return _loads(gzip.decompress(base64.b64decode(response.get("payload") or "")))
+    return {"upserts": response.get("upserts") or [], "deletes": response.get("deletes") or []}
+
+
+class ClientSync:
+    """고객 목록 스냅샷 + 버전 (프로세스 공유, 스레드 안전)"""
+
+    def __init__(self, url: str, reprobe_seconds: float = DELTA_REPROBE_SECONDS):
+        self.url = url
+        self.version = 0
+        self.delta_supported = True
+        self.reprobe_seconds = reprobe_seconds
+        self._unsupported_at = 0.0
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"syncs": 0, "full": 0, "upserts": 0, "deletes": 0, "payload_bytes": 0}
+
+    def _fetch_full(self, api_token: str) -> Dict[str, Any]:
+        ok, _, data, err = json_get(self.url, params={"action": FULL_ACTION, "api_token": api_token})
+        return data if ok else {"status": "error", "message": err}
+
+    def sync(self, api_token: str, hedge: bool = False) -> Dict[str, Any]:
+        """변경분 수신 후 전체 목록 반환"""
+        if not self.delta_supported:
+            if time.monotonic() - self._unsupported_at < self.reprobe_seconds:
+                return self._fetch_full(api_token)
+            self.reset()   # 재확인: GAS에 증분 액션이 배포되었으면 전체 수신부터 다시
+
+        with self._lock:
+            params = {"action": DELTA_ACTION, "since": self.version, "encoding": "gzip", "api_token": api_token}
+            # 마지막 정상 응답 재사용 금지: 이전 since의 변경분을 다시 적용하게 됨
+            ok, _, data, err = json_get(self.url, params=params, use_last_good=False, hedge=hedge)
+            if not ok or not data.get("ok"):
+                message = (data.get("error") or data.get("message")) if isinstance(data, dict) else None
+                if ok and is_unknown_action(data):
+                    # 증분 액션 미배포 GAS → 전체 조회로 전환 (reprobe_seconds 후 재확인)
+                    self.delta_supported = False
+                    self._unsupported_at = time.monotonic()
+                    self._rows = {}
+                    self.version = 0
+                    return self._fetch_full(api_token)
+                if self.version:
+                    return {"ok": True, "data": list(self._rows.values()), "version": self.version, "_stale": True}
+                return {"status": "error", "message": message or err}
+
+            body = decode_payload(data)
+            if data.get("full"):
+                self._rows = {}
+                self._stats["full"] += 1
+            for row in body.get("upserts") or []:
+                self._rows[str(row.get("receipt_no", ""))] = row
+            for receipt_no in body.get("deletes") or []:
+                self._rows.pop(str(receipt_no), None)
+            self.version = int(data.get("version") or 0)
+
+            self._stats["syncs"] += 1
+            self._stats["upserts"] += len(body.get("upserts") or [])
+            self._stats["deletes"] += len(body.get("deletes") or [])
+            self._stats["payload_bytes"] += len(data.get("payload") or "")
+            return {"ok": True, "data": list(self._rows.values()), "version": self.version}
+
+    def reset(self) -> None:
+        """다음 동기화를 전체 수신으로 (GAS 배포 변경 시 등)"""
+        with self._lock:
+            self.version = 0
+            self._rows = {}
+            self.delta_supported = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "version": self.version, "rows": len(self._rows),
+                    "delta_supported": self.delta_supported, "orjson": HAS_ORJSON}
@@ -1,23 +1,258 @@
+"""
+유아플랜 통합 설정
+- 우선순위: st.secrets(.streamlit/secrets.toml) → 환경변수 → .env → 기본값
+- 한 번 해석한 값은 불변 Config 객체(__slots__)로 공유 → get_config()는 같은 객체 반환
+- .env / secrets.toml 변경 감지(CONFIG_WATCH_INTERVAL 간격 mtime 확인) 시 재해석 → 재시작 없이 반영
+  (값을 모듈 상수로 복사해 두지 말고 사용 시점에 get_config()로 읽을 것)
+- cfg.py / src_backup/config.py는 이 모듈의 호환용 별칭
+"""
+
+from __future__ import annotations
 import os
-from dataclasses import dataclass
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:  # pragma: no cover
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
 try:
-    from dotenv import load_dotenv
-    load_dotenv()
+    from dotenv import dotenv_values  # optional
 except Exception:
-    pass
-
-@dataclass
-class _Cfg:
-    APPS_SCRIPT_URL_1: str = ''
-    APPS_SCRIPT_URL_2: str = ''
-    APPS_SCRIPT_URL_3: str = ''
-    TOKEN_API_URL: str = ''
-
-
-def get_config() -> _Cfg:
-    return _Cfg(
-        APPS_SCRIPT_URL_1=os.getenv('FIRST_GAS_URL',''),
-        APPS_SCRIPT_URL_2=os.getenv('SECOND_GAS_URL',''),
-        APPS_SCRIPT_URL_3=os.getenv('THIRD_GAS_URL',''),
-        TOKEN_API_URL=os.getenv('FIRST_GAS_TOKEN_API_URL',''),
-    )
+    dotenv_values = None
+
+CONFIG_WATCH_INTERVAL = float(os.getenv('CONFIG_WATCH_INTERVAL', '2'))
+ENV_FILE = os.getenv('ENV_FILE', '.env')
+SECRETS_FILES = (
+    os.path.join(os.path.expanduser('~'), '.streamlit', 'secrets.toml'),
+    os.path.join('.streamlit', 'secrets.toml'),   # 프로젝트 파일이 전역 파일보다 우선
+)
+
+FIRST_GAS_DEFAULT_URL = "https://script.google.com/macros/s/AKfycbwb4rHgQepBGE4wwS-YIap8uY_4IUxGPLRhTQ960ITUA6KgfiWVZL91SOOMrdxpQ-WC/exec"
+PLACEHOLDER_GAS_URL = "https://script.google.com/macros/s/YOUR_GAS_ID/exec"
+
+
+def _to_bool(value: Any) -> bool:
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# 속성명 → (키 목록(앞쪽 우선), 타입 변환, 기본값)
+SETTINGS: Dict[str, Tuple[Tuple[str, ...], Callable[[Any], Any], Any]] = {
+    # 실행 환경
+    'ENVIRONMENT': (('ENVIRONMENT',), str, 'development'),
+    'DEBUG': (('DEBUG',), _to_bool, True),
+    'LOG_LEVEL': (('LOG_LEVEL',), str, 'INFO'),
+
+    # Google Apps Script URLs
+    'FIRST_GAS_URL': (('FIRST_GAS_URL',), str, FIRST_GAS_DEFAULT_URL),
+    'SECOND_GAS_URL': (('SECOND_GAS_URL',), str, PLACEHOLDER_GAS_URL),
+    'THIRD_GAS_URL': (('THIRD_GAS_URL',), str, PLACEHOLDER_GAS_URL),
+    'TOKEN_API_URL': (('FIRST_GAS_TOKEN_API_URL',), str, FIRST_GAS_DEFAULT_URL),
+    'UNIFIED_API_URL': (('UNIFIED_API_URL',), str, ''),
+
+    # API 토큰
+    'API_TOKEN': (('API_TOKEN',), str, 'youareplan'),
+    'API_TOKEN_STAGE2': (('API_TOKEN_2', 'API_TOKEN_STAGE2'), str, 'youareplan_stage2'),
+    'API_TOKEN_STAGE3': (('API_TOKEN_3', 'API_TOKEN_STAGE3'), str, 'youareplan_stage3'),
+    'ACCESS_TOKEN_SECRET': (('ACCESS_TOKEN_SECRET',), str, ''),
+    'ACCESS_TOKEN_TTL_MINUTES': (('ACCESS_TOKEN_TTL_MINUTES',), int, 30),
+
+    # 접수번호 (receipt_allocator)
+    'RECEIPT_SEQ_URL': (('RECEIPT_SEQ_URL',), str, ''),       # 비어 있으면 FIRST_GAS_URL
+    'RECEIPT_NODE_ID': (('RECEIPT_NODE_ID',), int, 0),        # 앱/인스턴스별 0~9 (GAS 장애 시 대체 발급 구간, 명시 지정 시에만 사용)
+
+    # 대시보드
+    'DASHBOARD_PW': (('DASHBOARD_PW',), str, ''),
+    'RESULT_PW': (('RESULT_PW',), str, ''),
+    'GEMINI_API_KEY': (('GEMINI_API_KEY',), str, ''),
+
+    # 랜딩 / 광고
+    'META_ACCESS_TOKEN': (('META_ACCESS_TOKEN',), str, ''),
+    'ATTRIBUTION_DB_URL': (('ATTRIBUTION_DB_URL',), str, ''),   # postgresql://... (앱별 호스트 분리 배포 시 필수)
+
+    # 정책 수집기
+    'BIZINFO_API_KEY': (('BIZINFO_API_KEY',), str, ''),
+    'KSTARTUP_API_KEY': (('KSTARTUP_API_KEY',), str, ''),
+    'ANTHROPIC_API_KEY': (('ANTHROPIC_API_KEY',), str, ''),
+    'OPENAI_API_KEY': (('OPENAI_API_KEY',), str, ''),
+    'TELEGRAM_BOT_TOKEN': (('TELEGRAM_BOT_TOKEN',), str, ''),
+    'TELEGRAM_CHAT_ID': (('TELEGRAM_CHAT_ID',), str, ''),
+    'POLICY_DB_PATH': (('POLICY_DB_PATH',), str, 'policy.db'),
+    'POLICY_DB_URL': (('POLICY_DB_URL',), str, ''),            # postgresql://... 설정 시 PostgreSQL 저장소
+    'POLICY_DB_POOL_MAX': (('POLICY_DB_POOL_MAX',), int, 4),
+    'PROGRAM_ALERT_RULES': (('PROGRAM_ALERT_RULES',), str, 'program_alert_rules.json'),   # 공고 알림 구독 규칙
+    'PROGRAM_SOURCES': (('PROGRAM_SOURCES',), str, 'program_sources.json'),             # JSON 공고 소스 플러그인
+
+    # 브랜딩
+    'YOUAREPLAN_LOGO_URL': (('YOUAREPLAN_LOGO_URL',), str, 'https://raw.githubusercontent.com/youareplan-ceo/youaplan-site/main/logo.png'),
+    'BRAND_PRIMARY_COLOR': (('BRAND_PRIMARY_COLOR',), str, '#002855'),
+    'BRAND_SECONDARY_COLOR': (('BRAND_SECONDARY_COLOR',), str, '#005BAC'),
+
+    # 성능 설정 (HTTP / 캐시 계층에서 사용)
+    'API_CACHE_TTL': (('API_CACHE_TTL',), int, 300),
+    'DUPLICATE_CACHE_TTL': (('DUPLICATE_CACHE_TTL',), int, 1800),
+    'MAX_RETRY_ATTEMPTS': (('MAX_RETRY_ATTEMPTS',), int, 3),
+    'REQUEST_TIMEOUT': (('REQUEST_TIMEOUT',), int, 30),
+    'HEDGED_REQUESTS': (('HEDGED_REQUESTS',), _to_bool, False),   # 조회 헤지 요청 (opt-in)
+    'HEDGE_BUDGET_RATIO': (('HEDGE_BUDGET_RATIO',), float, 0.1),
+
+    # 카카오톡 채널
+    'KAKAO_CHANNEL_ID': (('KAKAO_CHANNEL_ID',), str, '_LWxexmn'),
+
+    # 도메인 / SSL
+    'DOMAIN_SURVEY1': (('DOMAIN_SURVEY1',), str, 'survey1.youareplan.co.kr'),
+    'DOMAIN_SURVEY2': (('DOMAIN_SURVEY2',), str, 'survey2.youareplan.co.kr'),
+    'DOMAIN_SURVEY3': (('DOMAIN_SURVEY3',), str, 'survey3.youareplan.co.kr'),
+    'DOMAIN_DASHBOARD': (('DOMAIN_DASHBOARD',), str, 'dashboard.youareplan.co.kr'),
+    'SSL_ENABLED': (('SSL_ENABLED',), _to_bool, True),
+}
+
+
+class Config:
+    """해석이 끝난 설정값 (불변)"""
+
+    __slots__ = tuple(SETTINGS) + ('_explicit',)
+
+    def __init__(self, values: Dict[str, Any], explicit: FrozenSet[str]):
+        for name in SETTINGS:
+            object.__setattr__(self, name, values[name])
+        object.__setattr__(self, '_explicit', explicit)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Config는 변경할 수 없습니다. (파일 수정 시 자동 재해석)")
+
+    def is_set(self, name: str) -> bool:
+        """기본값이 아닌, 설정 파일/환경변수로 지정된 값인지"""
+        return name in self._explicit
+
+    @property
+    def KAKAO_CHANNEL_URL(self) -> str:
+        return f"https://pf.kakao.com/{self.KAKAO_CHANNEL_ID}"
+
+    @property
+    def KAKAO_CHAT_URL(self) -> str:
+        return f"https://pf.kakao.com/{self.KAKAO_CHANNEL_ID}/chat"
+
+    # 기존 cfg.py / _Cfg 이름 호환
+    @property
+    def APPS_SCRIPT_URL_1(self) -> str:
+        return self.FIRST_GAS_URL
+
+    @property
+    def APPS_SCRIPT_URL_2(self) -> str:
+        return self.SECOND_GAS_URL
+
+    @property
+    def APPS_SCRIPT_URL_3(self) -> str:
+        return self.THIRD_GAS_URL
+
+    def __repr__(self) -> str:
+        return f"Config(ENVIRONMENT={self.ENVIRONMENT!r}, explicit={len(self._explicit)})"
+
+
+# ==============================
+# 소스 읽기
+# ==============================
+def _read_secrets() -> Dict[str, Any]:
+    merged: Dict[str, Any] = {}
+    for path in SECRETS_FILES:
+        if not os.path.isfile(path):
+            continue
+        if tomllib is not None:
+            try:
+                with open(path, 'rb') as f:
+                    merged.update(tomllib.load(f))
+            except (OSError, ValueError):
+                pass
+        elif 'streamlit' in sys.modules:
+            # TOML 파서가 없으면 Streamlit이 읽은 값 사용
+            try:
+                import streamlit as st
+                merged.update(st.secrets.to_dict())
+            except Exception:
+                pass
+    return merged
+
+
+def _read_env_file() -> Dict[str, Any]:
+    if dotenv_values is None or not os.path.isfile(ENV_FILE):
+        return {}
+    try:
+        return {k: v for k, v in dotenv_values(ENV_FILE).items() if v is not None}
+    except Exception:
+        return {}
+
+
+def _lookup(keys: Tuple[str, ...], sources) -> Optional[Any]:
+    for source in sources:
+        for key in keys:
+            value = source.get(key)
+            if value not in (None, ''):
+                return value
+    return None
+
+
+def _resolve() -> Config:
+    sources = (_read_secrets(), os.environ, _read_env_file())
+    values: Dict[str, Any] = {}
+    explicit = set()
+    for name, (keys, convert, default) in SETTINGS.items():
+        raw = _lookup(keys, sources)
+        if raw is None:
+            values[name] = default
+            continue
+        try:
+            values[name] = convert(raw)
+            explicit.add(name)
+        except (TypeError, ValueError):
+            values[name] = default
+    return Config(values, frozenset(explicit))
+
+
+# ==============================
+# 공유 인스턴스 + 파일 변경 감지
+# ==============================
+_config: Optional[Config] = None
+_stamp: Tuple[float, ...] = ()
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _files_stamp() -> Tuple[float, ...]:
+    stamp = []
+    for path in (ENV_FILE,) + SECRETS_FILES:
+        try:
+            stamp.append(os.stat(path).st_mtime)
+        except OSError:
+            stamp.append(0.0)
+    return tuple(stamp)
+
+
+def get_config() -> Config:
+    """공유 설정 (설정 파일이 바뀌었으면 재해석)"""
+    global _config, _stamp, _checked_at
+    now = time.monotonic()
+    if _config is not None and now - _checked_at < CONFIG_WATCH_INTERVAL:
+        return _config
+    with _lock:
+        stamp = _files_stamp()
+        if _config is None or stamp != _stamp:
+            _config = _resolve()
+            _stamp = stamp
+        _checked_at = now
+        return _config
+
+
+def reload_config() -> Config:
+    """강제 재해석 (환경변수를 직접 바꾼 경우 등)"""
+    global _config, _checked_at
+    with _lock:
+        _config = None
+        _checked_at = 0.0
+    return get_config()
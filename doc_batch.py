@@ -0,0 +1,129 @@
+"""
+유아플랜 고객 요약서 일괄 생성
+- 요약서 템플릿은 모듈 로드 시 1회 컴파일 (string.Template + 필드 매핑 튜플)
+- 선택한 고객들을 청크 단위로 일괄 조회 → 워커 풀에서 렌더링
+- 결과는 ZIP 파일에 1건씩 바로 기록 (전체 문서를 메모리에 모으지 않음)
+"""
+
+from __future__ import annotations
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from string import Template
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from client_export import EXPORT_DIR, prune_exports
+
+# ==============================
+# 요약서 템플릿 (1회 컴파일)
+# ==============================
+SUMMARY_TEMPLATE = Template("""
+=====================================
+유아플랜 고객 정보 요약서
+=====================================
+접수번호: $receipt_no
+작성일자: $generated_at
+
+[1차 설문 - 기본정보]
+- 성명: $s1_name
+- 연락처: $s1_phone
+- 성별: $s1_gender
+- 생년월일: $s1_birthdate
+- 사업자유형: $s1_business_type
+- 지역: $s1_region
+
+[2차 설문 - 사업정보]
+- 상호명: $s2_company_name
+- 사업자번호: $s2_business_number
+- 개업연월: $s2_open_date
+- 업종: $s2_business_category
+- 연매출: $s2_annual_revenue
+- 직원수: $s2_employee_count
+- 자금용도: $s2_funding_purpose
+- 희망금액: $s2_desired_amount
+
+[3차 설문 - 추가정보]
+- 자금시기: $s3_funding_timeline
+- 담보유형: $s3_collateral_type
+- 신용상태: $s3_credit_status
+- 세금상태: $s3_tax_status
+
+=====================================
+""")
+
+# 템플릿 자리표시자 → (단계, 필드) 매핑을 1회 계산
+_PLACEHOLDERS: Tuple[Tuple[str, int, str], ...] = tuple(
+    (name, int(name[1]), name[3:])
+    for name in dict.fromkeys(
+        m.group("named") or m.group("braced")
+        for m in SUMMARY_TEMPLATE.pattern.finditer(SUMMARY_TEMPLATE.template)
+    )
+    if name and re.match(r"^s[123]_", name)
+)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_CHUNK_SIZE = 200
+
+BulkLoader = Callable[[List[str]], Dict[str, Dict[str, Any]]]
+
+
+def render_summary(data: Dict[str, Any], generated_at: Optional[str] = None) -> str:
+    """통합 조회 data 1건 → 요약서 텍스트"""
+    stages = {1: data.get("stage1") or {}, 2: data.get("stage2") or {}, 3: data.get("stage3") or {}}
+    values = {name: stages[stage].get(key, "-") for name, stage, key in _PLACEHOLDERS}
+    values["receipt_no"] = data.get("receipt_no", "-")
+    values["generated_at"] = generated_at or datetime.now().strftime("%Y-%m-%d %H:%M")
+    return SUMMARY_TEMPLATE.substitute(values)
+
+
+def summary_filename(receipt_no: str, day: Optional[str] = None) -> str:
+    day = day or datetime.now().strftime("%Y%m%d")
+    safe_receipt = re.sub(r"[^0-9A-Za-z_-]", "_", receipt_no or "unknown")
+    return f"유아플랜_{safe_receipt}_{day}.txt"
+
+
+def build_summary_zip(
+    receipt_nos: List[str],
+    loader: BulkLoader,
+    out_dir: str = EXPORT_DIR,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[str, List[str]]:
+    """선택 고객 요약서를 ZIP 1개로 생성 → (ZIP 경로, 조회 실패 접수번호 목록)"""
+    receipt_nos = list(dict.fromkeys(r for r in receipt_nos if r))
+    os.makedirs(out_dir, exist_ok=True)
+    prune_exports(out_dir)
+    stamp = datetime.now()
+    path = os.path.join(out_dir, f"youareplan_summaries_{stamp.strftime('%Y%m%d_%H%M%S')}.zip")
+    generated_at = stamp.strftime("%Y-%m-%d %H:%M")
+    day = stamp.strftime("%Y%m%d")
+
+    failed: List[str] = []
+    total = len(receipt_nos)
+    done = 0
+
+    def _render(item: Tuple[str, Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+        receipt_no, result = item
+        if not result or result.get("status") != "success":
+            return receipt_no, None
+        return receipt_no, render_summary(result.get("data") or {}, generated_at)
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="doc-render") as executor:
+        for start in range(0, total, chunk_size):
+            chunk = receipt_nos[start:start + chunk_size]
+            results = loader(chunk)
+            items = [(r, results.get(r)) for r in chunk]
+            for receipt_no, content in executor.map(_render, items):
+                if content is None:
+                    failed.append(receipt_no)
+                    continue
+                zf.writestr(summary_filename(receipt_no, day), content.encode("utf-8"))
+            done += len(chunk)
+            if on_progress:
+                on_progress(done, total)
+
+    return path, failed
@@ -0,0 +1,83 @@
+"""
+유아플랜 고객 식별 정보 정규화 / 해시 (Meta CAPI user_data)
+- 연락처: 설문 앱과 같은 숫자 추출/포맷 규칙 (survey_framework가 이 모듈의 함수를 재사용)
+- E.164 정규화 (국내번호 0 제거 + 국가번호 82), 이름/이메일/도시/국가/외부 ID 정규화
+- SHA-256 해시는 값 단위로 캐시 → 같은 리드의 여러 이벤트가 문자열 처리를 반복하지 않음
+- 해시 결과(user_data)는 불변 dict로 세션에 1회 저장해 재사용 (landing.py)
+"""
+
+from __future__ import annotations
+import hashlib
+import re
+import unicodedata
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+DEFAULT_COUNTRY_CODE = "82"   # 대한민국
+DEFAULT_COUNTRY = "kr"        # ISO 3166-1 alpha-2 (소문자)
+
+_NON_DIGITS = re.compile(r"[^0-9]")
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+# ==============================
+# 연락처 (설문 앱 공용)
+# ==============================
+def _digits_only(s: str) -> str:
+    return _NON_DIGITS.sub("", str(s) if s else "")
+
+def format_phone(d: str) -> str:
+    return f"{d[0:3]}-{d[3:7]}-{d[7:11]}" if len(d) == 11 else d
+
+def to_e164(phone: str, country_code: str = DEFAULT_COUNTRY_CODE) -> str:
+    """'010-1234-5678' → '+821012345678' (국제번호 '+…' 입력은 그대로, 숫자가 없으면 '')"""
+    raw = str(phone or "").strip()
+    d = _digits_only(raw)
+    if not d:
+        return ""
+    if raw.startswith("+") or raw.startswith("00"):
+        return "+" + (d[2:] if raw.startswith("00") else d)
+    if d.startswith("0"):
+        return f"+{country_code}{d[1:]}"
+    if d.startswith(country_code) and len(d) > 10:
+        return "+" + d
+    return f"+{country_code}{d}"
+
+# ==============================
+# 필드별 정규화 (Meta 고객 정보 매개변수 규칙)
+# ==============================
+def normalize_name(name: str) -> str:
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", str(name or "")).lower())
+
+def normalize_email(email: str) -> str:
+    return str(email or "").strip().lower()
+
+def normalize_city(city: str) -> str:
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", str(city or "")).lower())
+
+def normalize_country(country: str) -> str:
+    return str(country or "").strip().lower()[:2]
+
+def normalize_phone(phone: str) -> str:
+    """ph 해시 입력: E.164에서 '+'를 뺀 숫자"""
+    return to_e164(phone).lstrip("+")
+
+# ==============================
+# 해시
+# ==============================
+@lru_cache(maxsize=4096)
+def sha256_hex(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+@lru_cache(maxsize=1024)
+def _hashed(ph: str, fn: str, em: str, ct: str, country: str, external_id: str) -> Mapping[str, str]:
+    fields = {"ph": ph, "fn": fn, "em": em, "ct": ct, "country": country, "external_id": external_id}
+    return MappingProxyType({k: sha256_hex(v) for k, v in fields.items() if v})
+
+def hashed_user_data(phone: str = "", name: str = "", email: str = "", city: str = "",
+                     country: str = DEFAULT_COUNTRY, external_id: Optional[str] = None) -> Mapping[str, str]:
+    """정규화 + 해시된 CAPI user_data (읽기 전용, 같은 입력이면 같은 객체)"""
+    return _hashed(
+        normalize_phone(phone), normalize_name(name), normalize_email(email), normalize_city(city),
+        normalize_country(country), str(external_id or "").strip(),
+    )
@@ -0,0 +1,104 @@
+"""
+유아플랜 통합 조회 일괄 클라이언트
+- 접수번호 목록을 청크로 나눠 GAS get_integrated_view_bulk 액션으로 조회
+- 제한된 동시성으로 청크 병렬 전송, 시간 초과/5xx 청크만 절반으로 나눠 재시도
+  (인증 실패 등 GAS 오류 응답은 나눠도 같으므로 바로 오류 처리)
+- GAS에 일괄 액션이 없으면(unknown action) BulkUnsupportedError → 호출 측이 단건 조회로 대체
+- 반환 형식은 단건 get_integrated_view 응답({"status": "success", "data": ...})과 같은 모양
+  단, GAS 측은 시트 헤더 → 필드명 매핑으로 구성하므로 내보내기/요약서 ZIP 전용
+  (상세 카드와 통합 조회 캐시/프리페치는 단건 get_integrated_view만 사용)
+
+GAS 측 핸들러: apps/bulk_integrated_view.gs
+"""
+
+from __future__ import annotations
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional
+
+from request_helper import is_unknown_action, json_post
+
+BULK_ACTION = "get_integrated_view_bulk"
+
+# Apps Script 실행 한도(웹앱 1회 6분, 사용자당 동시 실행 30) 기준
+# - 청크 1건 = 시트 3장 1회 읽기 + 인덱스 조회 → 200건이면 수 초
+# - 동시 4건이면 동시 실행 한도의 여유를 남기면서 시트 읽기를 병렬화
+DEFAULT_CHUNK_SIZE = 200
+MAX_CHUNK_SIZE = 200  # apps/_config.gs BULK_MAX_RECEIPTS와 일치
+MIN_CHUNK_SIZE = 25
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 90
+
+_TIMEOUT_RE = re.compile(r"timed? ?out", re.IGNORECASE)
+
+
+class BulkUnsupportedError(NotImplementedError):
+    """GAS 배포본에 get_integrated_view_bulk 액션이 없음"""
+
+
+def _should_split(status: Optional[int], err: Optional[str]) -> bool:
+    # 시간 초과/서버 오류만 작은 청크로 재시도 의미가 있음
+    if status is not None:
+        return status == 408 or status >= 500
+    return bool(err and _TIMEOUT_RE.search(err))
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _fetch_chunk(url: str, api_token: str, receipt_nos: List[str], timeout: int) -> Dict[str, Dict[str, Any]]:
+    """청크 1건 조회. 시간 초과/5xx면 절반으로 나눠 재귀 재시도 (최소 MIN_CHUNK_SIZE)"""
+    payload = {"action": BULK_ACTION, "receipt_nos": receipt_nos, "api_token": api_token}
+    ok, status, data, err = json_post(url, payload, timeout=timeout, retries=1)
+
+    if ok and data.get("ok"):
+        views = data.get("data") or {}
+        results = {}
+        for receipt_no in receipt_nos:
+            view = views.get(receipt_no)
+            if view:
+                results[receipt_no] = {"status": "success", "data": view}
+            else:
+                results[receipt_no] = {"status": "error", "message": "접수번호를 찾을 수 없습니다."}
+        return results
+
+    if is_unknown_action(data):
+        raise BulkUnsupportedError(str(data.get("error") or data.get("message")))
+
+    if len(receipt_nos) > MIN_CHUNK_SIZE and _should_split(status, err):
+        half = len(receipt_nos) // 2
+        results = _fetch_chunk(url, api_token, receipt_nos[:half], timeout)
+        results.update(_fetch_chunk(url, api_token, receipt_nos[half:], timeout))
+        return results
+
+    message = (data.get("error") or data.get("message")) if isinstance(data, dict) else None
+    message = message or err or "일괄 조회 실패"
+    return {r: {"status": "error", "message": message} for r in receipt_nos}
+
+
+def fetch_integrated_views(
+    url: str,
+    api_token: str,
+    receipt_nos: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> Dict[str, Dict[str, Any]]:
+    """접수번호 목록 일괄 조회 → {접수번호: 단건 조회와 같은 형식의 응답}
+    GAS에 일괄 액션이 없으면 BulkUnsupportedError"""
+    unique = list(dict.fromkeys(r for r in receipt_nos if r))
+    if not unique:
+        return {}
+
+    size = max(MIN_CHUNK_SIZE, min(chunk_size, MAX_CHUNK_SIZE))
+    chunks = _chunks(unique, size)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))),
+                            thread_name_prefix="gas-bulk") as executor:
+        futures = [executor.submit(_fetch_chunk, url, api_token, chunk, timeout) for chunk in chunks]
+        for future in as_completed(futures):
+            results.update(future.result())
+
+    return results
@@ -1,14 +1,19 @@
+import startup_timing
+startup_timing.install()  # STARTUP_TIMING=1일 때만 import 시간 기록
+
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
-import re
-import os
-import hashlib
 import time
 import json
 import uuid
 from datetime import datetime
-import random
+
+from attribution import record_touchpoint
+from config_loader import get_config
+from receipt_allocator import ReceiptUnavailableError, allocate_receipt_no
+from identity import _digits_only, format_phone, hashed_user_data
+from request_helper import json_write
+from meta_events import EventLedger, get_event_buffer
 
 # ==============================
 # 페이지 설정
@@ -24,7 +29,7 @@ st.set_page_config(
 # [설정] Meta Pixel & CAPI
 # ==============================
 META_PIXEL_ID = "1523433105534274"
-META_ACCESS_TOKEN = os.getenv("META_ACCESS_TOKEN", "")
+META_ACCESS_TOKEN = get_config().META_ACCESS_TOKEN
 CURRENT_URL = "https://youareplan-landing.onrender.com"
 
 # ==============================
@@ -32,10 +37,10 @@ CURRENT_URL = "https://youareplan-landing.onrender.com"
 # ==============================
 BRAND_NAME = "유아플랜"
 LOGO_URL = "https://raw.githubusercontent.com/youareplan-ceo/youareplan-survey/main/logo_white.png"
-API_TOKEN = os.getenv("API_TOKEN", "youareplan")
+API_TOKEN = get_config().API_TOKEN
 
 # [1] 기존 광고 DB 주소 (변경 금지 / 안전장치 - 이전 주소 유지)
-GAS_URL_OLD = os.getenv("FIRST_GAS_URL", "https://script.google.com/macros/s/AKfycbwb4rHgQepBGE4wwS-YIap8uY_4IUxGPLRhTQ960ITUA6KgfiWVZL91SOOMrdxpQ-WC/exec")
+GAS_URL_OLD = get_config().FIRST_GAS_URL
 
 # [2] 신규 CRM 주소 (회장님이 방금 주신 주소 적용 완료!)
 GAS_URL_CRM = "https://script.google.com/macros/s/AKfycbwLnuz2W5QqcgBE-t-daKseiaRm3QQtT5c2l-ch8UPR5YzeOvenT-hiy4y8wQY4KhhF/exec"
@@ -43,6 +48,12 @@ GAS_URL_CRM = "https://script.google.com/macros/s/AKfycbwLnuz2W5QqcgBE-t-daKseia
 # ==============================
 # [추가] UTM 파라미터 읽기
 # ==============================
+def get_event_ledger() -> EventLedger:
+    """세션별 이벤트 장부 - 픽셀/CAPI가 같은 event_id 사용, 재실행 시 재발송 없음"""
+    if 'meta_ledger' not in st.session_state:
+        st.session_state.meta_ledger = EventLedger()
+    return st.session_state.meta_ledger
+
 def get_utm_params():
     """URL에서 UTM 파라미터를 읽어옵니다."""
     return {
@@ -93,6 +104,8 @@ def inject_facebook_pixel(event_name="PageView", custom_data=None, event_id=None
 
 # ==============================
 # [기능 2] 서버 사이드 API (CAPI)
+# - 이벤트는 버퍼에 넣기만 하고 즉시 반환 (전송/재시도/디스크 보관은 meta_events 플러셔)
+# - user_data: identity.hashed_user_data() 결과 (세션에 1회 계산해 둔 값 재사용)
 # ==============================
 def send_meta_event(event_name, user_data=None, event_id=None):
     if not META_ACCESS_TOKEN:
@@ -100,52 +113,21 @@ def send_meta_event(event_name, user_data=None, event_id=None):
     
     if event_id is None:
         event_id = str(uuid.uuid4())
-        
-    url = f"https://graph.facebook.com/v18.0/{META_PIXEL_ID}/events"
     
-    hashed_user_data = {}
-    if user_data:
-        if 'phone' in user_data:
-            raw_phone = re.sub(r"[^0-9]", "", str(user_data['phone']))
-            if raw_phone:
-                clean_phone = ('82' + raw_phone[1:]) if raw_phone.startswith('0') else ('82' + raw_phone)
-                hashed_user_data['ph'] = hashlib.sha256(clean_phone.encode('utf-8')).hexdigest()
-        
-        if 'name' in user_data:
-            raw_name = str(user_data['name']).strip().lower()
-            if raw_name:
-                hashed_user_data['fn'] = hashlib.sha256(raw_name.encode('utf-8')).hexdigest()
-
-    payload = {
-        "data": [{
-            "event_name": event_name,
-            "event_id": event_id,
-            "event_time": int(time.time()),
-            "action_source": "website",
-            "event_source_url": CURRENT_URL,
-            "user_data": hashed_user_data
-        }],
-        "access_token": META_ACCESS_TOKEN
-    }
-    
-    try:
-        requests.post(url, json=payload, timeout=2)
-    except Exception:
-        pass
+    get_event_buffer(META_PIXEL_ID).add({
+        "event_name": event_name,
+        "event_id": event_id,
+        "event_time": int(time.time()),
+        "action_source": "website",
+        "event_source_url": CURRENT_URL,
+        "user_data": dict(user_data or {})
+    })
     
     return event_id
 
 # ==============================
 # 유틸리티 함수
 # ==============================
-def _digits_only(s: str) -> str:
-    return re.sub(r"[^0-9]", "", str(s) if s else "")
-
-def format_phone(d: str) -> str:
-    if len(d) == 11 and d.startswith("010"):
-        return f"{d[0:3]}-{d[3:7]}-{d[7:11]}"
-    return d
-
 def save_to_sheet(data: dict) -> dict:
     """
     [핵심 수정] 양방향 전송 로직
@@ -154,23 +136,18 @@ def save_to_sheet(data: dict) -> dict:
     """
     data['token'] = API_TOKEN
     
-    # 1. [필수] 기존 시트 전송
-    try:
-        resp_old = requests.post(GAS_URL_OLD, json=data, timeout=10)
-        # 기존 시트가 실패하면 에러 리턴 (안전장치)
-        if resp_old.status_code != 200:
-            return {"status": "error", "message": "Old Sheet Error"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    # 1. [필수] 기존 시트 전송 (GAS 장애 시 로컬 대기열 저장 → {"status": "pending"})
+    ok, _, resp_old, err = json_write(GAS_URL_OLD, data)
+    # 기존 시트가 실패하면 에러 리턴 (안전장치)
+    if not ok:
+        return {"status": "error", "message": err or "Old Sheet Error"}
 
     # 2. [선택] 신규 CRM 시트 전송 (여기가 방금 주신 주소로 쏩니다)
-    try:
-        requests.post(GAS_URL_CRM, json=data, timeout=5)
-    except Exception:
-        pass # CRM 에러는 무시 (사용자 화면엔 성공으로 표시)
+    # CRM 에러는 무시 (사용자 화면엔 성공으로 표시), 대기 시간은 최대 5초
+    json_write(GAS_URL_CRM, data, timeout=5)
 
     # 3. 최종 성공 반환
-    return resp_old.json()
+    return resp_old
 
 # ==============================
 # 메인 함수
@@ -229,27 +206,25 @@ def main():
     
     if 'utm_params' not in st.session_state:
         st.session_state.utm_params = get_utm_params()
+        # 세션 첫 실행 1회만 조회 기록 (UTM은 세션에 보관해 신청 시 재사용)
+        record_touchpoint("view", utm=st.session_state.utm_params)
 
-    if not st.session_state.get('page_view_fired'):
-        if not st.session_state.form_submitted:
-            inject_facebook_pixel("PageView")
-            st.session_state.page_view_fired = True
+    ledger = get_event_ledger()
+    if not st.session_state.form_submitted:
+        event_id = ledger.claim("PageView", "pixel")
+        if event_id:
+            inject_facebook_pixel("PageView", event_id=event_id)
     
     # [화면 1] 완료 화면
     if st.session_state.form_submitted:
-        if not st.session_state.get('lead_pixel_fired', False):
-            event_id = str(uuid.uuid4())
+        # 접수번호별 Lead 1건 - 브라우저/서버가 같은 event_id로 보내 Meta에서 중복 제거
+        lead_key = st.session_state.get('last_receipt_no', '')
+        event_id = ledger.claim("Lead", "pixel", lead_key)
+        if event_id:
             inject_facebook_pixel("Lead", event_id=event_id)
-            
-            user_phone = st.session_state.get('submitted_phone', '')
-            user_name = st.session_state.get('submitted_name', '')
-            
-            capi_data = {}
-            if user_phone: capi_data['phone'] = user_phone
-            if user_name: capi_data['name'] = user_name
-            
-            send_meta_event("Lead", capi_data, event_id=event_id)
-            st.session_state.lead_pixel_fired = True
+        event_id = ledger.claim("Lead", "capi", lead_key)
+        if event_id:
+            send_meta_event("Lead", st.session_state.get('capi_user_data'), event_id=event_id)
             
         st.success("✅ 신청이 정상적으로 접수되었습니다!")
         
@@ -263,10 +238,9 @@ def main():
         
         if st.button("새로운 상담 신청하기"):
             st.session_state.form_submitted = False
-            st.session_state.lead_pixel_fired = False
-            st.session_state.page_view_fired = False
             st.session_state.submitted_phone = ''
             st.session_state.submitted_name = ''
+            st.session_state.capi_user_data = None
             st.rerun()
 
         st.markdown("""
@@ -306,7 +280,11 @@ def main():
         else:
             with st.spinner("접수 중입니다..."):
                 formatted_phone = format_phone(phone_digits)
-                receipt_no = f"YP{datetime.now().strftime('%m%d')}{random.randint(1000,9999)}"
+                try:
+                    receipt_no = allocate_receipt_no()
+                except ReceiptUnavailableError:
+                    st.error("❌ 일시적으로 접수가 지연되고 있습니다. 잠시 후 다시 시도해주세요.")
+                    st.stop()
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 
                 utm = st.session_state.utm_params
@@ -327,12 +305,16 @@ def main():
                 }
                 
                 save_to_sheet(data)
+                record_touchpoint("lead", receipt_no, utm)
                 
                 st.session_state.form_submitted = True
                 st.session_state.last_receipt_no = receipt_no
                 st.session_state.submitted_phone = phone_digits
                 st.session_state.submitted_name = name
-                st.session_state.lead_pixel_fired = False 
+                # CAPI 식별 정보는 제출 시 1회 정규화/해시 → 이후 이벤트는 재사용
+                st.session_state.capi_user_data = hashed_user_data(
+                    phone=phone_digits, name=name, external_id=receipt_no
+                )
                 st.rerun()
 
     st.markdown("""
@@ -344,4 +326,7 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        startup_timing.report_once("landing")
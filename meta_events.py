@@ -0,0 +1,313 @@
+"""
+유아플랜 Meta 전환 API(CAPI) 이벤트 버퍼
+- 랜딩 세션은 이벤트를 메모리 버퍼에 넣기만 함 (요청 처리 중 네트워크 I/O 없음)
+- 백그라운드 플러셔가 모든 세션의 이벤트를 모아 Graph API 요청 1건당 최대 1,000건 전송
+- 전송 실패 이벤트는 로컬 SQLite(meta_events)에 보관 후 지수 백오프로 재전송
+- Graph API가 요청을 4xx로 거부하면 배치를 반씩 나눠 다시 보내 거부된 이벤트만 버림 (나머지는 전송/재전송)
+- 프로세스 종료 시 버퍼에 남은 이벤트도 디스크에 보관 → 재시작 후 전송
+- 여러 워커 프로세스가 같은 파일을 공유 → 행 단위 선점(claimed_until)으로 중복 전송 방지
+- EventLedger: 세션의 논리 이벤트(PageView, 접수번호별 Lead)마다 event_id 1개를 픽셀/CAPI가 공유,
+  채널별 1회만 발송 (Streamlit 재실행 시 재발송 없음). 버퍼도 최근 event_id 중복을 한 번 더 거름
+"""
+
+from __future__ import annotations
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from config_loader import get_config
+from receipt_allocator import STATE_DB_PATH
+
+GRAPH_API_VERSION = "v18.0"
+MAX_BATCH = 1000           # Graph API 요청 1건당 이벤트 수 상한
+FLUSH_INTERVAL = 2.0       # 플러셔 주기 (초) - 버퍼가 MAX_BATCH에 차면 즉시
+MAX_BUFFER = 50000         # 메모리 버퍼 상한 (초과분은 바로 디스크 보관)
+MAX_ATTEMPTS = 10
+MAX_BACKOFF = 900
+CLAIM_SECONDS = 120
+MAX_EVENT_AGE = 7 * 24 * 3600   # Meta는 7일 지난 event_time이 하나라도 있으면 요청 전체를 거부
+RECENT_IDS_MAX = 10000     # 버퍼 측 event_id 중복 확인 범위
+# 4xx여도 이벤트 내용과 무관한 거부 (인증/토큰/요청 한도) → 나누지 않고 배치 전체 재전송
+NON_EVENT_STATUSES = frozenset({401, 403, 429})
+TOKEN_ERROR_CODES = frozenset({190})
+
+DDL = """
+CREATE TABLE IF NOT EXISTS meta_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  pixel_id TEXT NOT NULL,
+  event TEXT NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at REAL NOT NULL,
+  claimed_until REAL NOT NULL DEFAULT 0,
+  last_error TEXT,
+  created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_meta_events_due ON meta_events(next_attempt_at);
+"""
+
+
+class EventLedger:
+    """세션 1개의 이벤트 장부: (이벤트명, 키) → event_id + 채널(pixel/capi)별 발송 여부"""
+
+    def __init__(self):
+        self._events: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def event_id(self, name: str, key: str = "") -> str:
+        entry = self._events.setdefault((name, key), {"event_id": str(uuid4()), "fired": set()})
+        return entry["event_id"]
+
+    def claim(self, name: str, channel: str, key: str = "") -> Optional[str]:
+        """아직 이 채널로 보내지 않은 이벤트면 event_id 반환 후 발송 처리, 이미 보냈으면 None"""
+        event_id = self.event_id(name, key)
+        fired = self._events[(name, key)]["fired"]
+        if channel in fired:
+            return None
+        fired.add(channel)
+        return event_id
+
+
+class EventBuffer:
+    """CAPI 이벤트 버퍼 + 백그라운드 플러셔 (프로세스 공유)"""
+
+    def __init__(self, pixel_id: str, db_path: str = STATE_DB_PATH):
+        self.pixel_id = pixel_id
+        self.db_path = db_path
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._recent_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._stats = {"queued": 0, "sent": 0, "spooled": 0, "dropped": 0, "duplicates": 0, "batches": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        conn.executescript(DDL)
+        return conn
+
+    @property
+    def endpoint(self) -> str:
+        return f"https://graph.facebook.com/{GRAPH_API_VERSION}/{self.pixel_id}/events"
+
+    # ---------- 세션 측 ----------
+    def add(self, event: Dict[str, Any]) -> None:
+        """이벤트 1건 추가 (즉시 반환, 최근에 받은 event_id면 무시)"""
+        event_id = event.get("event_id")
+        with self._lock:
+            if event_id:
+                if event_id in self._recent_ids:
+                    self._stats["duplicates"] += 1
+                    return
+                self._recent_ids[event_id] = None
+                if len(self._recent_ids) > RECENT_IDS_MAX:
+                    self._recent_ids.popitem(last=False)
+            overflow = len(self._buffer) >= MAX_BUFFER
+            if not overflow:
+                self._buffer.append(event)
+                self._stats["queued"] += 1
+                full = len(self._buffer) >= MAX_BATCH
+        if overflow:
+            self._spool([event], attempts=0, error="buffer full")
+            return
+        self.start_worker()
+        if full:
+            self._wake.set()
+
+    # ---------- 디스크 보관 ----------
+    def _spool(self, events: List[Dict[str, Any]], attempts: int, error: Optional[str]) -> None:
+        if not events:
+            return
+        backoff = min(MAX_BACKOFF, 5 * 2 ** attempts) if attempts else 0
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT INTO meta_events (pixel_id, event, attempts, next_attempt_at, last_error, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.pixel_id, json.dumps(e, ensure_ascii=False), attempts, now + backoff, error, now) for e in events]
+            )
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats["spooled"] += len(events)
+
+    def _claim(self, limit: int) -> List[Tuple[int, str, int]]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT id, event, attempts FROM meta_events "
+                "WHERE pixel_id = ? AND next_attempt_at <= ? AND claimed_until < ? ORDER BY id LIMIT ?",
+                (self.pixel_id, now, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE meta_events SET claimed_until = ? WHERE id = ?",
+                [(now + CLAIM_SECONDS, row[0]) for row in rows]
+            )
+            conn.execute('COMMIT')
+            return rows
+        finally:
+            conn.close()
+
+    def _settle(self, rows: List[Tuple[int, str, int]], ok: bool, error: Optional[str]) -> None:
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            if ok:
+                conn.executemany("DELETE FROM meta_events WHERE id = ?", [(row[0],) for row in rows])
+                return
+            retry = [r for r in rows if r[2] + 1 < MAX_ATTEMPTS]
+            conn.executemany("DELETE FROM meta_events WHERE id = ?", [(r[0],) for r in rows if r[2] + 1 >= MAX_ATTEMPTS])
+            conn.executemany(
+                "UPDATE meta_events SET attempts = ?, next_attempt_at = ?, last_error = ?, claimed_until = 0 WHERE id = ?",
+                [(r[2] + 1, time.time() + min(MAX_BACKOFF, 5 * 2 ** (r[2] + 1)), error, r[0]) for r in retry]
+            )
+        finally:
+            conn.close()
+
+    # ---------- 전송 ----------
+    def _post(self, events: List[Dict[str, Any]]) -> Tuple[bool, Optional[str], bool]:
+        """→ (성공, 오류, 거부 여부) - 거부: 이벤트 내용 때문에 Graph API가 4xx로 거부 (재전송해도 같음)"""
+        from request_helper import json_post
+        access_token = get_config().META_ACCESS_TOKEN
+        if not access_token:
+            return False, "META_ACCESS_TOKEN not set", False
+        ok, status, data, err = json_post(self.endpoint, {"data": events, "access_token": access_token}, retries=0)
+        if ok:
+            return True, None, False
+        error = (data.get("error") or {}) if isinstance(data, dict) else {}
+        rejected = (status is not None and 400 <= status < 500 and status not in NON_EVENT_STATUSES
+                    and error.get("code") not in TOKEN_ERROR_CODES)
+        return False, error.get("message") or err, rejected
+
+    def _deliver(self, items: List[Tuple[Dict[str, Any], Any]]) -> Tuple[list, list, list, Optional[str]]:
+        """(이벤트, 보관 행 또는 None) 목록 전송 → (보낸 항목, 거부된 항목, 실패 항목, 오류)
+        거부(4xx)면 반씩 나눠 다시 보내 거부된 이벤트만 골라냄"""
+        try:
+            ok, error, rejected = self._post([e for e, _ in items])
+        except Exception as e:
+            ok, error, rejected = False, f"{type(e).__name__}: {e}", False
+        if ok:
+            return items, [], [], None
+        if not rejected:
+            return [], [], items, error
+        if len(items) == 1:
+            return [], items, [], error
+        mid = len(items) // 2
+        left, right = self._deliver(items[:mid]), self._deliver(items[mid:])
+        # 오류 문구는 재전송 대상(실패) 쪽 우선
+        error = next((part[3] for part in (left, right) if part[2]), None) or left[3] or right[3]
+        return left[0] + right[0], left[1] + right[1], left[2] + right[2], error
+
+    def _keep(self, events: List[Dict[str, Any]], error: Optional[str]) -> None:
+        # 전송 못 한 버퍼 이벤트 보관 (디스크도 실패하면 버퍼 앞에 되돌림 → 다음 플러시에서 재시도)
+        try:
+            self._spool(events, attempts=1, error=error)
+        except sqlite3.Error:
+            with self._lock:
+                self._buffer.extendleft(reversed(events[:max(0, MAX_BUFFER - len(self._buffer))]))
+
+    def flush(self) -> Dict[str, int]:
+        """버퍼 + 전송 시기가 된 보관 이벤트를 MAX_BATCH 단위로 전송 → {"sent", "failed", "dropped"}"""
+        counts = {"sent": 0, "failed": 0, "dropped": 0}
+        while True:
+            with self._lock:
+                fresh = [self._buffer.popleft() for _ in range(min(MAX_BATCH, len(self._buffer)))]
+            try:
+                rows = self._claim(MAX_BATCH - len(fresh)) if len(fresh) < MAX_BATCH else []
+            except sqlite3.Error as e:
+                self._keep(fresh, f"claim failed: {e}")
+                counts["failed"] += len(fresh)
+                return counts
+            if not fresh and not rows:
+                return counts
+
+            # 7일 지난 이벤트는 요청 전체를 실패시키므로 제외
+            cutoff = time.time() - MAX_EVENT_AGE
+            items = [(e, None) for e in fresh] + [(json.loads(row[1]), row) for row in rows]
+            expired = [row for e, row in items if row is not None and e.get("event_time", 0) < cutoff]
+            live = [(e, row) for e, row in items if e.get("event_time", 0) >= cutoff]
+
+            sent, rejected, failed, error = self._deliver(live) if live else ([], [], [], None)
+            if rejected:
+                print(f"[WARN] Meta CAPI rejected {len(rejected)} event(s): {error}")
+            self._keep([e for e, row in failed if row is None], error)
+            try:
+                self._settle(expired + [row for _, row in sent + rejected if row is not None], True, None)
+                self._settle([row for _, row in failed if row is not None], False, error)
+            except sqlite3.Error:
+                pass   # 선점(claimed_until)이 풀리면 다음 플러시에서 다시 처리
+            dropped = len(items) - len(live) + len(rejected)
+            with self._lock:
+                self._stats["dropped"] += dropped
+                self._stats["batches"] += 1
+                self._stats["sent"] += len(sent)
+            counts["dropped"] += dropped
+            counts["sent"] += len(sent)
+            if failed:
+                counts["failed"] += len(failed)
+                return counts
+
+    def spool_pending(self) -> None:
+        """버퍼에 남은 이벤트를 디스크로 (프로세스 종료 시)"""
+        with self._lock:
+            pending = list(self._buffer)
+            self._buffer.clear()
+        try:
+            self._spool(pending, attempts=0, error=None)
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats, buffered=len(self._buffer))
+        conn = self._connect()
+        try:
+            stats["on_disk"] = conn.execute(
+                "SELECT COUNT(*) FROM meta_events WHERE pixel_id = ?", (self.pixel_id,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return stats
+
+    # ---------- 백그라운드 워커 ----------
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def start_worker(self) -> None:
+        """프로세스당 1개 워커 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="meta-capi", daemon=True)
+            self._worker.start()
+
+
+_buffers: Dict[str, EventBuffer] = {}
+_buffers_lock = threading.Lock()
+
+
+def get_event_buffer(pixel_id: str) -> EventBuffer:
+    """픽셀별 공용 버퍼 (이전 프로세스가 남긴 보관 이벤트가 있으면 바로 워커 시작)"""
+    with _buffers_lock:
+        buffer = _buffers.get(pixel_id)
+        if buffer is None:
+            buffer = _buffers[pixel_id] = EventBuffer(pixel_id)
+            atexit.register(buffer.spool_pending)
+            if buffer.stats()["on_disk"]:
+                buffer.start_worker()
+        return buffer
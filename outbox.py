@@ -0,0 +1,180 @@
+"""
+유아플랜 GAS 쓰기 대기열 (outbox)
+- GAS 서킷이 열렸거나 연결이 안 될 때 쓰기 요청을 로컬 SQLite에 보관
+- 백그라운드 워커가 주기적으로 재전송 (서킷이 열려 있으면 건너뜀, 실패 시 지수 백오프)
+- HTTP 2xx여도 GAS 본문이 실패({"status": "error"}, {"ok": false}, 예외 페이지)면 삭제하지 않고 재시도
+- 재전송은 본문이 서버에 닿지 않은 실패(서킷 열림, 연결 단계 실패)와 GAS가 실패를 응답한 경우만
+  응답 시간 초과/전송 후 끊김/HTTP 오류는 GAS가 이미 기록했을 수 있으므로 dead로 보관 (중복 행 방지, 수동 확인)
+- 여러 워커 프로세스가 같은 파일을 공유 → 행 단위 선점(claimed_until)으로 중복 전송 방지
+- 접수번호 발급기와 같은 로컬 상태 파일 사용 (SURVEY_STATE_DB_PATH)
+"""
+
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from receipt_allocator import STATE_DB_PATH
+
+FLUSH_INTERVAL = 10.0      # 워커 주기 (초)
+FLUSH_BATCH = 50
+CLAIM_SECONDS = 120        # 선점 후 이 시간 안에 결과가 없으면 다른 프로세스가 재시도
+MAX_ATTEMPTS = 20          # GAS가 계속 실패를 응답하면 dead로 보관
+MAX_BACKOFF = 600
+
+DDL = """
+CREATE TABLE IF NOT EXISTS outbox (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  url TEXT NOT NULL,
+  payload TEXT NOT NULL,
+  headers TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'queued',   -- queued | dead
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at REAL NOT NULL,
+  claimed_until REAL NOT NULL DEFAULT 0,
+  last_error TEXT,
+  created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+"""
+
+
+class Outbox:
+    """SQLite 기반 쓰기 대기열"""
+
+    def __init__(self, db_path: str = STATE_DB_PATH):
+        self.db_path = db_path
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        conn.executescript(DDL)
+        return conn
+
+    def enqueue(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> int:
+        now = time.time()
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "INSERT INTO outbox (url, payload, headers, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (url, json.dumps(payload, ensure_ascii=False), json.dumps(headers or {}), now, now)
+            )
+            outbox_id = cur.lastrowid
+        finally:
+            conn.close()
+        self.start_worker()
+        return outbox_id
+
+    def _claim(self, limit: int) -> List[Tuple[int, str, str, str, int]]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT id, url, payload, headers, attempts FROM outbox "
+                "WHERE status = 'queued' AND next_attempt_at <= ? AND claimed_until < ? "
+                "ORDER BY id LIMIT ?",
+                (now, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET claimed_until = ? WHERE id = ?",
+                [(now + CLAIM_SECONDS, row[0]) for row in rows]
+            )
+            conn.execute('COMMIT')
+            return rows
+        finally:
+            conn.close()
+
+    def flush(self, limit: int = FLUSH_BATCH) -> Dict[str, int]:
+        """전송 시기가 된 요청 재전송 → {"sent", "failed", "deferred", "dead"}"""
+        from request_helper import CIRCUIT_OPEN_ERROR, OPEN_SECONDS, gas_error, json_send
+
+        counts = {"sent": 0, "failed": 0, "deferred": 0, "dead": 0}
+        rows = self._claim(limit)
+        if not rows:
+            return counts
+
+        updates = []
+        delivered = []
+        for outbox_id, url, payload, headers, attempts in rows:
+            # 서킷이 열려 있으면 요청 없이 즉시 CIRCUIT_OPEN_ERROR (half-open이면 시험 전송)
+            (ok, _, data, err), undelivered = json_send(url, json.loads(payload), headers=json.loads(headers))
+            if ok:
+                err = gas_error(data)
+            if ok and err is None:
+                delivered.append((outbox_id,))
+                counts["sent"] += 1
+            elif err == CIRCUIT_OPEN_ERROR:
+                updates.append((attempts, time.time() + OPEN_SECONDS, 'queued', err, outbox_id))
+                counts["deferred"] += 1
+            elif not (ok or undelivered):
+                # 본문이 GAS에 닿았을 수 있음 → 재전송하지 않음
+                updates.append((attempts + 1, time.time(), 'dead', err, outbox_id))
+                counts["dead"] += 1
+            else:
+                attempts += 1
+                status = 'dead' if attempts >= MAX_ATTEMPTS else 'queued'
+                backoff = min(MAX_BACKOFF, 5 * 2 ** attempts)
+                updates.append((attempts, time.time() + backoff, status, err, outbox_id))
+                counts["failed"] += 1
+
+        conn = self._connect()
+        try:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", delivered)
+            conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, status = ?, last_error = ?, claimed_until = 0 "
+                "WHERE id = ?",
+                updates
+            )
+        finally:
+            conn.close()
+        return counts
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        counts = {"queued": 0, "dead": 0}
+        counts.update(dict(rows))
+        return counts
+
+    # ---------- 백그라운드 워커 ----------
+    def _run(self) -> None:
+        while True:
+            try:
+                while self.flush()["sent"]:
+                    pass
+            except Exception:
+                pass
+            time.sleep(FLUSH_INTERVAL)
+
+    def start_worker(self) -> None:
+        """프로세스당 1개 워커 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="gas-outbox", daemon=True)
+            self._worker.start()
+
+
+_default_outbox: Optional[Outbox] = None
+_default_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """프로세스 공용 대기열"""
+    global _default_outbox
+    with _default_lock:
+        if _default_outbox is None:
+            _default_outbox = Outbox()
+            # 이전 프로세스가 남긴 대기 요청이 있으면 바로 워커 시작
+            if _default_outbox.stats()["queued"]:
+                _default_outbox.start_worker()
+    return _default_outbox
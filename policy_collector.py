@@ -2,151 +2,106 @@
 유아플랜 정책자금 자동 수집 시스템 v3 (실사용 스KE치)
 - 기존 테스트용 스크립트를 "테스트 모드"와 "수집 모드"로 분리
 - 수집 모드: 기업마당(Bizinfo) / K-Startup 공고 메타데이터 수집 → 정규화 → SQLite upsert 저장
-- 향후 첨부 파싱/알림 모듈을 붙일 수 있도록 훅 제공
-
-필요 패키지: requests, python-dotenv, beautifulsoup4
-데이터베이스: 기본 SQLite (./policy.db) — 추후 PostgreSQL로 교체 가능
+- 향후 첨부 파싱/알림 모듈을 붙일 수 있도록 훅 제공 (collect_once(on_changes=...))
+- 수집 모드: 신규/마감 변경 공고를 구독 규칙으로 평가해 텔레그램 다이제스트 전송 (program_alerts)
+- 소스별 필드 매핑은 program_sources의 선언적 spec (페이지 단위 일괄 정규화, JSON 소스는 설정 파일로 추가)
+- 수집 후 중복 묶음: 소스 간/재게시 공고를 MinHash+LSH로 묶어 cluster_id 저장 (program_dedup, 변경분만 처리)
+- 정리 모드(sweep): 마감 지난 공고 closed 처리 + 마감 임박 공고 출력 (cron 등으로 주기 실행, 수집 후에도 1회 실행)
+
+필요 패키지: requests, beautifulsoup4 (python-dotenv 선택 - .env 사용 시)
+데이터베이스: 기본 SQLite (./policy.db), POLICY_DB_URL 설정 시 PostgreSQL (psycopg2 필요, COPY 일괄 적재)
 """
 
 from __future__ import annotations
-import os
 import json
+import re
 import time
 import argparse
-import hashlib
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
 from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-
-load_dotenv()  # .env 파일 로드
-
-# === ENV ===
-BIZINFO_API_KEY = os.getenv('BIZINFO_API_KEY')
-KSTARTUP_API_KEY = os.getenv('KSTARTUP_API_KEY')  # 데이터포털/공식키 사용
-ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
-DB_PATH = os.getenv('POLICY_DB_PATH', 'policy.db')
-
-# === 공통 스키마 ===
-NORMALIZED_FIELDS = [
-    'program_id', 'title', 'summary', 'field', 'target', 'region', 'org',
-    'apply_from', 'apply_to', 'url', 'contact', 'benefit', 'reqs',
-    'source', 'attachments'
-]
-
-# === DB 유틸 ===
-DDL = """
-CREATE TABLE IF NOT EXISTS programs (
-  program_id TEXT PRIMARY KEY,        -- hash(title+org+apply_to)
-  title TEXT,
-  summary TEXT,
-  field TEXT,
-  target TEXT,
-  region TEXT,
-  org TEXT,
-  apply_from TEXT,
-  apply_to TEXT,
-  url TEXT,
-  contact TEXT,
-  benefit TEXT,
-  reqs TEXT,
-  source TEXT,
-  attachments TEXT,                   -- JSON 배열 문자열
-  created_at TEXT DEFAULT (datetime('now')),
-  updated_at TEXT DEFAULT (datetime('now'))
-);
-CREATE INDEX IF NOT EXISTS idx_programs_apply_to ON programs(apply_to);
-CREATE INDEX IF NOT EXISTS idx_programs_org ON programs(org);
-"""
+
+from config_loader import get_config
+from policy_store import (
+    CHANGE_INSERT, PROGRAM_FIELDS, SQLITE_UPSERT, ProgramStore, SQLiteProgramStore,
+    content_hash, date_columns, make_program_id, new_run_id, open_store, parse_dates, program_row,
+)
+from program_dedup import dedupe, dedupe_changes
+from program_sources import BUILTIN, bench, extract_items, load_sources, normalize_batch, normalize_one
+
+# === ENV (config_loader: 환경변수 → .env → 기본값) ===
+_cfg = get_config()
+BIZINFO_API_KEY = _cfg.BIZINFO_API_KEY or None
+KSTARTUP_API_KEY = _cfg.KSTARTUP_API_KEY or None  # 데이터포털/공식키 사용
+ANTHROPIC_API_KEY = _cfg.ANTHROPIC_API_KEY or None
+OPENAI_API_KEY = _cfg.OPENAI_API_KEY or None
+GEMINI_API_KEY = _cfg.GEMINI_API_KEY or None
+TELEGRAM_BOT_TOKEN = _cfg.TELEGRAM_BOT_TOKEN or None
+TELEGRAM_CHAT_ID = _cfg.TELEGRAM_CHAT_ID or None
+DB_PATH = _cfg.POLICY_DB_PATH
+
+# === 공통 스키마 / 저장소 (policy_store: SQLite 기본, POLICY_DB_URL 설정 시 PostgreSQL) ===
+NORMALIZED_FIELDS = PROGRAM_FIELDS
+UPSERT_BATCH_SIZE = 500
+
 
 def db_connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute('PRAGMA journal_mode=WAL;')
-    conn.execute('PRAGMA synchronous=NORMAL;')
-    conn.executescript(DDL)
-    return conn
+    """SQLite 직접 연결 (기존 호환)"""
+    return SQLiteProgramStore(DB_PATH).connect()
 
 
 def upsert_program(conn: sqlite3.Connection, item: Dict[str, Any]) -> None:
-    # attachments를 JSON 문자열로 보관
-    attachments_json = json.dumps(item.get('attachments', []), ensure_ascii=False)
-    item = {**item, 'attachments': attachments_json}
-    cols = ','.join(NORMALIZED_FIELDS)
-    placeholders = ','.join(['?'] * len(NORMALIZED_FIELDS))
-    values = [item.get(k) for k in NORMALIZED_FIELDS]
-    sql = f"INSERT INTO programs ({cols}) VALUES ({placeholders})\n"
-    sql += "ON CONFLICT(program_id) DO UPDATE SET\n"
-    sql += ",".join([f"{k}=excluded.{k}" for k in NORMALIZED_FIELDS if k != 'program_id'])
-    conn.execute(sql, values)
-    # debug minimal
-    # print(f"[UPSERT] {item.get('title')} | {item.get('org')}")
+    """SQLite 단건 upsert (기존 호환 - 수집은 store.upsert_many 배치 사용, 변경 로그 미기록)"""
+    row = program_row(item)
+    conn.execute(SQLITE_UPSERT, row + [content_hash(row)] + date_columns(row))
+
+
+def store_items(store: ProgramStore, items: List[Dict[str, Any]], label: str, run_id: str) -> List[Dict[str, Any]]:
+    """UPSERT_BATCH_SIZE 단위 일괄 저장 → 변경 목록 (내용이 같은 공고는 제외)
+    배치 실패 시 건별 재시도로 문제 공고만 제외"""
+    changes: List[Dict[str, Any]] = []
+    for i in range(0, len(items), UPSERT_BATCH_SIZE):
+        batch = items[i:i + UPSERT_BATCH_SIZE]
+        try:
+            changes.extend(store.upsert_many(batch, run_id))
+            continue
+        except Exception as e:
+            print(f"[WARN] upsert {label} batch failed, retrying one by one: {e}")
+        for item in batch:
+            try:
+                changes.extend(store.upsert_many([item], run_id))
+            except Exception as e:
+                print(f"[ERROR] upsert {label}: {e} -> {item.get('title')}")
+    return changes
 
 
 # === 해시/정규화 ===
 
-def make_program_id(title: str, org: str, apply_to: str | None) -> str:
-    base = f"{(title or '').strip()}|{(org or '').strip()}|{(apply_to or '').strip()}"
-    return hashlib.sha256(base.encode('utf-8')).hexdigest()[:32]
+# RSS 본문의 "신청기간 : 2026.01.02 ~ 2026.02.27" 형태 (RSS 항목에는 접수기간 필드가 없음)
+_RSS_PERIOD_RE = re.compile(r'(?:신청|접수|모집)\s*기간\s*[:：]?\s*([^<\n]{6,60})')
 
 
-def normalize_bizinfo(raw: Dict[str, Any]) -> Dict[str, Any]:
-    # Bizinfo JSON 혹은 XML 파싱 결과를 공통 스키마로 맵핑
-    title = raw.get('title') or raw.get('titl') or raw.get('PBLANC_TITLE_NM')
-    org = raw.get('instNm') or raw.get('PBLANC_INST_NM') or raw.get('institution') or raw.get('org') or raw.get('author')
-    url = raw.get('link') or raw.get('url') or raw.get('PBLANC_URL')
-    apply_from = raw.get('startDate') or raw.get('RCEPT_BGNDE')
-    apply_to = raw.get('endDate') or raw.get('RCEPT_ENDDE')
-    item = {
-        'program_id': make_program_id(title, org, apply_to),
-        'title': title,
-        'summary': raw.get('summary') or raw.get('cn') or raw.get('SUMMARY'),
-        'field': raw.get('field') or raw.get('INDUTY_NM'),
-        'target': raw.get('target') or raw.get('TRGET_NM'),
-        'region': raw.get('region') or raw.get('RDNMADR') or raw.get('AREA_NM'),
-        'org': org,
-        'apply_from': apply_from,
-        'apply_to': apply_to,
-        'url': url,
-        'contact': raw.get('contact') or raw.get('CHARGER_TELNO'),
-        'benefit': raw.get('benefit') or raw.get('SUPLY_SCALE_NM'),
-        'reqs': raw.get('reqs') or raw.get('REQ_CN'),
-        'source': 'bizinfo',
-        'attachments': raw.get('attachments') or []
+def rss_period(text: str | None) -> Dict[str, str]:
+    """RSS 설명문 → {'RCEPT_BGNDE', 'RCEPT_ENDDE'} (기간 문구가 없으면 빈 문자열)"""
+    m = _RSS_PERIOD_RE.search(text or '')
+    dates = parse_dates(m.group(1)) if m else []
+    return {
+        'RCEPT_BGNDE': dates[0].isoformat() if dates else '',
+        'RCEPT_ENDDE': dates[-1].isoformat() if len(dates) > 1 else '',
     }
-    return item
+
+
+def normalize_bizinfo(raw: Dict[str, Any]) -> Dict[str, Any]:
+    # Bizinfo JSON 혹은 XML 파싱 결과를 공통 스키마로 맵핑 (단건 - 수집은 normalize_batch 사용)
+    return normalize_one(BUILTIN['bizinfo'], raw)
 
 
 def normalize_kstartup(raw: Dict[str, Any]) -> Dict[str, Any]:
-    title = raw.get('PBLANC_TITLE_NM') or raw.get('title')
-    org = raw.get('PBLANC_INST_NM') or raw.get('org')
-    url = raw.get('PBLANC_URL') or raw.get('url')
-    apply_from = raw.get('RCEPT_BGNDE') or raw.get('apply_from')
-    apply_to = raw.get('RCEPT_ENDDE') or raw.get('apply_to')
-    item = {
-        'program_id': make_program_id(title, org, apply_to),
-        'title': title,
-        'summary': raw.get('PBLANC_SUMRY') or raw.get('summary'),
-        'field': raw.get('INDUTY_NM') or raw.get('field'),
-        'target': raw.get('TRGET_NM') or raw.get('target'),
-        'region': raw.get('AREA_NM') or raw.get('region'),
-        'org': org,
-        'apply_from': apply_from,
-        'apply_to': apply_to,
-        'url': url,
-        'contact': raw.get('CHARGER_TELNO') or raw.get('contact'),
-        'benefit': raw.get('SUPLY_SCALE_NM') or raw.get('benefit'),
-        'reqs': raw.get('REQ_CN') or raw.get('reqs'),
-        'source': 'kstartup',
-        'attachments': raw.get('attachments') or []
-    }
-    return item
+    return normalize_one(BUILTIN['kstartup'], raw)
 
 
 # === 수집기 ===
@@ -164,13 +119,7 @@ def fetch_bizinfo(page: int = 1, rows: int = 50) -> List[Dict[str, Any]]:
     r.raise_for_status()
     ct = (r.headers.get('content-type') or '').lower()
     if 'json' in ct:
-        data = r.json()
-        items = data.get('items') or data.get('response') or data
-        if isinstance(items, dict) and 'item' in items:
-            items = items['item']
-        if not isinstance(items, list):
-            items = [items]
-        return items
+        return extract_items(r.json())
     else:
         # XML(RSS) 처리: 간단 파서
         soup = BeautifulSoup(r.text, 'xml')
@@ -182,8 +131,7 @@ def fetch_bizinfo(page: int = 1, rows: int = 50) -> List[Dict[str, Any]]:
                 'summary': it.findtext('description'),
                 'org': it.findtext('author') or it.findtext('dc:creator') or '',
                 'author': it.findtext('author') or '',
-                'RCEPT_BGNDE': '',
-                'RCEPT_ENDDE': ''
+                **rss_period(it.findtext('description')),
             })
         return items
 
@@ -204,54 +152,93 @@ def fetch_kstartup(page: int = 1, rows: int = 50) -> List[Dict[str, Any]]:
     r = requests.get(url, params=params, timeout=15)
     if r.status_code != 200:
         return []
-    data = r.json()
-    items = data.get('items') or data.get('response') or data
-    if isinstance(items, dict) and 'item' in items:
-        items = items['item']
-    if not isinstance(items, list):
-        items = [items]
-    return items
-
+    return extract_items(r.json())
 
-def collect_once() -> Dict[str, int]:
-    conn = db_connect()
-    new_cnt = upd_cnt = 0
 
-    # 1) Bizinfo
+def _collect_source(store: ProgramStore, label: str, fetch, normalize_page, run_id: str) -> Dict[str, Any]:
     try:
-        biz_items = fetch_bizinfo(page=1, rows=100)
-        print(f"[DEBUG] fetched bizinfo items: {len(biz_items)}")
+        raws = fetch(page=1, rows=100)
+        print(f"[DEBUG] fetched {label} items: {len(raws)}")
     except Exception as e:
-        print(f"[WARN] Bizinfo fetch failed: {e}")
-        biz_items = []
+        print(f"[WARN] {label} fetch failed: {e}")
+        return {"fetched": 0, "changes": []}
+    items = normalize_page(raws)
+    changes = store_items(store, items, label, run_id)
+    inserted = sum(1 for c in changes if c["change_type"] == CHANGE_INSERT)
+    print(f"[DEBUG] {label}: new {inserted}, updated {len(changes) - inserted}, unchanged {len(items) - len(changes)}")
+    return {"fetched": len(raws), "changes": changes}
+
+
+def collect_sources() -> Dict[str, Tuple[Callable[..., List[Any]], Callable[[List[Any]], List[Dict[str, Any]]]]]:
+    """수집 대상 {이름: (fetch(page, rows), 페이지 정규화)} - 내장 소스 + PROGRAM_SOURCES 플러그인"""
+    sources = {
+        "bizinfo": (fetch_bizinfo, lambda raws: normalize_batch(BUILTIN['bizinfo'], raws)),
+        "kstartup": (fetch_kstartup, lambda raws: normalize_batch(BUILTIN['kstartup'], raws)),
+    }
+    for source in load_sources():
+        if source.name in sources:
+            print(f"[WARN] 소스 이름 중복, 플러그인 무시: {source.name}")
+            continue
+        sources[source.name] = (source.fetch, source.normalize)
+    return sources
 
-    for raw in biz_items:
-        item = normalize_bizinfo(raw)
-        try:
-            upsert_program(conn, item)
-            new_cnt += 1  # 간단히 카운트(정확한 신규/갱신 구분은 변경 로그 테이블에서 관리 가능)
-        except Exception as e:
-            print(f"[ERROR] upsert bizinfo: {e} -> {item.get('title')}")
 
-    # 2) K-Startup
-    try:
-        ks_items = fetch_kstartup(page=1, rows=100)
-        print(f"[DEBUG] fetched kstartup items: {len(ks_items)}")
-    except Exception as e:
-        print(f"[WARN] K-Startup fetch failed: {e}")
-        ks_items = []
+def collect_once(on_changes: Optional[Callable[[ProgramStore, List[Dict[str, Any]]], Any]] = None) -> Dict[str, Any]:
+    """소스별 수집 → 배치 저장 (소스끼리 병렬 - PostgreSQL은 연결 풀로 동시 적재)
 
-    for raw in ks_items:
-        item = normalize_kstartup(raw)
+    on_changes(store, changes): 변경이 있으면 중복 묶음 갱신 후, 저장소를 닫기 전에 호출 (알림 등 후속 처리, 예외는 경고만)
+    반환: {"run_id", "<소스>": 수집 건수, "changes": 이번 실행의 변경 목록(program_changes와 동일),
+           "dedup": 중복 묶음 갱신 수, "on_changes": 훅 반환값, "sweep": 접수 기간 상태 갱신 수}
+    """
+    store = open_store()
+    run_id = new_run_id()
+    sources = collect_sources()
+    try:
+        with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="policy-collect") as executor:
+            futures = {
+                label: executor.submit(_collect_source, store, label, fetch, normalize_page, run_id)
+                for label, (fetch, normalize_page) in sources.items()
+            }
+            results = {label: future.result() for label, future in futures.items()}
+        stats: Dict[str, Any] = {"run_id": run_id, "changes": []}
+        for label, result in results.items():
+            stats[label] = result["fetched"]
+            stats["changes"].extend(result["changes"])
         try:
-            upsert_program(conn, item)
-            upd_cnt += 1
+            stats["dedup"] = dedupe_changes(store, stats["changes"])
         except Exception as e:
-            print(f"[ERROR] upsert kstartup: {e} -> {item.get('title')}")
+            print(f"[WARN] dedup failed: {e}")
+        if on_changes is not None and stats["changes"]:
+            try:
+                stats["on_changes"] = on_changes(store, stats["changes"])
+            except Exception as e:
+                print(f"[WARN] on_changes hook failed: {e}")
+        stats["sweep"] = store.sweep()
+    finally:
+        store.close()
+    return stats
+
+
+def sweep_once(closing_days: int = 7) -> Dict[str, Any]:
+    """접수 기간 상태 갱신 → {"closed", "opened", "closing": N일 내 마감 공고 목록}"""
+    store = open_store()
+    try:
+        stats: Dict[str, Any] = store.sweep()
+        stats["closing"] = store.open_programs(within_days=closing_days)
+    finally:
+        store.close()
+    return stats
+
 
-    conn.commit()
-    conn.close()
-    return {"bizinfo": len(biz_items), "kstartup": len(ks_items)}
+def send_program_alerts(store: ProgramStore, changes: List[Dict[str, Any]]) -> Dict[str, int]:
+    """collect_once 훅: 변경분 → 구독 규칙 평가 → 텔레그램 다이제스트"""
+    from program_alerts import dispatch
+    from telegram_notifier import TelegramNotifier
+
+    counts = dispatch(store, changes, TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID))
+    print(f"[DEBUG] alerts: events {counts['events']}, matched {counts['alerts']}, "
+          f"messages {counts['messages']}, failed {counts['failed']}")
+    return counts
 
 
 # === 테스트 유틸(기존 기능 유지) ===
@@ -305,7 +292,10 @@ def test_web_scraping():
 
 def main():
     parser = argparse.ArgumentParser(description='유아플랜 정책자금 수집기')
-    parser.add_argument('--mode', choices=['test', 'collect'], default='test')
+    parser.add_argument('--mode', choices=['test', 'collect', 'sweep', 'bench', 'dedup'], default='test')
+    parser.add_argument('--bench-rows', type=int, default=5000, help='bench 모드: 소스별 가짜 원문 건수')
+    parser.add_argument('--closing-days', type=int, default=7, help='sweep 모드: 마감 임박 기준 일수')
+    parser.add_argument('--no-alerts', action='store_true', help='수집 모드에서 공고 알림 전송 안 함')
     args = parser.parse_args()
 
     if args.mode == 'test':
@@ -317,8 +307,36 @@ def main():
     elif args.mode == 'collect':
         print("[MODE] collect")
         check_api_keys()
-        stats = collect_once()
-        print(f"\n✅ 수집 완료: {stats}")
+        alerts = not args.no_alerts and bool(TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID)
+        if not args.no_alerts and not alerts:
+            print("[INFO] TELEGRAM 설정 없음 - 공고 알림 생략")
+        stats = collect_once(on_changes=send_program_alerts if alerts else None)
+        counts = {k: v for k, v in stats.items() if k not in ("run_id", "changes", "dedup", "on_changes", "sweep")}
+        print(f"\n✅ 수집 완료: {counts} · 변경 {len(stats['changes'])}건 (run {stats['run_id']}) · "
+              f"중복 묶음 {stats.get('dedup')} · 상태 갱신 {stats['sweep']}")
+        return
+    elif args.mode == 'sweep':
+        print("[MODE] sweep")
+        stats = sweep_once(args.closing_days)
+        print(f"마감 처리 {stats['closed']}건 · 접수 시작 {stats['opened']}건")
+        print(f"\n⏰ {args.closing_days}일 내 마감 {len(stats['closing'])}건")
+        for p in stats['closing']:
+            print(f"  {p['apply_to_date']}  {p['title']} ({p['org'] or '-'})")
+        return
+    elif args.mode == 'dedup':
+        print("[MODE] dedup (묶음 없는 공고 처리)")
+        store = open_store()
+        try:
+            stats = dedupe(store, store.unclustered_ids())
+        finally:
+            store.close()
+        print(f"처리 {stats['processed']}건 · 묶임 {stats['clustered']}건 · 묶음 합침 {stats['merged']}건 · 묶음 해제 {stats['detached']}건")
+        return
+    elif args.mode == 'bench':
+        print("[MODE] bench (정규화 처리량, 최고 기록)")
+        for source, result in bench(rows=args.bench_rows).items():
+            print(f"  {source:<12} batch {result['batch_rows_per_sec']:>12,.0f} rows/s · "
+                  f"row {result['row_rows_per_sec']:>12,.0f} rows/s")
         return
     else:
         print(f"Unknown mode: {args.mode}")
@@ -0,0 +1,824 @@
+"""
+유아플랜 정책자금 공고 저장소 (policy_collector)
+- SQLiteProgramStore: 기본 (POLICY_DB_PATH), 배치 1건 = 트랜잭션 1개
+- PostgresProgramStore: POLICY_DB_URL(postgresql://...) 설정 시 사용
+  COPY로 임시 스테이징 테이블에 적재 → INSERT ... ON CONFLICT 1회로 병합
+  연결 풀(ThreadedConnectionPool) → 여러 수집 스레드/프로세스가 동시에 적재 가능
+- psycopg2는 선택 설치 (PostgreSQL 사용 시에만 필요)
+- open_store(): 설정에 따라 저장소 선택
+- 변경 로그: 공고별 content_hash 비교 → 내용이 같은 공고는 쓰기 생략,
+  신규/변경 공고만 program_changes(추가 전용)에 필드 단위 diff와 수집 실행 ID(run_id)로 기록
+  → 후속 처리(레이더/알림/매칭)는 changes_since()로 변경분만 조회
+- 접수 기간: 원문(apply_from/apply_to)과 별도로 ISO 날짜 + 일 번호(1970-01-01 기준 정수)를 저장,
+  status(upcoming/open/closed)와 (status, apply_to_day) 색인 → "접수 중", "N일 내 마감" 조회가 색인 범위 스캔
+  sweep(): 마감일이 지난 공고를 closed로, 접수 시작일이 된 공고를 open으로 (주기 실행)
+- 중복 묶음: cluster_id(대표 공고 program_id) + program_lsh(LSH 버킷 → 공고) - 계산은 program_dedup
+- program_id: 출처 + 공고 URL(없으면 출처 + 제목|기관) 해시 - 마감일은 키에 넣지 않음 → 마감 연장/변경이 같은 공고의 update
+  예전 키(제목|기관|마감일)로 저장된 행은 연결 시 1회 새 키로 옮김 (같은 공고의 여러 행은 최신 행만 남김)
+"""
+
+from __future__ import annotations
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from config_loader import get_config
+
+PROGRAM_FIELDS = [
+    'program_id', 'title', 'summary', 'field', 'target', 'region', 'org',
+    'apply_from', 'apply_to', 'url', 'contact', 'benefit', 'reqs',
+    'source', 'attachments'
+]
+STORED_FIELDS = PROGRAM_FIELDS + ['content_hash']
+# apply_from/apply_to에서 파생 (content_hash 대상 아님)
+DATE_FIELDS = ['apply_from_date', 'apply_to_date', 'apply_from_day', 'apply_to_day', 'status']
+WRITE_FIELDS = STORED_FIELDS + DATE_FIELDS
+# 조회 전용 (upsert가 덮어쓰지 않음)
+READ_FIELDS = WRITE_FIELDS + ['cluster_id', 'created_at']
+
+CHANGE_INSERT = 'insert'
+CHANGE_UPDATE = 'update'
+
+ID_SCHEME = 2      # 1: 제목|기관|마감일, 2: 출처|URL (없으면 출처|제목|기관)
+
+STATUS_UPCOMING = 'upcoming'
+STATUS_OPEN = 'open'        # 마감일 없음(상시/예산 소진 시)도 open
+STATUS_CLOSED = 'closed'
+EPOCH = date(1970, 1, 1)
+
+SQLITE_DDL = """
+CREATE TABLE IF NOT EXISTS programs (
+  program_id TEXT PRIMARY KEY,        -- hash(title+org+apply_to)
+  title TEXT,
+  summary TEXT,
+  field TEXT,
+  target TEXT,
+  region TEXT,
+  org TEXT,
+  apply_from TEXT,
+  apply_to TEXT,
+  url TEXT,
+  contact TEXT,
+  benefit TEXT,
+  reqs TEXT,
+  source TEXT,
+  attachments TEXT,                   -- JSON 배열 문자열
+  content_hash TEXT,                  -- program_id 외 필드 해시 (변경 감지)
+  apply_from_date TEXT,               -- YYYY-MM-DD (파싱 실패/미기재 시 NULL)
+  apply_to_date TEXT,
+  apply_from_day INTEGER,             -- 1970-01-01 기준 일 번호
+  apply_to_day INTEGER,
+  status TEXT,                        -- upcoming | open | closed
+  cluster_id TEXT,                    -- 중복 묶음 대표 program_id (program_dedup, 미처리 시 NULL)
+  created_at TEXT DEFAULT (datetime('now')),
+  updated_at TEXT DEFAULT (datetime('now'))
+);
+DROP INDEX IF EXISTS idx_programs_apply_to;
+CREATE INDEX IF NOT EXISTS idx_programs_status_due ON programs(status, apply_to_day);
+CREATE INDEX IF NOT EXISTS idx_programs_org ON programs(org);
+CREATE INDEX IF NOT EXISTS idx_programs_cluster ON programs(cluster_id);
+
+CREATE TABLE IF NOT EXISTS program_lsh (
+  bucket INTEGER NOT NULL,            -- hash(밴드 번호, 밴드 MinHash 값)
+  program_id TEXT NOT NULL,
+  PRIMARY KEY (bucket, program_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_program_lsh_program ON program_lsh(program_id);
+
+CREATE TABLE IF NOT EXISTS program_changes (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_id TEXT NOT NULL,
+  program_id TEXT NOT NULL,
+  change_type TEXT NOT NULL,          -- insert | update
+  changed_fields TEXT,                -- JSON {필드: [이전값, 새값]} (insert는 NULL)
+  content_hash TEXT NOT NULL,
+  changed_at TEXT DEFAULT (datetime('now'))
+);
+CREATE INDEX IF NOT EXISTS idx_program_changes_at ON program_changes(changed_at);
+CREATE INDEX IF NOT EXISTS idx_program_changes_program ON program_changes(program_id);
+CREATE INDEX IF NOT EXISTS idx_program_changes_run ON program_changes(run_id);
+"""
+
+POSTGRES_DDL = """
+CREATE TABLE IF NOT EXISTS programs (
+  program_id TEXT PRIMARY KEY,
+  title TEXT,
+  summary TEXT,
+  field TEXT,
+  target TEXT,
+  region TEXT,
+  org TEXT,
+  apply_from TEXT,
+  apply_to TEXT,
+  url TEXT,
+  contact TEXT,
+  benefit TEXT,
+  reqs TEXT,
+  source TEXT,
+  attachments TEXT,
+  content_hash TEXT,
+  apply_from_date DATE,
+  apply_to_date DATE,
+  apply_from_day INTEGER,
+  apply_to_day INTEGER,
+  status TEXT,
+  cluster_id TEXT,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS apply_from_date DATE;
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS apply_to_date DATE;
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS apply_from_day INTEGER;
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS apply_to_day INTEGER;
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS status TEXT;
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS cluster_id TEXT;
+DROP INDEX IF EXISTS idx_programs_apply_to;
+CREATE INDEX IF NOT EXISTS idx_programs_status_due ON programs(status, apply_to_day);
+CREATE INDEX IF NOT EXISTS idx_programs_org ON programs(org);
+CREATE INDEX IF NOT EXISTS idx_programs_cluster ON programs(cluster_id);
+
+CREATE TABLE IF NOT EXISTS program_lsh (
+  bucket BIGINT NOT NULL,
+  program_id TEXT NOT NULL,
+  PRIMARY KEY (bucket, program_id)
+);
+CREATE INDEX IF NOT EXISTS idx_program_lsh_program ON program_lsh(program_id);
+
+CREATE TABLE IF NOT EXISTS program_changes (
+  id BIGSERIAL PRIMARY KEY,
+  run_id TEXT NOT NULL,
+  program_id TEXT NOT NULL,
+  change_type TEXT NOT NULL,
+  changed_fields JSONB,
+  content_hash TEXT NOT NULL,
+  changed_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_program_changes_at ON program_changes(changed_at);
+CREATE INDEX IF NOT EXISTS idx_program_changes_program ON program_changes(program_id);
+CREATE INDEX IF NOT EXISTS idx_program_changes_run ON program_changes(run_id);
+
+CREATE TABLE IF NOT EXISTS program_store_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+"""
+
+_COLS = ','.join(STORED_FIELDS)
+_WRITE_COLS = ','.join(WRITE_FIELDS)
+_READ_COLS = ','.join(READ_FIELDS)
+_UPDATES = ','.join(f"{k}=excluded.{k}" for k in WRITE_FIELDS if k != 'program_id')
+_CHANGE_COLS = 'run_id, program_id, change_type, changed_fields, content_hash'
+_FROM, _TO = PROGRAM_FIELDS.index('apply_from'), PROGRAM_FIELDS.index('apply_to')
+
+SQLITE_UPSERT = (
+    f"INSERT INTO programs ({_WRITE_COLS}) VALUES ({','.join(['?'] * len(WRITE_FIELDS))})\n"
+    f"ON CONFLICT(program_id) DO UPDATE SET {_UPDATES}, updated_at=datetime('now')"
+)
+
+# 2026-12-31 / 2026.12.31. / 2026/12/31 / 2026년 12월 31일 / 20261231 (시각 등 뒤따르는 문자는 무시)
+_DATE_RE = re.compile(
+    r'(?<!\d)(\d{4})\s*[-./년]\s*(\d{1,2})\s*[-./월]\s*(\d{1,2})(?!\d)|(?<!\d)(\d{4})(\d{2})(\d{2})(?!\d)'
+)
+
+
+def parse_dates(value: Any) -> List[date]:
+    """원문 문자열 안의 날짜들 (형식이 섞인 기간 문자열 'A ~ B' 포함, 잘못된 날짜는 제외)"""
+    found = []
+    for m in _DATE_RE.finditer(str(value or '')):
+        y, mo, d = (m.group(1), m.group(2), m.group(3)) if m.group(1) else (m.group(4), m.group(5), m.group(6))
+        try:
+            found.append(date(int(y), int(mo), int(d)))
+        except ValueError:
+            continue
+    return found
+
+
+def parse_period(apply_from: Any, apply_to: Any) -> Tuple[Optional[date], Optional[date]]:
+    """(접수 시작일, 마감일) - 한쪽에 기간('A ~ B')이 통째로 들어온 경우도 처리"""
+    starts, ends = parse_dates(apply_from), parse_dates(apply_to)
+    if not ends and len(starts) > 1:
+        ends = starts[-1:]
+    if not starts and len(ends) > 1:
+        starts = ends[:1]
+    return (starts[0] if starts else None), (ends[-1] if ends else None)
+
+
+def day_number(d: Optional[date]) -> Optional[int]:
+    return (d - EPOCH).days if d else None
+
+
+def program_status(from_day: Optional[int], to_day: Optional[int], today: Optional[date] = None) -> str:
+    t = day_number(today or date.today())
+    if to_day is not None and to_day < t:
+        return STATUS_CLOSED
+    if from_day is not None and from_day > t:
+        return STATUS_UPCOMING
+    return STATUS_OPEN
+
+
+def date_columns(row: Sequence[Any], today: Optional[date] = None) -> List[Any]:
+    """program_row() 값 → DATE_FIELDS 순서 값"""
+    start, end = parse_period(row[_FROM], row[_TO])
+    from_day, to_day = day_number(start), day_number(end)
+    return [start.isoformat() if start else None, end.isoformat() if end else None,
+            from_day, to_day, program_status(from_day, to_day, today)]
+
+
+def make_program_id(source: Any, title: Any, org: Any, url: Any = None) -> str:
+    """공고 고정 키 → 32자 해시 (마감일 제외)"""
+    url = str(url or '').strip()
+    if url:
+        base = f"{source or ''}|url|{url}"
+    else:
+        base = f"{source or ''}|{str(title or '').strip()}|{str(org or '').strip()}"
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()[:32]
+
+
+def rekey_plan(rows: Iterable[Sequence[Any]]) -> Tuple[List[str], List[Tuple[str, str]], Dict[str, str]]:
+    """(program_id, source, title, org, url, updated_at) 전체 → (지울 id, (이전 id, 새 id) 변경, 이전 id → 새 id)
+
+    같은 새 키로 모이는 행 중 가장 최근에 갱신된 행만 남김
+    """
+    groups: Dict[str, List[Sequence[Any]]] = {}
+    for r in rows:
+        groups.setdefault(make_program_id(r[1], r[2], r[3], r[4]), []).append(r)
+    deletes, renames, moved = [], [], {}
+    for new_id, members in groups.items():
+        members.sort(key=lambda r: (str(r[5] or ''), r[0] == new_id), reverse=True)
+        keep, drop = members[0], members[1:]
+        deletes.extend(r[0] for r in drop)
+        if keep[0] != new_id:
+            renames.append((keep[0], new_id))
+        moved.update({r[0]: new_id for r in members if r[0] != new_id})
+    return deletes, renames, moved
+
+
+def program_row(item: Dict[str, Any]) -> List[Any]:
+    """공통 스키마 dict → 컬럼 순서 값 (attachments는 JSON 문자열로 보관)"""
+    attachments = item.get('attachments', [])
+    if not isinstance(attachments, str):
+        attachments = json.dumps(attachments or [], ensure_ascii=False)
+    return [attachments if k == 'attachments' else item.get(k) for k in PROGRAM_FIELDS]
+
+
+def content_hash(row: Sequence[Any]) -> str:
+    """program_row() 값 중 program_id를 제외한 필드의 해시"""
+    return hashlib.sha256(json.dumps(list(row[1:]), ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:32]
+
+
+def new_run_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid4().hex[:6]}"
+
+
+def diff_rows(rows: List[List[Any]], existing: Dict[str, Sequence[Any]], run_id: str
+              ) -> Tuple[List[List[Any]], List[Tuple[Any, ...]]]:
+    """새 값 vs 저장된 값(STORED_FIELDS 순서) → (쓸 행, 변경 로그 행)
+
+    해시가 같으면 건너뜀. 해시만 비어 있던 기존 행(변경 로그 도입 전 데이터)은 해시만 채우고 로그는 남기지 않음
+    """
+    to_write, changes = [], []
+    for row in rows:
+        digest = content_hash(row)
+        old = existing.get(row[0])
+        if old is None:
+            to_write.append(row + [digest] + date_columns(row))
+            changes.append((run_id, row[0], CHANGE_INSERT, None, digest))
+        elif old[-1] != digest:
+            fields = {k: [o, n] for k, o, n in zip(PROGRAM_FIELDS[1:], old[1:-1], row[1:]) if o != n}
+            to_write.append(row + [digest] + date_columns(row))
+            if fields:
+                changes.append((run_id, row[0], CHANGE_UPDATE, json.dumps(fields, ensure_ascii=False), digest))
+    return to_write, changes
+
+
+def _change_dicts(changes: List[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    return [{
+        'run_id': c[0], 'program_id': c[1], 'change_type': c[2],
+        'changed_fields': json.loads(c[3]) if c[3] else None,
+    } for c in changes]
+
+
+def unique_programs(programs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """중복 묶음당 첫 공고만 (입력 순서 유지, 묶음 미처리 공고는 그대로) - 레이더/매칭용"""
+    seen = set()
+    result = []
+    for p in programs:
+        key = p.get('cluster_id') or p['program_id']
+        if key not in seen:
+            seen.add(key)
+            result.append(p)
+    return result
+
+
+def _backfill_rows(rows: Iterable[Sequence[Any]]) -> List[List[Any]]:
+    """(program_id, apply_from, apply_to) → UPDATE 값 (DATE_FIELDS..., program_id)"""
+    params = []
+    for program_id, apply_from, apply_to in rows:
+        row = [None] * len(PROGRAM_FIELDS)
+        row[_FROM], row[_TO] = apply_from, apply_to
+        params.append(date_columns(row) + [program_id])
+    return params
+
+
+_BACKFILL_SQL = f"UPDATE programs SET {', '.join(f'{k} = ?' for k in DATE_FIELDS)} WHERE program_id = ?"
+
+
+def _dedupe(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # 같은 배치 안의 중복 공고는 마지막 값 사용 (ON CONFLICT는 한 문장에서 같은 행을 두 번 갱신 불가)
+    return list({item['program_id']: item for item in items if item.get('program_id')}.values())
+
+
+class ProgramStore(ABC):
+    """공고 저장소 공통 인터페이스 (SQLite/PostgreSQL 구현은 아래 추상 메서드를 모두 구현)"""
+
+    def upsert_many(self, items: Sequence[Dict[str, Any]], run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """공고 일괄 upsert → 변경 목록 [{run_id, program_id, change_type, changed_fields}]"""
+        rows = [program_row(item) for item in _dedupe(items)]
+        if not rows:
+            return []
+        return _change_dicts(self._apply(rows, run_id or new_run_id()))
+
+    @abstractmethod
+    def _apply(self, rows: List[List[Any]], run_id: str) -> List[Tuple[Any, ...]]:
+        """정규화된 행 upsert + 변경 로그 기록 → 변경 행 (run_id, program_id, change_type, changed_fields)"""
+
+    @abstractmethod
+    def changes_since(self, since: str, change_types: Sequence[str] = (CHANGE_INSERT, CHANGE_UPDATE)
+                      ) -> List[Dict[str, Any]]:
+        """since(UTC, 'YYYY-MM-DD HH:MM:SS') 이후 변경 로그 (changed_at 색인 범위 조회)"""
+
+    @abstractmethod
+    def get_programs(self, program_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """program_id 목록 → {program_id: 공고 dict} (기본키 조회)"""
+
+    @abstractmethod
+    def sweep(self, today: Optional[date] = None) -> Dict[str, int]:
+        """기간 상태 갱신 → {"closed": 마감 처리 수, "opened": 접수 시작 처리 수} (status 색인 범위 갱신)"""
+
+    @abstractmethod
+    def open_programs(self, within_days: Optional[int] = None, today: Optional[date] = None,
+                      limit: int = 500) -> List[Dict[str, Any]]:
+        """접수 중 공고 (마감 임박순, 상시 공고는 뒤) - within_days 지정 시 오늘~N일 내 마감만
+        중복 묶음(cluster_id)당 1건만 (조회 limit 적용 후 거르므로 limit보다 적을 수 있음)"""
+
+    # ---------- 중복 묶음 (program_dedup) ----------
+    @abstractmethod
+    def unclustered_ids(self) -> List[str]:
+        """cluster_id가 없는 공고 (cluster_id 색인 조회)"""
+
+    @abstractmethod
+    def lsh_lookup(self, buckets: Iterable[int]) -> Dict[int, List[str]]:
+        """LSH 버킷 → 해당 버킷 공고 목록"""
+
+    @abstractmethod
+    def save_clusters(self, buckets: Dict[str, List[int]], assigned: Dict[str, str],
+                      merged: Dict[str, str], detached: Sequence[str] = ()) -> None:
+        """공고별 버킷 교체 + 옛 묶음 해제(detached 대표의 다른 구성원 cluster_id → NULL)
+        + cluster_id 지정 + 묶음 합치기(이전 대표 → 새 대표)를 한 트랜잭션으로"""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteProgramStore(ProgramStore):
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(programs)")}
+        if columns:
+            for name in ['content_hash'] + DATE_FIELDS + ['cluster_id']:
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE programs ADD COLUMN {name} {'INTEGER' if name.endswith('_day') else 'TEXT'}")
+        conn.executescript(SQLITE_DDL)
+        if conn.execute('PRAGMA user_version').fetchone()[0] < ID_SCHEME:
+            self._rekey(conn)
+        # 기간 컬럼 도입 전 데이터는 1회 채움 (status IS NULL은 색인 조회)
+        stale = conn.execute("SELECT program_id, apply_from, apply_to FROM programs WHERE status IS NULL").fetchall()
+        if stale:
+            with conn:
+                conn.executemany(_BACKFILL_SQL, _backfill_rows(stale))
+        return conn
+
+    def _rekey(self, conn: sqlite3.Connection) -> None:
+        # 예전 키 → 새 키 (변경 로그는 새 키로 이어 붙이고, 묶음은 program_dedup이 다시 계산)
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= ID_SCHEME:
+                return
+            deletes, renames, moved = rekey_plan(
+                conn.execute("SELECT program_id, source, title, org, url, updated_at FROM programs").fetchall()
+            )
+            conn.executemany("DELETE FROM programs WHERE program_id = ?", [(pid,) for pid in deletes])
+            conn.executemany("UPDATE programs SET program_id = ? WHERE program_id = ?",
+                             [(new, old) for old, new in renames])
+            conn.executemany("UPDATE program_changes SET program_id = ? WHERE program_id = ?",
+                             [(new, old) for old, new in moved.items()])
+            conn.executemany("DELETE FROM program_lsh WHERE program_id = ?", [(old,) for old in moved])
+            touched = [(old,) for old in moved] + [(new,) for new in set(moved.values())]
+            conn.executemany("UPDATE programs SET cluster_id = NULL WHERE cluster_id = ?", touched)
+            conn.executemany("UPDATE programs SET cluster_id = NULL WHERE program_id = ?", touched)
+            conn.execute(f'PRAGMA user_version = {ID_SCHEME}')
+
+    def _apply(self, rows: List[List[Any]], run_id: str) -> List[Tuple[Any, ...]]:
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            ids = [row[0] for row in rows]
+            existing = {r[0]: r for r in conn.execute(
+                f"SELECT {_COLS} FROM programs WHERE program_id IN ({','.join(['?'] * len(ids))})", ids
+            )}
+            to_write, changes = diff_rows(rows, existing, run_id)
+            conn.executemany(SQLITE_UPSERT, to_write)
+            conn.executemany(f"INSERT INTO program_changes ({_CHANGE_COLS}) VALUES (?, ?, ?, ?, ?)", changes)
+            conn.commit()
+            return changes
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def changes_since(self, since: str, change_types: Sequence[str] = (CHANGE_INSERT, CHANGE_UPDATE)
+                      ) -> List[Dict[str, Any]]:
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {_CHANGE_COLS}, changed_at FROM program_changes "
+                f"WHERE changed_at >= ? AND change_type IN ({','.join(['?'] * len(change_types))}) ORDER BY id",
+                [since.replace('T', ' ')] + list(change_types)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(_change_dicts([r])[0], changed_at=r[5]) for r in rows]
+
+    def get_programs(self, program_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(dict.fromkeys(program_ids))
+        if not ids:
+            return {}
+        conn = self.connect()
+        try:
+            programs = {}
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for r in conn.execute(
+                    f"SELECT {_READ_COLS} FROM programs WHERE program_id IN ({','.join(['?'] * len(chunk))})", chunk
+                ):
+                    programs[r[0]] = dict(zip(READ_FIELDS, r))
+            return programs
+        finally:
+            conn.close()
+
+    def sweep(self, today: Optional[date] = None) -> Dict[str, int]:
+        t = day_number(today or date.today())
+        conn = self.connect()
+        try:
+            with conn:
+                closed = conn.execute(
+                    "UPDATE programs SET status = ?, updated_at = datetime('now') "
+                    "WHERE status IN (?, ?) AND apply_to_day < ?", (STATUS_CLOSED, STATUS_OPEN, STATUS_UPCOMING, t)
+                ).rowcount
+                opened = conn.execute(
+                    "UPDATE programs SET status = ?, updated_at = datetime('now') "
+                    "WHERE status = ? AND (apply_from_day IS NULL OR apply_from_day <= ?)", (STATUS_OPEN, STATUS_UPCOMING, t)
+                ).rowcount
+            return {"closed": closed, "opened": opened}
+        finally:
+            conn.close()
+
+    def open_programs(self, within_days: Optional[int] = None, today: Optional[date] = None,
+                      limit: int = 500) -> List[Dict[str, Any]]:
+        t = day_number(today or date.today())
+        end = t + within_days if within_days is not None else None
+        conn = self.connect()
+        try:
+            if end is not None:
+                rows = conn.execute(
+                    f"SELECT {_READ_COLS} FROM programs WHERE status = ? AND apply_to_day BETWEEN ? AND ? "
+                    "ORDER BY apply_to_day LIMIT ?", (STATUS_OPEN, t, end, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    f"SELECT {_READ_COLS} FROM programs WHERE status = ? AND apply_to_day >= ? "
+                    "ORDER BY apply_to_day LIMIT ?", (STATUS_OPEN, t, limit)
+                ).fetchall()
+                if len(rows) < limit:
+                    rows += conn.execute(
+                        f"SELECT {_READ_COLS} FROM programs WHERE status = ? AND apply_to_day IS NULL LIMIT ?",
+                        (STATUS_OPEN, limit - len(rows))
+                    ).fetchall()
+        finally:
+            conn.close()
+        return unique_programs(dict(zip(READ_FIELDS, r)) for r in rows)
+
+    def unclustered_ids(self) -> List[str]:
+        conn = self.connect()
+        try:
+            return [r[0] for r in conn.execute("SELECT program_id FROM programs WHERE cluster_id IS NULL")]
+        finally:
+            conn.close()
+
+    def lsh_lookup(self, buckets: Iterable[int]) -> Dict[int, List[str]]:
+        keys = list(buckets)
+        found: Dict[int, List[str]] = {}
+        conn = self.connect()
+        try:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                for bucket, program_id in conn.execute(
+                    f"SELECT bucket, program_id FROM program_lsh WHERE bucket IN ({','.join(['?'] * len(chunk))})", chunk
+                ):
+                    found.setdefault(bucket, []).append(program_id)
+            return found
+        finally:
+            conn.close()
+
+    def save_clusters(self, buckets: Dict[str, List[int]], assigned: Dict[str, str],
+                      merged: Dict[str, str], detached: Sequence[str] = ()) -> None:
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany("DELETE FROM program_lsh WHERE program_id = ?", [(pid,) for pid in buckets])
+            conn.executemany(
+                "INSERT OR IGNORE INTO program_lsh (bucket, program_id) VALUES (?, ?)",
+                [(b, pid) for pid, bs in buckets.items() for b in bs]
+            )
+            conn.executemany("UPDATE programs SET cluster_id = NULL WHERE cluster_id = ? AND program_id != ?",
+                             [(root, root) for root in detached])
+            conn.executemany("UPDATE programs SET cluster_id = ? WHERE program_id = ?",
+                             [(root, pid) for pid, root in assigned.items()])
+            conn.executemany("UPDATE programs SET cluster_id = ? WHERE cluster_id = ?",
+                             [(root, old) for old, root in merged.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def copy_csv(rows: Iterable[Sequence[Any]]) -> str:
+    """COPY ... (FORMAT csv)용 본문 - None은 따옴표 없는 빈 값(NULL), 문자열은 항상 따옴표 ('' 유지)
+    (csv.writer는 None과 ''를 똑같이 빈 값으로 써서 ''가 NULL로 적재됨 → SQLite와 값이 달라짐)"""
+    def field(v: Any) -> str:
+        if v is None:
+            return ''
+        if isinstance(v, (int, float)):
+            return repr(v)
+        return '"' + str(v).replace('"', '""') + '"'
+    return ''.join(','.join(map(field, row)) + '\n' for row in rows)
+
+
+def _pg_program(r: Sequence[Any]) -> Dict[str, Any]:
+    # DATE/TIMESTAMPTZ 컬럼은 SQLite와 같게 ISO 문자열로
+    return {k: v.isoformat() if isinstance(v, date) else v for k, v in zip(READ_FIELDS, r)}
+
+
+class PostgresProgramStore(ProgramStore):
+
+    def __init__(self, dsn: str, min_connections: int = 1, max_connections: Optional[int] = None):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+        except ImportError as e:
+            raise RuntimeError("PostgreSQL 저장소에는 psycopg2가 필요합니다. (pip install psycopg2-binary)") from e
+        self.pool = ThreadedConnectionPool(min_connections, max_connections or get_config().POLICY_DB_POOL_MAX, dsn)
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _ensure_schema(self, conn) -> None:
+        with self._lock:
+            if self._schema_ready:
+                return
+            from psycopg2.extras import execute_batch
+
+            with conn.cursor() as cur:
+                cur.execute(POSTGRES_DDL)
+                cur.execute("LOCK TABLE program_store_meta IN EXCLUSIVE MODE")
+                cur.execute("SELECT value FROM program_store_meta WHERE key = 'id_scheme'")
+                row = cur.fetchone()
+                if (int(row[0]) if row else 0) < ID_SCHEME:
+                    self._rekey(cur)
+                # 기간 컬럼 도입 전 데이터는 1회 채움
+                cur.execute("SELECT program_id, apply_from, apply_to FROM programs WHERE status IS NULL")
+                stale = cur.fetchall()
+                if stale:
+                    execute_batch(cur, _BACKFILL_SQL.replace('?', '%s'), _backfill_rows(stale), page_size=500)
+            conn.commit()
+            self._schema_ready = True
+
+    def _rekey(self, cur) -> None:
+        # SQLiteProgramStore._rekey와 같음 (완료 여부는 program_store_meta.id_scheme)
+        from psycopg2.extras import execute_batch
+
+        cur.execute("SELECT program_id, source, title, org, url, updated_at FROM programs")
+        deletes, renames, moved = rekey_plan(cur.fetchall())
+        if deletes:
+            cur.execute("DELETE FROM programs WHERE program_id = ANY(%s)", (deletes,))
+        execute_batch(cur, "UPDATE programs SET program_id = %s WHERE program_id = %s",
+                      [(new, old) for old, new in renames], page_size=500)
+        execute_batch(cur, "UPDATE program_changes SET program_id = %s WHERE program_id = %s",
+                      [(new, old) for old, new in moved.items()], page_size=500)
+        if moved:
+            touched = list(moved) + list(set(moved.values()))
+            cur.execute("DELETE FROM program_lsh WHERE program_id = ANY(%s)", (list(moved),))
+            cur.execute("UPDATE programs SET cluster_id = NULL WHERE cluster_id = ANY(%s) OR program_id = ANY(%s)",
+                        (touched, touched))
+        cur.execute(
+            "INSERT INTO program_store_meta (key, value) VALUES ('id_scheme', %s) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (str(ID_SCHEME),)
+        )
+
+    def _apply(self, rows: List[List[Any]], run_id: str) -> List[Tuple[Any, ...]]:
+        from psycopg2.extras import execute_values
+
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {_COLS} FROM programs WHERE program_id = ANY(%s)", ([row[0] for row in rows],))
+                existing = {r[0]: r for r in cur.fetchall()}
+                to_write, changes = diff_rows(rows, existing, run_id)
+                if to_write:
+                    buf = io.StringIO(copy_csv(to_write))
+                    cur.execute(
+                        "CREATE TEMP TABLE IF NOT EXISTS programs_stage "
+                        "(LIKE programs INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                    )
+                    cur.copy_expert(f"COPY programs_stage ({_WRITE_COLS}) FROM STDIN WITH (FORMAT csv)", buf)
+                    cur.execute(
+                        f"INSERT INTO programs ({_WRITE_COLS}) SELECT {_WRITE_COLS} FROM programs_stage "
+                        f"ON CONFLICT (program_id) DO UPDATE SET {_UPDATES}, updated_at=now()"
+                    )
+                if changes:
+                    execute_values(cur, f"INSERT INTO program_changes ({_CHANGE_COLS}) VALUES %s", changes)
+            conn.commit()
+            return changes
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def changes_since(self, since: str, change_types: Sequence[str] = (CHANGE_INSERT, CHANGE_UPDATE)
+                      ) -> List[Dict[str, Any]]:
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT {_CHANGE_COLS}, changed_at FROM program_changes "
+                    "WHERE changed_at >= %s AND change_type = ANY(%s) ORDER BY id",
+                    (since, list(change_types))
+                )
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+        # JSONB는 dict로 반환됨
+        return [{'run_id': r[0], 'program_id': r[1], 'change_type': r[2], 'changed_fields': r[3],
+                 'changed_at': r[5].isoformat()} for r in rows]
+
+    def get_programs(self, program_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(dict.fromkeys(program_ids))
+        if not ids:
+            return {}
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {_READ_COLS} FROM programs WHERE program_id = ANY(%s)", (ids,))
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+        return {r[0]: _pg_program(r) for r in rows}
+
+    def sweep(self, today: Optional[date] = None) -> Dict[str, int]:
+        t = day_number(today or date.today())
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE programs SET status = %s, updated_at = now() "
+                    "WHERE status IN (%s, %s) AND apply_to_day < %s", (STATUS_CLOSED, STATUS_OPEN, STATUS_UPCOMING, t)
+                )
+                closed = cur.rowcount
+                cur.execute(
+                    "UPDATE programs SET status = %s, updated_at = now() "
+                    "WHERE status = %s AND (apply_from_day IS NULL OR apply_from_day <= %s)", (STATUS_OPEN, STATUS_UPCOMING, t)
+                )
+                opened = cur.rowcount
+            conn.commit()
+            return {"closed": closed, "opened": opened}
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def open_programs(self, within_days: Optional[int] = None, today: Optional[date] = None,
+                      limit: int = 500) -> List[Dict[str, Any]]:
+        t = day_number(today or date.today())
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                if within_days is not None:
+                    cur.execute(
+                        f"SELECT {_READ_COLS} FROM programs WHERE status = %s AND apply_to_day BETWEEN %s AND %s "
+                        "ORDER BY apply_to_day LIMIT %s", (STATUS_OPEN, t, t + within_days, limit)
+                    )
+                else:
+                    cur.execute(
+                        f"SELECT {_READ_COLS} FROM programs WHERE status = %s AND (apply_to_day >= %s OR apply_to_day IS NULL) "
+                        "ORDER BY apply_to_day NULLS LAST LIMIT %s", (STATUS_OPEN, t, limit)
+                    )
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+        return unique_programs(_pg_program(r) for r in rows)
+
+    def unclustered_ids(self) -> List[str]:
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute("SELECT program_id FROM programs WHERE cluster_id IS NULL")
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+        return [r[0] for r in rows]
+
+    def lsh_lookup(self, buckets: Iterable[int]) -> Dict[int, List[str]]:
+        keys = list(buckets)
+        if not keys:
+            return {}
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute("SELECT bucket, program_id FROM program_lsh WHERE bucket = ANY(%s)", (keys,))
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+        found: Dict[int, List[str]] = {}
+        for bucket, program_id in rows:
+            found.setdefault(bucket, []).append(program_id)
+        return found
+
+    def save_clusters(self, buckets: Dict[str, List[int]], assigned: Dict[str, str],
+                      merged: Dict[str, str], detached: Sequence[str] = ()) -> None:
+        from psycopg2.extras import execute_values
+
+        conn = self.pool.getconn()
+        try:
+            self._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM program_lsh WHERE program_id = ANY(%s)", (list(buckets),))
+                rows = [(b, pid) for pid, bs in buckets.items() for b in bs]
+                if rows:
+                    execute_values(cur, "INSERT INTO program_lsh (bucket, program_id) VALUES %s ON CONFLICT DO NOTHING", rows)
+                if detached:
+                    cur.execute("UPDATE programs SET cluster_id = NULL WHERE cluster_id = ANY(%s) AND program_id <> cluster_id",
+                                (list(detached),))
+                if assigned:
+                    execute_values(
+                        cur, "UPDATE programs SET cluster_id = v.root FROM (VALUES %s) AS v(program_id, root) "
+                        "WHERE programs.program_id = v.program_id", [(pid, root) for pid, root in assigned.items()]
+                    )
+                for old, root in merged.items():
+                    cur.execute("UPDATE programs SET cluster_id = %s WHERE cluster_id = %s", (root, old))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def close(self) -> None:
+        self.pool.closeall()
+
+
+def open_store(url: Optional[str] = None) -> ProgramStore:
+    """POLICY_DB_URL이 postgres면 PostgreSQL, 아니면 SQLite(POLICY_DB_PATH)"""
+    cfg = get_config()
+    url = url if url is not None else cfg.POLICY_DB_URL
+    if url.startswith(('postgres://', 'postgresql://')):
+        return PostgresProgramStore(url)
+    return SQLiteProgramStore(url or cfg.POLICY_DB_PATH)
@@ -0,0 +1,150 @@
+"""
+유아플랜 정책자금 공고 알림 (수집기 → 규칙 평가 → 텔레그램 다이제스트)
+- 입력은 수집 실행(collect_once)의 변경 목록뿐 → 실행 비용이 공고 테이블 크기가 아닌 변경 건수에 비례
+  (공고 본문은 변경된 program_id만 기본키로 조회)
+- 이벤트: 신규 공고(new), 마감일(apply_to) 변경(deadline)
+- 구독 규칙: JSON 파일(PROGRAM_ALERT_RULES) → 파일 수정 시각 기준 1회 컴파일
+  regions/fields: 부분 일치 목록, keywords: 정규식 1개로 합침 (제목/요약/대상/지원내용), 비어 있으면 전체 허용
+  지역이 비었거나 '전국'인 공고는 모든 지역 규칙에 해당
+- 채팅방(chat_id)별로 모아 다이제스트 전송 (공고는 채팅방당 1회, 해당 규칙명 표시)
+- 규칙 파일이 없으면 모든 신규/마감 변경 공고를 알림
+- 이미 있던 공고의 중복(program_dedup cluster_id가 다른 공고)으로 묶인 신규 공고는 알리지 않음
+
+규칙 파일 예시 (program_alert_rules.json):
+[
+  {"name": "서울 제조", "regions": ["서울"], "fields": ["제조"], "keywords": ["스마트공장", "R&D"]},
+  {"name": "마감 변경", "events": ["deadline"], "chat_id": "-100123456"}
+]
+"""
+
+from __future__ import annotations
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Pattern, Sequence, Tuple
+
+from config_loader import get_config
+from policy_store import CHANGE_INSERT, CHANGE_UPDATE, ProgramStore
+
+EVENT_NEW = "new"
+EVENT_DEADLINE = "deadline"
+EVENTS = frozenset({EVENT_NEW, EVENT_DEADLINE})
+NATIONWIDE = "전국"
+KEYWORD_FIELDS = ("title", "summary", "target", "benefit")
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    name: str
+    regions: Tuple[str, ...] = ()
+    fields: Tuple[str, ...] = ()
+    keyword_re: Optional[Pattern[str]] = None
+    events: FrozenSet[str] = EVENTS
+    chat_id: Optional[str] = None   # None이면 알림기 기본 채팅방
+
+    def matches(self, event: str, program: Dict[str, Any]) -> bool:
+        if event not in self.events:
+            return False
+        if self.regions:
+            region = program.get("region") or ""
+            if region and NATIONWIDE not in region and not any(r in region for r in self.regions):
+                return False
+        if self.fields:
+            field = program.get("field") or ""
+            if not any(f in field for f in self.fields):
+                return False
+        if self.keyword_re is not None:
+            text = " ".join(str(program.get(k) or "") for k in KEYWORD_FIELDS)
+            if not self.keyword_re.search(text):
+                return False
+        return True
+
+
+DEFAULT_RULES = (AlertRule(name="전체"),)
+
+
+def compile_rule(spec: Dict[str, Any]) -> AlertRule:
+    """규칙 JSON 1개 → AlertRule (알 수 없는 이벤트는 ValueError)"""
+    events = frozenset(spec.get("events") or EVENTS)
+    if not events <= EVENTS:
+        raise ValueError(f"알 수 없는 알림 이벤트: {sorted(events - EVENTS)}")
+    keywords = [str(k).strip() for k in spec.get("keywords") or [] if str(k).strip()]
+    return AlertRule(
+        name=str(spec.get("name") or "규칙"),
+        regions=tuple(str(r).strip() for r in spec.get("regions") or [] if str(r).strip()),
+        fields=tuple(str(f).strip() for f in spec.get("fields") or [] if str(f).strip()),
+        keyword_re=re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE) if keywords else None,
+        events=events,
+        chat_id=str(spec["chat_id"]) if spec.get("chat_id") else None,
+    )
+
+
+_rules_cache: Dict[str, Tuple[float, Tuple[AlertRule, ...]]] = {}
+
+
+def load_rules(path: Optional[str] = None) -> Tuple[AlertRule, ...]:
+    """규칙 파일 → 컴파일된 규칙 (파일이 바뀔 때만 다시 컴파일, 파일이 없으면 DEFAULT_RULES)"""
+    path = path or get_config().PROGRAM_ALERT_RULES
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return DEFAULT_RULES
+    cached = _rules_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        rules = tuple(compile_rule(spec) for spec in json.load(f))
+    _rules_cache[path] = (mtime, rules)
+    return rules
+
+
+def change_events(changes: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """변경 목록 → 알림 이벤트 [{event, program_id, old_apply_to}] (그 외 필드 변경은 제외)"""
+    events = []
+    for change in changes:
+        if change["change_type"] == CHANGE_INSERT:
+            events.append({"event": EVENT_NEW, "program_id": change["program_id"], "old_apply_to": None})
+        elif change["change_type"] == CHANGE_UPDATE and "apply_to" in (change.get("changed_fields") or {}):
+            events.append({"event": EVENT_DEADLINE, "program_id": change["program_id"],
+                           "old_apply_to": change["changed_fields"]["apply_to"][0]})
+    return events
+
+
+def evaluate(store: ProgramStore, changes: Sequence[Dict[str, Any]],
+             rules: Optional[Sequence[AlertRule]] = None) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    """변경 목록 → 채팅방별 알림 {chat_id: [{event, program, old_apply_to, rules}]}"""
+    rules = load_rules() if rules is None else rules
+    events = change_events(changes)
+    if not events or not rules:
+        return {}
+    programs = store.get_programs([e["program_id"] for e in events])
+    by_chat: Dict[Optional[str], Dict[Tuple[str, str], Dict[str, Any]]] = {}
+    for e in events:
+        program = programs.get(e["program_id"])
+        if program is None:
+            continue
+        if e["event"] == EVENT_NEW and program.get("cluster_id") not in (None, e["program_id"]):
+            continue
+        for rule in rules:
+            if not rule.matches(e["event"], program):
+                continue
+            alerts = by_chat.setdefault(rule.chat_id, {})
+            alert = alerts.setdefault((e["event"], e["program_id"]), {
+                "event": e["event"], "program": program, "old_apply_to": e["old_apply_to"], "rules": []
+            })
+            alert["rules"].append(rule.name)
+    return {chat_id: list(alerts.values()) for chat_id, alerts in by_chat.items()}
+
+
+def dispatch(store: ProgramStore, changes: Sequence[Dict[str, Any]], notifier,
+             rules: Optional[Sequence[AlertRule]] = None) -> Dict[str, int]:
+    """규칙 평가 후 채팅방별 다이제스트 전송 → {"events", "alerts", "messages", "failed"}"""
+    by_chat = evaluate(store, changes, rules)
+    counts = {"events": len(change_events(changes)), "alerts": 0, "messages": 0, "failed": 0}
+    for chat_id, alerts in by_chat.items():
+        sent, failed = notifier.notify_program_digest(alerts, chat_id=chat_id)
+        counts["alerts"] += len(alerts)
+        counts["messages"] += sent
+        counts["failed"] += failed
+    return counts
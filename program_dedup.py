@@ -0,0 +1,182 @@
+"""
+유아플랜 정책자금 공고 중복 묶음 (소스 간/재게시 공고)
+- program_id는 출처+URL(또는 제목|기관) 해시 → 기업마당/K-Startup 동시 게시, 제목 일부 수정/공백 차이 재게시는 별개 공고가 됨
+- 제목 정규화(NFKC, 소문자, 재공고/정정 등 재게시 표시 제거, 공백/구두점 제거) → 문자 3-gram shingle → MinHash(64) → LSH(16밴드 × 4행)
+- LSH 버킷은 program_lsh 테이블에 보관 → 새/변경 공고만 버킷 색인 조회로 후보를 찾음 (전체 쌍 비교 없음)
+- 후보는 실제 shingle Jaccard ≥ SIMILARITY_THRESHOLD, 양쪽 마감일이 있으면 MAX_DEADLINE_GAP_DAYS 이내일 때만 같은 묶음
+- cluster_id: 묶음에서 가장 먼저 저장된 공고의 program_id (대표 공고는 cluster_id == program_id)
+  두 묶음을 잇는 공고가 들어오면 늦게 생긴 묶음을 먼저 생긴 묶음으로 합침
+- 처리 대상: 이번 수집의 신규/제목·마감 변경 공고 + 아직 묶음이 없는 공고(도입 전 데이터 1회 채움)
+- 대표 공고가 바뀌어(제목 변경 등) 더 이상 어느 공고와도 묶이지 않으면 기존 구성원의 cluster_id를 비움
+  → 다음 수집 때 묶음 없는 공고로 다시 묶음 (다른 공고 뒤에 계속 숨겨지지 않음)
+"""
+
+from __future__ import annotations
+import hashlib
+import random
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
+
+from policy_store import CHANGE_INSERT, ProgramStore
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS     # 후보 문턱 ≈ (1/16)^(1/4) ≈ 0.5
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.8
+MAX_DEADLINE_GAP_DAYS = 45            # 매년 같은 제목으로 반복되는 사업은 별개로
+CHUNK = 500
+DEDUP_FIELDS = frozenset({'title', 'apply_to'})   # 이 필드가 바뀐 공고만 다시 묶음
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(20240601)        # 고정 시드: 실행/프로세스가 달라도 같은 서명
+_PERMS = tuple((_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM))
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+# 재게시 때 제목에 붙는 표시 (내용은 같은 공고)
+_REPOST_RE = re.compile(r"(재공고|재공모|추가\s*모집|(?:수정|정정|변경|연장)\s*공고|기간\s*연장)")
+
+
+def normalize_title(title: Any) -> str:
+    text = unicodedata.normalize("NFKC", str(title or "")).lower()
+    return _NON_WORD.sub("", _REPOST_RE.sub("", text))
+
+
+def shingles(title: Any) -> FrozenSet[str]:
+    text = normalize_title(title)
+    if len(text) <= SHINGLE_SIZE:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def minhash(shingle_set: Iterable[str]) -> Tuple[int, ...]:
+    hashes = [_hash64(s) for s in shingle_set]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS)
+
+
+def lsh_buckets(signature: Sequence[int]) -> List[int]:
+    """밴드별 버킷 키 (밴드 번호 포함, SQLite INTEGER 범위의 63비트)"""
+    if not signature:
+        return []
+    buckets = []
+    for band in range(BANDS):
+        part = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        buckets.append(_hash64(f"{band}:{','.join(map(str, part))}") >> 1)
+    return buckets
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def is_duplicate(p: Dict[str, Any], q: Dict[str, Any], p_shingles: FrozenSet[str], q_shingles: FrozenSet[str]) -> bool:
+    days = (p.get('apply_to_day'), q.get('apply_to_day'))
+    if None not in days and abs(days[0] - days[1]) > MAX_DEADLINE_GAP_DAYS:
+        return False
+    return jaccard(p_shingles, q_shingles) >= SIMILARITY_THRESHOLD
+
+
+def dedup_targets(changes: Sequence[Dict[str, Any]]) -> List[str]:
+    """변경 목록 → 다시 묶을 program_id (신규 + 제목/마감 변경)"""
+    return [
+        c['program_id'] for c in changes
+        if c['change_type'] == CHANGE_INSERT or DEDUP_FIELDS & set(c.get('changed_fields') or {})
+    ]
+
+
+def dedupe(store: ProgramStore, program_ids: Sequence[str]) -> Dict[str, int]:
+    """공고 묶음 갱신 → {"processed", "clustered": 다른 공고 묶음에 들어간 수, "merged": 합쳐진 묶음 수,
+    "detached": 구성원을 풀어 준 옛 대표 수}"""
+    ids = list(dict.fromkeys(program_ids))
+    stats = {"processed": 0, "clustered": 0, "merged": 0, "detached": 0}
+    for i in range(0, len(ids), CHUNK):
+        chunk_stats = _dedupe_chunk(store, ids[i:i + CHUNK])
+        for k in stats:
+            stats[k] += chunk_stats[k]
+    return stats
+
+
+def _dedupe_chunk(store: ProgramStore, ids: List[str]) -> Dict[str, int]:
+    programs = store.get_programs(ids)
+    batch = [pid for pid in ids if pid in programs]
+    shingle_of = {pid: shingles(programs[pid].get('title')) for pid in batch}
+    buckets_of = {pid: lsh_buckets(minhash(shingle_of[pid])) for pid in batch}
+
+    # 저장된 버킷 조회 (이번 묶음의 공고는 예전 버킷 대신 새 버킷으로 비교)
+    in_batch = set(batch)
+    stored = store.lsh_lookup({b for buckets in buckets_of.values() for b in buckets})
+    stored = {b: [pid for pid in pids if pid not in in_batch] for b, pids in stored.items()}
+    others = {pid for pids in stored.values() for pid in pids}
+    programs.update(store.get_programs(list(others)))
+    assigned: Dict[str, str] = {}
+    merged: Dict[str, str] = {}
+
+    def root_of(pid: str) -> str:
+        root = assigned.get(pid) or programs.get(pid, {}).get('cluster_id') or pid
+        while root in merged:
+            root = merged[root]
+        return root
+
+    def seniority(root: str) -> Tuple[str, str]:
+        # 먼저 저장된 묶음이 대표 (created_at이 같으면 program_id 순)
+        if root not in programs:
+            programs.update(store.get_programs([root]))
+        return (str((programs.get(root) or {}).get('created_at') or '9999'), root)
+
+    local: Dict[int, List[str]] = defaultdict(list)
+    detached: List[str] = []
+    stats = {"processed": len(batch), "clustered": 0, "merged": 0, "detached": 0}
+    for pid in batch:
+        candidates: Set[str] = set()
+        for b in buckets_of[pid]:
+            candidates.update(stored.get(b, ()))
+            candidates.update(local[b])
+        candidates.discard(pid)
+        roots = set()
+        for q in candidates:
+            if q not in shingle_of:
+                shingle_of[q] = shingles(programs[q].get('title'))
+            if is_duplicate(programs[pid], programs[q], shingle_of[pid], shingle_of[q]):
+                roots.add(root_of(q))
+        if roots:
+            root = min(roots, key=seniority)
+            for other in roots - {root}:
+                merged[other] = root
+                stats["merged"] += 1
+            stats["clustered"] += 1
+        else:
+            root = pid
+            if programs[pid].get('cluster_id') == pid:
+                # 대표였는데 이제 아무와도 묶이지 않음 → 옛 구성원은 다음 실행에서 다시 묶음
+                detached.append(pid)
+        assigned[pid] = root
+        for b in buckets_of[pid]:
+            local[b].append(pid)
+
+    store.save_clusters(
+        {pid: buckets_of[pid] for pid in batch},
+        {pid: root_of(pid) for pid in batch},
+        {old: root_of(old) for old in merged},
+        detached,
+    )
+    stats["detached"] = len(detached)
+    return stats
+
+
+def dedupe_changes(store: ProgramStore, changes: Sequence[Dict[str, Any]],
+                   backfill: bool = True) -> Dict[str, int]:
+    """collect_once 단계: 이번 변경분 (+ 아직 묶음이 없는 공고) 묶음 갱신"""
+    ids = dedup_targets(changes)
+    if backfill:
+        ids += store.unclustered_ids()
+    return dedupe(store, ids)
+
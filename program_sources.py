@@ -0,0 +1,250 @@
+"""
+유아플랜 정책자금 공고 소스 매핑 (policy_collector)
+- 소스별 선언적 매핑: 공통 필드 → 원문 키 후보 목록 (앞에서부터 값이 있는 첫 키, 모두 비면 마지막 키 값)
+- compile_mapping(): 소스당 1회 컴파일 → (필드, 키 튜플) 접근자 튜플 + 행 함수
+  (접근자를 `g(k1) or g(k2) or ...` 식 하나로 생성 → 손으로 쓴 정규화 함수와 같은 속도, 키는 repr로만 삽입)
+- normalize_batch(): 페이지 단위 정규화 (행 함수 map 1회 + program_id 생성 - 출처+URL 고정 키, policy_store.make_program_id)
+- JSON 소스 플러그인: PROGRAM_SOURCES 파일에 url/params/items 경로/매핑만 적으면 코드 수정 없이 수집 대상에 추가
+  params 값의 ${이름}은 설정(config_loader) 또는 환경변수로 치환, 비어 있으면 해당 소스는 건너뜀
+- bench(): 소스별 정규화 처리량 측정 (policy_collector --mode bench)
+
+플러그인 파일 예시 (program_sources.json):
+[
+  {"name": "seoul", "url": "https://example.seoul.go.kr/api/notices",
+   "params": {"key": "${SEOUL_API_KEY}", "type": "json"}, "page_param": "pageNo", "rows_param": "numOfRows",
+   "items": "response.body.items.item",
+   "fields": {"title": ["SJ", "title"], "org": ["INSTT_NM"], "apply_from": ["BGN_DE"], "apply_to": ["END_DE"],
+              "url": ["LINK_URL"], "region": ["AREA"]}}
+]
+"""
+
+from __future__ import annotations
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import requests
+
+from config_loader import SETTINGS, get_config
+from policy_store import PROGRAM_FIELDS, make_program_id
+
+# program_id/source는 매핑 대상 아님 (생성/고정값)
+MAPPED_FIELDS = tuple(k for k in PROGRAM_FIELDS if k not in ('program_id', 'source'))
+
+BUILTIN_MAPPINGS: Dict[str, Dict[str, Sequence[str]]] = {
+    # 기업마당: JSON(영문 키) / XML(RSS) / 데이터포털(대문자 키) 응답 혼재
+    'bizinfo': {
+        'title': ('title', 'titl', 'PBLANC_TITLE_NM'),
+        'summary': ('summary', 'cn', 'SUMMARY'),
+        'field': ('field', 'INDUTY_NM'),
+        'target': ('target', 'TRGET_NM'),
+        'region': ('region', 'RDNMADR', 'AREA_NM'),
+        'org': ('instNm', 'PBLANC_INST_NM', 'institution', 'org', 'author'),
+        'apply_from': ('startDate', 'RCEPT_BGNDE'),
+        'apply_to': ('endDate', 'RCEPT_ENDDE'),
+        'url': ('link', 'url', 'PBLANC_URL'),
+        'contact': ('contact', 'CHARGER_TELNO'),
+        'benefit': ('benefit', 'SUPLY_SCALE_NM'),
+        'reqs': ('reqs', 'REQ_CN'),
+        'attachments': ('attachments',),
+    },
+    'kstartup': {
+        'title': ('PBLANC_TITLE_NM', 'title'),
+        'summary': ('PBLANC_SUMRY', 'summary'),
+        'field': ('INDUTY_NM', 'field'),
+        'target': ('TRGET_NM', 'target'),
+        'region': ('AREA_NM', 'region'),
+        'org': ('PBLANC_INST_NM', 'org'),
+        'apply_from': ('RCEPT_BGNDE', 'apply_from'),
+        'apply_to': ('RCEPT_ENDDE', 'apply_to'),
+        'url': ('PBLANC_URL', 'url'),
+        'contact': ('CHARGER_TELNO', 'contact'),
+        'benefit': ('SUPLY_SCALE_NM', 'benefit'),
+        'reqs': ('REQ_CN', 'reqs'),
+        'attachments': ('attachments',),
+    },
+}
+
+_PLACEHOLDER_RE = re.compile(r'\$\{(\w+)\}')
+
+
+@dataclass(frozen=True)
+class SourceMapping:
+    source: str
+    accessors: Tuple[Tuple[str, Tuple[str, ...]], ...]   # MAPPED_FIELDS 순서
+    row: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = field(compare=False, repr=False, default=None)
+
+
+def _compile_row(source: str, accessors: Sequence[Tuple[str, Tuple[str, ...]]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    # 원문 1건 → 공통 스키마 dict (program_id 제외), `raw.get(a) or raw.get(b)`와 같은 의미
+    entries = []
+    for name, keys in accessors:
+        expr = ' or '.join(f"g({k!r})" for k in keys)
+        entries.append(f"{name!r}: ({expr}) or []" if name == 'attachments' else f"{name!r}: {expr}")
+    code = f"def row(r):\n    g = r.get\n    return {{{', '.join(entries)}, 'source': {source!r}}}\n"
+    namespace: Dict[str, Any] = {}
+    exec(compile(code, f"<mapping:{source}>", 'exec'), namespace)
+    return namespace['row']
+
+
+def compile_mapping(source: str, fields: Mapping[str, Sequence[str]]) -> SourceMapping:
+    """매핑 spec → 접근자 튜플 (spec에 없는 필드는 같은 이름의 키, 알 수 없는 필드는 ValueError)"""
+    unknown = set(fields) - set(MAPPED_FIELDS)
+    if unknown:
+        raise ValueError(f"[{source}] 알 수 없는 매핑 필드: {sorted(unknown)}")
+    accessors = []
+    for name in MAPPED_FIELDS:
+        keys = fields.get(name) or (name,)
+        accessors.append((name, (keys,) if isinstance(keys, str) else tuple(str(k) for k in keys)))
+    return SourceMapping(source=source, accessors=tuple(accessors), row=_compile_row(source, accessors))
+
+
+def normalize_batch(mapping: SourceMapping, raws: Sequence[Any]) -> List[Dict[str, Any]]:
+    """원문 페이지 → 공통 스키마 목록 (dict가 아닌 항목은 제외)"""
+    items = list(map(mapping.row, [r for r in raws if isinstance(r, dict)]))
+    for item in items:
+        item['program_id'] = make_program_id(item['source'], item['title'], item['org'], item['url'])
+    return items
+
+
+def normalize_one(mapping: SourceMapping, raw: Dict[str, Any]) -> Dict[str, Any]:
+    return normalize_batch(mapping, [raw])[0]
+
+
+BUILTIN = {source: compile_mapping(source, fields) for source, fields in BUILTIN_MAPPINGS.items()}
+
+
+# ==============================
+# JSON 소스 플러그인
+# ==============================
+def extract_items(data: Any, path: Optional[str] = None) -> List[Any]:
+    """JSON 응답 → 항목 목록 (path: 'response.body.items.item', 미지정 시 공공데이터 공통 형태 추정)"""
+    if path:
+        for key in path.split('.'):
+            data = data.get(key) if isinstance(data, dict) else None
+        items = data
+    else:
+        items = data.get('items') or data.get('response') or data
+        if isinstance(items, dict) and 'item' in items:
+            items = items['item']
+    if items is None:
+        return []
+    return items if isinstance(items, list) else [items]
+
+
+def _resolve(value: Any) -> Tuple[Any, bool]:
+    # ${이름} 치환 → (값, 모든 치환값 존재 여부)
+    if not isinstance(value, str):
+        return value, True
+    cfg, ok = get_config(), True
+
+    def sub(m: re.Match) -> str:
+        nonlocal ok
+        name = m.group(1)
+        found = str(getattr(cfg, name) if name in SETTINGS else os.environ.get(name, '') or '')
+        ok = ok and bool(found)
+        return found
+
+    return _PLACEHOLDER_RE.sub(sub, value), ok
+
+
+@dataclass(frozen=True)
+class JsonSource:
+    name: str
+    url: str
+    mapping: SourceMapping
+    params: Tuple[Tuple[str, Any], ...] = ()
+    items_path: Optional[str] = None
+    page_param: str = 'pageNo'
+    rows_param: str = 'numOfRows'
+    timeout: int = 15
+
+    def fetch(self, page: int = 1, rows: int = 50) -> List[Any]:
+        params = {}
+        for key, value in self.params:
+            params[key], ok = _resolve(value)
+            if not ok:
+                return []   # API 키 미설정 소스는 건너뜀 (K-Startup과 동일)
+        params[self.page_param] = page
+        params[self.rows_param] = rows
+        r = requests.get(self.url, params=params, timeout=self.timeout)
+        r.raise_for_status()
+        return extract_items(r.json(), self.items_path)
+
+    def normalize(self, raws: Sequence[Any]) -> List[Dict[str, Any]]:
+        return normalize_batch(self.mapping, raws)
+
+
+def compile_source(spec: Dict[str, Any]) -> JsonSource:
+    name = str(spec.get('name') or '').strip()
+    if not name or not spec.get('url'):
+        raise ValueError(f"소스 spec에 name/url이 필요합니다: {spec}")
+    return JsonSource(
+        name=name, url=spec['url'], mapping=compile_mapping(name, spec.get('fields') or {}),
+        params=tuple((spec.get('params') or {}).items()), items_path=spec.get('items'),
+        page_param=spec.get('page_param', 'pageNo'), rows_param=spec.get('rows_param', 'numOfRows'),
+        timeout=int(spec.get('timeout', 15)),
+    )
+
+
+_sources_cache: Dict[str, Tuple[float, Tuple[JsonSource, ...]]] = {}
+
+
+def load_sources(path: Optional[str] = None) -> Tuple[JsonSource, ...]:
+    """플러그인 파일 → 컴파일된 JSON 소스 (파일이 바뀔 때만 다시 컴파일, 파일이 없으면 빈 튜플)"""
+    path = path or get_config().PROGRAM_SOURCES
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return ()
+    cached = _sources_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding='utf-8') as f:
+        sources = tuple(compile_source(spec) for spec in json.load(f))
+    _sources_cache[path] = (mtime, sources)
+    return sources
+
+
+# ==============================
+# 처리량 측정
+# ==============================
+def synthetic_page(mapping: SourceMapping, rows: int) -> List[Dict[str, Any]]:
+    """매핑의 키 후보를 돌아가며 쓰는 가짜 원문 (일부 필드는 비움)"""
+    page = []
+    for i in range(rows):
+        raw: Dict[str, Any] = {}
+        for j, (name, keys) in enumerate(mapping.accessors):
+            if (i + j) % 7 == 0:
+                continue
+            raw[keys[(i + j) % len(keys)]] = [] if name == 'attachments' else f"{name}-{i}"
+        page.append(raw)
+    return page
+
+
+def bench(mappings: Optional[Mapping[str, SourceMapping]] = None, rows: int = 5000,
+          repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """소스별 정규화 처리량 → {source: {"batch_rows_per_sec", "row_rows_per_sec"}} (최고 기록 기준)"""
+    mappings = mappings if mappings is not None else {
+        **BUILTIN, **{s.name: s.mapping for s in load_sources()}
+    }
+    results = {}
+    for source, mapping in mappings.items():
+        page = synthetic_page(mapping, rows)
+        timings: Dict[str, float] = {}
+        runs: Dict[str, Callable[[], Any]] = {
+            'batch': lambda: normalize_batch(mapping, page),
+            'row': lambda: [normalize_one(mapping, raw) for raw in page],
+        }
+        for label, run in runs.items():
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                best = min(best, time.perf_counter() - start)
+            timings[f"{label}_rows_per_sec"] = rows / best if best else float('inf')
+        results[source] = timings
+    return results
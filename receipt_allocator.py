@@ -0,0 +1,204 @@
+"""
+유아플랜 접수번호 발급기
+- 형식: YP + YYMMDD + 일련번호 6자리 (예: YP251213000042) → 하루 최대 999,999건
+- 문자열 정렬 = 발급 시간 순서 (연도 포함)
+- 일련번호 블록은 공용 저장소(GAS reserve_receipt_block, apps/receipt_seq.gs)에서 예약
+  → 랜딩/설문 등 여러 앱·인스턴스, 디스크 초기화(재배포) 후에도 중복 없음
+- GAS 장애/미연결 시 로컬 SQLite 카운터로 대체 발급: 인스턴스별 구간 9 + RECEIPT_NODE_ID(0~9) + 4자리
+  (하루 인스턴스당 9,999건, GAS 발급 구간 000001~899999와 겹치지 않음)
+  RECEIPT_NODE_ID를 앱마다 명시적으로 지정한 경우에만 대체 발급 (미지정 시 ReceiptUnavailableError → 잠시 후 재시도 안내)
+  로컬 카운터는 시각 하한(자정부터 경과 시간 비례)부터 시작 → 재배포/디스크 초기화 후에도 그날 앞서 쓴 번호를 건너뜀
+- 블록 내 발급은 메모리에서 처리 (초당 수천 건)
+- 기존 형식(YP + MMDD + 4자리)도 검증/날짜 색인에서 계속 지원
+"""
+
+from __future__ import annotations
+import bisect
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+STATE_DB_PATH = os.getenv('SURVEY_STATE_DB_PATH', 'survey_state.db')
+BLOCK_SIZE = int(os.getenv('RECEIPT_BLOCK_SIZE', '50'))
+REMOTE_ACTION = 'reserve_receipt_block'
+REMOTE_TIMEOUT = 5
+FALLBACK_BASE = 900_000        # 이 이상은 로컬 대체 발급 구간 (GAS는 1 ~ FALLBACK_BASE-1)
+FALLBACK_SPAN = 10_000         # 인스턴스(RECEIPT_NODE_ID)당 구간 크기
+DAY_SECONDS = 86_400
+
+# (day, 개수) → 예약된 [start, end) 또는 None (공용 저장소 실패)
+RemoteReserver = Callable[[str, int], Optional[Tuple[int, int]]]
+
+# 신규(12자리) + 기존(8자리) 형식 모두 허용
+RECEIPT_PATTERN = re.compile(r'^YP(\d{12}|\d{8})$')
+
+DDL = """
+CREATE TABLE IF NOT EXISTS receipt_seq (
+  day TEXT PRIMARY KEY,          -- YYMMDD
+  next_seq INTEGER NOT NULL      -- 다음 대체 발급 블록 시작 번호 (인스턴스 구간 내 1 ~ 9,999)
+);
+"""
+
+
+class ReceiptUnavailableError(RuntimeError):
+    """공용 저장소 예약 실패 + 대체 발급 불가 (RECEIPT_NODE_ID 미지정 또는 일일 한도 초과)"""
+
+
+class ReceiptAllocator:
+    """블록 예약 방식 접수번호 발급기 (스레드/프로세스 안전)"""
+
+    def __init__(self, db_path: str = STATE_DB_PATH, block_size: int = BLOCK_SIZE,
+                 clock: Callable[[], datetime] = datetime.now,
+                 remote: Optional[RemoteReserver] = None, node_id: Optional[int] = None):
+        # node_id None: 로컬 대체 발급 안 함 (여러 앱이 같은 구간을 쓰면 접수번호 중복)
+        if node_id is not None and not 0 <= node_id <= 9:
+            raise ValueError(f"RECEIPT_NODE_ID는 0~9: {node_id}")
+        self.db_path = db_path
+        self.block_size = max(1, block_size)
+        self.clock = clock
+        self.remote = remote
+        self.node_id = node_id
+        self._lock = threading.Lock()
+        self._day = ''
+        self._next = 0
+        self._end = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        conn.executescript(DDL)
+        return conn
+
+    def _reserve_block(self, day: str, now: datetime) -> Tuple[int, int]:
+        """[start, end) 구간 예약 (공용 저장소 우선, 실패 시 인스턴스 구간에서 로컬 예약)"""
+        if self.remote is not None:
+            block = self.remote(day, self.block_size)
+            if block and 1 <= block[0] < block[1] <= FALLBACK_BASE:
+                return block
+        if self.node_id is None:
+            raise ReceiptUnavailableError("접수번호 공용 저장소 응답 없음 (RECEIPT_NODE_ID 미지정 → 대체 발급 안 함)")
+        return self._reserve_local_block(day, now)
+
+    def _reserve_local_block(self, day: str, now: datetime) -> Tuple[int, int]:
+        """로컬 카운터에서 [start, end) 구간을 원자적으로 예약 (FALLBACK_BASE + node_id 구간)
+        시작 번호는 시각 하한 이상 → 상태 파일이 초기화돼도 같은 날 앞서 발급한 번호와 겹치지 않음
+        (대체 발급 속도가 평균 8.6초당 1건보다 빠르지 않은 한)"""
+        elapsed = now.hour * 3600 + now.minute * 60 + now.second
+        floor = 1 + elapsed * (FALLBACK_SPAN - 1) // DAY_SECONDS
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                "INSERT INTO receipt_seq (day, next_seq) VALUES (?, 1) ON CONFLICT(day) DO NOTHING",
+                (day,)
+            )
+            start = max(floor, conn.execute("SELECT next_seq FROM receipt_seq WHERE day = ?", (day,)).fetchone()[0])
+            end = min(start + self.block_size, FALLBACK_SPAN)
+            if start >= FALLBACK_SPAN:
+                conn.execute('ROLLBACK')
+                raise ReceiptUnavailableError(f"일일 접수번호 한도 초과 ({day}, 인스턴스 {self.node_id})")
+            conn.execute("UPDATE receipt_seq SET next_seq = ? WHERE day = ?", (end, day))
+            conn.execute('COMMIT')
+            base = FALLBACK_BASE + self.node_id * FALLBACK_SPAN
+            return base + start, base + end
+        finally:
+            conn.close()
+
+    def next(self) -> str:
+        """새 접수번호 발급"""
+        now = self.clock()
+        day = now.strftime('%y%m%d')
+        with self._lock:
+            if day != self._day or self._next >= self._end:
+                self._next, self._end = self._reserve_block(day, now)
+                self._day = day
+            seq = self._next
+            self._next += 1
+        return f"YP{day}{seq:06d}"
+
+
+_default_allocator: Optional[ReceiptAllocator] = None
+_default_lock = threading.Lock()
+
+
+def gas_reserver(url: str, api_token: str, timeout: float = REMOTE_TIMEOUT) -> RemoteReserver:
+    """GAS reserve_receipt_block 호출 함수 (재시도 없음 - 실패 시 로컬 대체 발급)"""
+    def reserve(day: str, count: int) -> Optional[Tuple[int, int]]:
+        from request_helper import json_post
+        ok, _, data, _ = json_post(url, {'action': REMOTE_ACTION, 'day': day, 'count': count,
+                                         'api_token': api_token}, timeout=timeout, retries=0)
+        if not ok or not data.get('ok'):
+            return None
+        try:
+            return int(data['start']), int(data['end'])
+        except (KeyError, TypeError, ValueError):
+            return None
+    return reserve
+
+
+def allocate_receipt_no() -> str:
+    """프로세스 공용 발급기로 접수번호 발급 (RECEIPT_SEQ_URL 미설정 시 FIRST_GAS_URL)
+    발급 불가 시 ReceiptUnavailableError"""
+    global _default_allocator
+    with _default_lock:
+        if _default_allocator is None:
+            from config_loader import get_config
+            cfg = get_config()
+            _default_allocator = ReceiptAllocator(
+                remote=gas_reserver(cfg.RECEIPT_SEQ_URL or cfg.FIRST_GAS_URL, cfg.API_TOKEN),
+                node_id=cfg.RECEIPT_NODE_ID if cfg.is_set('RECEIPT_NODE_ID') else None,
+            )
+    return _default_allocator.next()
+
+
+# ==============================
+# 검증 / 날짜 색인
+# ==============================
+def is_valid_receipt_no(receipt_no: str) -> bool:
+    return bool(receipt_no) and bool(RECEIPT_PATTERN.match(receipt_no.strip()))
+
+
+def receipt_date(receipt_no: str, today: Optional[date] = None) -> Optional[date]:
+    """접수번호에서 접수일 추출
+
+    기존 형식(MMDD)은 연도가 없으므로 오늘 기준 가장 최근의 해당 날짜로 해석
+    """
+    if not is_valid_receipt_no(receipt_no):
+        return None
+    digits = receipt_no.strip()[2:]
+    try:
+        if len(digits) == 12:
+            return datetime.strptime(digits[:6], '%y%m%d').date()
+        today = today or date.today()
+        month, day = int(digits[:2]), int(digits[2:4])
+        candidate = date(today.year, month, day)
+        return candidate if candidate <= today else date(today.year - 1, month, day)
+    except ValueError:
+        return None
+
+
+class ReceiptTimeIndex:
+    """접수번호를 접수일 순으로 정렬해 기간 조회를 이진 탐색으로 처리"""
+
+    def __init__(self, receipt_nos: Iterable[str], today: Optional[date] = None):
+        keyed = []
+        for receipt_no in receipt_nos:
+            d = receipt_date(receipt_no, today)
+            if d is not None:
+                keyed.append((d.toordinal(), receipt_no))
+        keyed.sort()
+        self._days: List[int] = [k[0] for k in keyed]
+        self._receipts: List[str] = [k[1] for k in keyed]
+
+    def __len__(self) -> int:
+        return len(self._receipts)
+
+    def between(self, start: date, end: date) -> List[str]:
+        lo = bisect.bisect_left(self._days, start.toordinal())
+        hi = bisect.bisect_right(self._days, end.toordinal())
+        return self._receipts[lo:hi]
+
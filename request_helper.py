@@ -1,33 +1,359 @@
 from __future__ import annotations
-import json, time
-from typing import Any, Dict, Optional, Tuple
-import requests
+import json, re, threading, time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
-# json_post(url, payload, headers=None, timeout=10, retries=1) -> (ok, status_code, data, err)
-def json_post(url: str, payload: Dict[str, Any], headers: Optional[Dict[str,str]]=None, timeout: int=10, retries: int=1) -> Tuple[bool, Optional[int], Dict[str,Any], Optional[str]]:
-    h = {'Content-Type':'application/json', **(headers or {})}
+from config_loader import get_config
+
+# requests는 첫 요청 시 import (설문 앱 콜드 스타트 단축)
+
+Result = Tuple[bool, Optional[int], Dict[str, Any], Optional[str]]
+
+# ==============================
+# 엔드포인트별 서킷 브레이커 + 적응형 타임아웃
+# ==============================
+FAILURE_THRESHOLD = 5          # 연속 실패 N회 → 열림
+OPEN_SECONDS = 30.0            # 열림 유지 시간 → 이후 시험 요청 1건 허용(half-open)
+LATENCY_WINDOW = 100           # 동작(action)별 최근 응답시간 표본 수
+MIN_SAMPLES = 10               # 표본이 이보다 적으면 설정 타임아웃 그대로 사용
+TIMEOUT_PERCENTILE = 0.95
+TIMEOUT_MULTIPLIER = 3.0       # 적응형 타임아웃 = p95 × 3 (MIN_TIMEOUT ~ 설정값 사이) - 조회(GET)에만 적용
+MIN_TIMEOUT = 5.0
+CIRCUIT_OPEN_ERROR = 'circuit open'
+# GAS 라우터의 "알 수 없는 액션" 응답 (해당 액션이 배포되지 않음)
+_UNKNOWN_ACTION_RE = re.compile(r"(unknown|invalid|unsupported) action|알 수 없는 (요청|액션)|지원하지 않는", re.IGNORECASE)
+
+def is_unknown_action(data: Any) -> bool:
+    """GAS 응답이 액션 미배포(알 수 없는 액션) 오류인지"""
+    if not isinstance(data, dict):
+        return False
+    return bool(_UNKNOWN_ACTION_RE.search(str(data.get('error') or data.get('message') or '')))
+
+def _percentile(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered)-1, int(q*len(ordered)))]
+
+class CircuitBreaker:
+    """GAS 엔드포인트 1개의 상태 (closed → open → half_open → closed)"""
+
+    def __init__(self, endpoint: str, failure_threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, action: str, latency: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(action, deque(maxlen=LATENCY_WINDOW)).append(latency)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.state = 'closed'
+            self._trial_in_flight = False
+
+    def record_failure(self, action: str = '', latency: Optional[float] = None) -> None:
+        # latency: 응답 시간 초과로 끊은 요청의 대기 시간 → 표본에 넣어 p95가 느려진 응답을 따라가게 함
+        with self._lock:
+            if latency is not None:
+                self._latencies.setdefault(action, deque(maxlen=LATENCY_WINDOW)).append(latency)
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def percentile(self, action: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latencies.get(action, ()))
+        return _percentile(samples, q) if len(samples) >= MIN_SAMPLES else None
+
+    def timeout_for(self, action: str, cap: float) -> float:
+        """관측 응답시간 기반 타임아웃 (표본 부족 시 cap)"""
+        p = self.percentile(action, TIMEOUT_PERCENTILE)
+        if p is None:
+            return cap
+        return max(MIN_TIMEOUT, min(cap, p*TIMEOUT_MULTIPLIER))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            actions = {a: list(s) for a, s in self._latencies.items()}
+            info = {
+                'endpoint': self.endpoint, 'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'successes': self.successes, 'failures': self.failures, 'rejected': self.rejected,
+            }
+        info['latency'] = {
+            a: {'p50': _percentile(s, 0.5), 'p95': _percentile(s, 0.95), 'samples': len(s)}
+            for a, s in actions.items()
+        }
+        return info
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(url: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = _breakers[url] = CircuitBreaker(url)
+        return breaker
+
+def endpoint_health() -> Dict[str, Dict[str, Any]]:
+    """엔드포인트별 서킷 상태/응답시간 (대시보드 표시용)"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.endpoint: b.snapshot() for b in breakers}
+
+# ==============================
+# 요청
+# ==============================
+def _defaults(timeout: Optional[float], retries: Optional[int]) -> Tuple[float, int]:
+    # 미지정 시 설정값 사용: REQUEST_TIMEOUT초, 총 MAX_RETRY_ATTEMPTS회 시도
+    cfg = get_config()
+    if timeout is None:
+        timeout = cfg.REQUEST_TIMEOUT
+    if retries is None:
+        retries = max(0, cfg.MAX_RETRY_ATTEMPTS - 1)
+    return timeout, retries
+
+def _not_sent(e: Exception) -> bool:
+    """연결 단계 실패(연결 시간 초과/거부, DNS)인지 - 요청 본문이 서버에 닿지 않았음이 확실한 경우만
+    전송 후 끊김(connection reset, RemoteDisconnected)은 GAS가 이미 기록했을 수 있으므로 제외"""
+    import requests
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    if not isinstance(e, requests.ConnectionError) or not e.args:
+        return False
+    from urllib3.exceptions import NewConnectionError
+    reason = getattr(e.args[0], 'reason', e.args[0])   # MaxRetryError.reason
+    return isinstance(reason, NewConnectionError)
+
+def gas_error(data: Any) -> Optional[str]:
+    """HTTP 2xx GAS 응답 본문의 실패 메시지 (성공이면 None)
+    {"status": "error"} / {"ok": false} / JSON이 아닌 응답(GAS 예외 페이지)은 실패"""
+    if not isinstance(data, dict):
+        return 'GAS 응답 형식 오류'
+    if data.get('status') == 'error' or data.get('ok') is False:
+        return str(data.get('message') or data.get('error') or 'GAS 오류 응답')
+    if set(data) == {'text'}:
+        return 'GAS 응답 형식 오류'
+    return None
+
+def _request(method: str, url: str, timeout: float, retries: int, action: str = '', **kwargs) -> Tuple[Result, bool]:
+    """→ (결과, 미전송 여부) - 미전송: 서킷 열림 또는 연결 단계 실패로 요청이 서버에 닿지 않음
+    적응형 타임아웃은 GET만: 쓰기(POST)는 설정 타임아웃 그대로 (GAS가 기록 중인데 끊으면 재제출 → 중복 행)"""
+    import requests
+    breaker = get_breaker(url)
     last_err: Optional[str] = None
     for i in range(retries+1):
+        if not breaker.allow():
+            return (False, None, {}, CIRCUIT_OPEN_ERROR), True
+        started = time.monotonic()
         try:
-            r = requests.post(url, data=json.dumps(payload), headers=h, timeout=timeout)
+            r = requests.request(method, url, timeout=breaker.timeout_for(action, timeout) if method == 'GET' else timeout, **kwargs)
             sc = r.status_code
             try:
                 data = r.json()
             except Exception:
                 data = {'text': r.text[:500]}
             if 200 <= sc <= 299:
-                return True, sc, data, None
-            # 408/429/5xx는 재시도 여지
+                breaker.record_success(action, time.monotonic() - started)
+                return (True, sc, data, None), False
+            # 408/429/5xx는 재시도 여지 (서킷 실패로 집계)
             if sc in (408,429) or 500 <= sc <= 599:
+                breaker.record_failure()
                 last_err = data.get('message') if isinstance(data,dict) else str(data)
                 if i < retries:
                     time.sleep(0.6*(i+1))
                     continue
-            return False, sc, data if isinstance(data,dict) else {}, last_err or f'HTTP {sc}'
+            else:
+                breaker.record_success(action, time.monotonic() - started)
+            return (False, sc, data if isinstance(data,dict) else {}, last_err or f'HTTP {sc}'), False
         except requests.RequestException as e:
+            breaker.record_failure(action, time.monotonic() - started if isinstance(e, requests.ReadTimeout) else None)
             last_err = str(e)
             if i < retries:
                 time.sleep(0.6*(i+1))
                 continue
-            return False, None, {}, last_err
-    return False, None, {}, last_err or 'unknown error'
+            # 연결 단계 실패만 미전송 (대기열 재전송 대상) - 전송 후 끊김은 재전송하면 중복 행 위험
+            return (False, None, {}, last_err), _not_sent(e)
+    return (False, None, {}, last_err or 'unknown error'), False
+
+# json_post(url, payload, headers=None, timeout=None, retries=None) -> (ok, status_code, data, err)
+def json_post(url: str, payload: Dict[str, Any], headers: Optional[Dict[str,str]]=None, timeout: Optional[float]=None, retries: Optional[int]=None) -> Result:
+    timeout, retries = _defaults(timeout, retries)
+    h = {'Content-Type':'application/json', **(headers or {})}
+    result, _ = _request('POST', url, timeout, retries, action=str(payload.get('action', '')), data=json.dumps(payload), headers=h)
+    return result
+
+# json_send(url, payload, headers=None, timeout=None) -> ((ok, status_code, data, err), 미전송 여부)
+# 재시도 없는 POST 1회 - 미전송: 서킷 열림/연결 단계 실패로 본문이 서버에 닿지 않음 (다시 보내도 중복 없음)
+def json_send(url: str, payload: Dict[str, Any], headers: Optional[Dict[str,str]]=None, timeout: Optional[float]=None) -> Tuple[Result, bool]:
+    timeout, _ = _defaults(timeout, 0)
+    h = {'Content-Type':'application/json', **(headers or {})}
+    return _request('POST', url, timeout, 0, action=str(payload.get('action', '')), data=json.dumps(payload), headers=h)
+
+# json_write(url, payload, headers=None, timeout=None) -> (ok, status_code, data, err)
+# 쓰기 전용: 자동 재시도 없음. 서킷 열림/연결 단계 실패로 전달되지 못하면 로컬 outbox에 저장 후
+# (True, None, {"status": "pending", "outbox_id": ...}, None) 반환 → outbox 워커가 복구 후 전송
+def json_write(url: str, payload: Dict[str, Any], headers: Optional[Dict[str,str]]=None, timeout: Optional[float]=None) -> Result:
+    result, undelivered = json_send(url, payload, headers=headers, timeout=timeout)
+    if not undelivered:
+        return result
+    from outbox import get_outbox
+    outbox_id = get_outbox().enqueue(url, payload, headers)
+    return True, None, {'status': 'pending', 'outbox_id': outbox_id, 'message': result[3]}, None
+
+# ==============================
+# 조회 (실패 시 마지막 정상 응답)
+# ==============================
+LAST_GOOD_MAX = 200
+_last_good: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+_last_good_lock = threading.Lock()
+
+def _last_good_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+    return url + '?' + json.dumps(params or {}, sort_keys=True, default=str)
+
+# ==============================
+# 헤지 요청 (조회 전용, opt-in)
+# - 첫 요청이 관측 p90 안에 응답하지 않으면 같은 요청 1건을 더 보내 먼저 온 응답 사용
+# - 추가 요청은 전체 헤지 대상 요청의 HEDGE_BUDGET_RATIO(기본 10%) 이내로 제한
+# ==============================
+HEDGE_PERCENTILE = 0.90
+HEDGE_MIN_DELAY = 0.05
+HEDGE_BURST = 2                # 예산 계산 시 허용하는 초기 여유분
+HEDGE_METRIC_WINDOW = 200
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_lock = threading.Lock()
+_hedge_stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'skipped_budget': 0}
+# 헤지 요청의 (실제 응답 시간, 첫 요청만 기다렸을 때의 응답 시간)
+_hedge_latencies: Deque[Tuple[float, float]] = deque(maxlen=HEDGE_METRIC_WINDOW)
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='gas-hedge')
+        return _hedge_pool
+
+def _take_hedge_budget() -> bool:
+    ratio = get_config().HEDGE_BUDGET_RATIO
+    with _hedge_lock:
+        if _hedge_stats['hedged'] + 1 > ratio*_hedge_stats['requests'] + HEDGE_BURST:
+            _hedge_stats['skipped_budget'] += 1
+            return False
+        _hedge_stats['hedged'] += 1
+        return True
+
+def _timed_request(*args, **kwargs) -> Tuple[Tuple[Result, bool], float]:
+    started = time.monotonic()
+    outcome = _request(*args, **kwargs)
+    return outcome, time.monotonic() - started
+
+def _hedged_request(url: str, timeout: float, action: str, **kwargs) -> Result:
+    breaker = get_breaker(url)
+    delay = breaker.percentile(action, HEDGE_PERCENTILE)
+    with _hedge_lock:
+        _hedge_stats['requests'] += 1
+    started = time.monotonic()
+    pool = _get_hedge_pool()
+    primary = pool.submit(_timed_request, 'GET', url, timeout, 0, action=action, **kwargs)
+    if delay is None:
+        # 표본 부족 → 헤지 없이 일반 요청
+        return primary.result()[0][0]
+
+    done, _ = wait([primary], timeout=max(HEDGE_MIN_DELAY, delay))
+    if done or not _take_hedge_budget():
+        return primary.result()[0][0]
+
+    hedge = pool.submit(_timed_request, 'GET', url, timeout, 0, action=action, **kwargs)
+    pending = {primary, hedge}
+    winner = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if winner is None and future.result()[0][0][0]:
+                winner = future
+        if winner is not None:
+            break
+    elapsed = time.monotonic() - started
+
+    def _record(primary_future):
+        # 첫 요청만 기다렸다면 걸렸을 시간 (첫 요청 완료 시점에 기록)
+        with _hedge_lock:
+            _hedge_latencies.append((elapsed, primary_future.result()[1]))
+    primary.add_done_callback(_record)
+
+    if winner is None:
+        return primary.result()[0][0]
+    if winner is hedge:
+        with _hedge_lock:
+            _hedge_stats['hedge_wins'] += 1
+    return winner.result()[0][0]
+
+def hedge_metrics() -> Dict[str, Any]:
+    """헤지 요청 통계 - 실제 응답 시간과 첫 요청만 기다렸을 때의 p50/p99 비교 (대시보드 표시용)"""
+    with _hedge_lock:
+        stats = dict(_hedge_stats)
+        samples: List[Tuple[float, float]] = list(_hedge_latencies)
+    observed = [s[0] for s in samples]
+    primary_only = [s[1] for s in samples]
+    stats.update({
+        'extra_load': stats['hedged']/stats['requests'] if stats['requests'] else 0.0,
+        'p50': _percentile(observed, 0.5), 'p99': _percentile(observed, 0.99),
+        'p50_primary': _percentile(primary_only, 0.5), 'p99_primary': _percentile(primary_only, 0.99),
+        'saved_seconds': sum(max(0.0, p - o) for o, p in samples),
+    })
+    return stats
+
+# json_get(url, params=None, headers=None, timeout=None, retries=None, hedge=False) -> (ok, status_code, data, err)
+# 서킷 열림/타임아웃/5xx 시 같은 요청의 마지막 정상 응답을 반환 (data['_stale'] = True)
+# hedge=True: 멱등 조회에 한해 헤지 요청 사용 (재시도 대신 병렬 1건)
+def json_get(url: str, params: Optional[Dict[str, Any]]=None, headers: Optional[Dict[str,str]]=None, timeout: Optional[float]=None, retries: Optional[int]=None, use_last_good: bool=True, hedge: bool=False) -> Result:
+    timeout, retries = _defaults(timeout, retries)
+    action = str((params or {}).get('action', ''))
+    if hedge:
+        ok, sc, data, err = _hedged_request(url, timeout, action, params=params, headers=headers)
+    else:
+        (ok, sc, data, err), _ = _request('GET', url, timeout, retries, action=action, params=params, headers=headers)
+    key = _last_good_key(url, params)
+    if ok:
+        if use_last_good and isinstance(data, dict):
+            with _last_good_lock:
+                _last_good[key] = data
+                _last_good.move_to_end(key)
+                while len(_last_good) > LAST_GOOD_MAX:
+                    _last_good.popitem(last=False)
+        return ok, sc, data, err
+    unavailable = sc is None or sc in (408,429) or 500 <= sc <= 599
+    if use_last_good and unavailable:
+        with _last_good_lock:
+            cached = _last_good.get(key)
+        if cached is not None:
+            return True, None, {**cached, '_stale': True}, None
+    return ok, sc, data, err
@@ -0,0 +1,76 @@
+"""
+유아플랜 앱 시작 시간 측정 (콜드 스타트 추적용)
+- STARTUP_TIMING=1 일 때만 동작 (기본 비활성 → 오버헤드 없음)
+- install(): 이후 처음 로드되는 모듈마다 import 시간(누적/자체)을 기록
+- report_once(app): 프로세스 첫 실행(콜드 스타트)이 끝난 시점에 총 소요 시간과
+  가장 느린 import 목록을 stderr로 1회 출력
+- 더 자세한 분석은 python -X importtime 사용
+"""
+
+from __future__ import annotations
+import builtins
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+STARTUP_TIMING = os.getenv("STARTUP_TIMING", "").lower() in ("1", "true", "yes")
+REPORT_TOP_N = int(os.getenv("STARTUP_TIMING_TOP", "15"))
+
+_process_start = time.perf_counter()
+_original_import = builtins.__import__
+_installed = False
+_reported = set()
+_lock = threading.Lock()
+_local = threading.local()
+# 모듈명 → (누적 초, 자체 초)
+_records: Dict[str, Tuple[float, float]] = {}
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack: List[float] = getattr(_local, "stack", None) or []
+    _local.stack = stack
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _lock:
+            _records.setdefault(name, (elapsed, elapsed - children))
+
+
+def install() -> bool:
+    """import 시간 기록 시작 (STARTUP_TIMING 비활성 시 아무것도 하지 않음)"""
+    global _installed
+    if not STARTUP_TIMING or _installed:
+        return _installed
+    builtins.__import__ = _timed_import
+    _installed = True
+    return True
+
+
+def slowest_imports(top: int = REPORT_TOP_N) -> List[Tuple[str, float, float]]:
+    """[(모듈명, 누적 ms, 자체 ms)] 누적 시간 내림차순"""
+    with _lock:
+        items = sorted(_records.items(), key=lambda kv: kv[1][0], reverse=True)
+    return [(name, total * 1000, own * 1000) for name, (total, own) in items[:top]]
+
+
+def report_once(app: str) -> None:
+    """프로세스당 1회 시작 시간 보고 (첫 스크립트 실행 종료 시 호출)"""
+    if not _installed or app in _reported:
+        return
+    _reported.add(app)
+    elapsed_ms = (time.perf_counter() - _process_start) * 1000
+    lines = [f"[startup] {app}: {elapsed_ms:.0f}ms (imports {len(_records)})"]
+    for name, total_ms, own_ms in slowest_imports():
+        lines.append(f"[startup]   {name:<40} {total_ms:8.1f}ms (self {own_ms:.1f}ms)")
+    print("\n".join(lines), file=sys.stderr, flush=True)
@@ -0,0 +1,142 @@
+"""
+유아플랜 중복 제출 방지 색인
+- 키: 정규화 연락처(010-XXXX-XXXX) + 제출 내용 해시
+- DUPLICATE_CACHE_TTL(config_loader, 기본 30분) 안에 같은 키로 다시 제출하면 기존 접수번호를 반환 (GAS 쓰기 생략)
+- 더블클릭처럼 첫 전송이 끝나기 전에 들어온 제출도 선점(pending) 행으로 차단
+- 접수번호 발급기와 같은 로컬 SQLite 파일 사용 → 여러 워커 프로세스에서 공유
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config_loader import get_config
+from receipt_allocator import STATE_DB_PATH
+
+# 전송 중(pending) 상태로 이 시간이 지나면 중단된 제출로 보고 새 제출 허용
+PENDING_TIMEOUT = 120
+
+# 해시에서 제외할 메타 필드 (같은 내용이면 접수번호/버전이 달라도 중복)
+HASH_EXCLUDE_FIELDS = ('receipt_no', 'release_version', 'token', 'source')
+
+DDL = """
+CREATE TABLE IF NOT EXISTS submissions (
+  phone TEXT NOT NULL,
+  payload_hash TEXT NOT NULL,
+  receipt_no TEXT NOT NULL,
+  status TEXT NOT NULL,             -- pending | sent
+  created_at REAL NOT NULL,
+  PRIMARY KEY (phone, payload_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_created_at ON submissions(created_at);
+"""
+
+
+def payload_hash(data: Dict[str, Any], exclude: Iterable[str] = HASH_EXCLUDE_FIELDS) -> str:
+    """제출 내용 해시 (키 순서/앞뒤 공백 무관)"""
+    skip = set(exclude)
+    normalized = {
+        k: (v.strip() if isinstance(v, str) else v)
+        for k, v in data.items() if k not in skip
+    }
+    raw = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SubmissionDedup:
+    """연락처 + 내용 해시 기준 TTL 중복 제출 색인"""
+
+    def __init__(self, db_path: str = STATE_DB_PATH, ttl: Optional[int] = None):
+        self.db_path = db_path
+        self._ttl = ttl
+
+    @property
+    def ttl(self) -> int:
+        """지정값 우선, 없으면 설정값 (설정 파일 변경 시 바로 반영)"""
+        return self._ttl if self._ttl is not None else get_config().DUPLICATE_CACHE_TTL
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        conn.executescript(DDL)
+        return conn
+
+    def claim(self, phone: str, digest: str, receipt_no: str) -> Tuple[bool, str]:
+        """제출 선점 → (신규 여부, 접수번호)
+
+        신규면 (True, receipt_no), 중복이면 (False, 기존 접수번호)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                "SELECT receipt_no, status, created_at FROM submissions WHERE phone = ? AND payload_hash = ?",
+                (phone, digest)
+            ).fetchone()
+            if row is not None:
+                existing, status, created_at = row
+                expired = created_at < now - self.ttl
+                stale = status == 'pending' and created_at < now - PENDING_TIMEOUT
+                if not expired and not stale:
+                    conn.execute('COMMIT')
+                    return False, existing
+            conn.execute(
+                "INSERT OR REPLACE INTO submissions (phone, payload_hash, receipt_no, status, created_at) "
+                "VALUES (?, ?, ?, 'pending', ?)",
+                (phone, digest, receipt_no, now)
+            )
+            conn.execute('COMMIT')
+            return True, receipt_no
+        finally:
+            conn.close()
+
+    def confirm(self, phone: str, digest: str, receipt_no: str) -> None:
+        """GAS 저장 성공 → 확정 (TTL 동안 중복 차단)"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE submissions SET status = 'sent', created_at = ? "
+                "WHERE phone = ? AND payload_hash = ? AND receipt_no = ?",
+                (time.time(), phone, digest, receipt_no)
+            )
+        finally:
+            conn.close()
+
+    def release(self, phone: str, digest: str, receipt_no: str) -> None:
+        """GAS 저장 실패 → 선점 해제 (재시도 허용)"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM submissions WHERE phone = ? AND payload_hash = ? AND receipt_no = ?",
+                (phone, digest, receipt_no)
+            )
+        finally:
+            conn.close()
+
+    def purge_expired(self) -> int:
+        conn = self._connect()
+        try:
+            cur = conn.execute("DELETE FROM submissions WHERE created_at < ?", (time.time() - self.ttl,))
+            return cur.rowcount
+        finally:
+            conn.close()
+
+
+_default_dedup: Optional[SubmissionDedup] = None
+_default_lock = threading.Lock()
+
+
+def get_submission_dedup() -> SubmissionDedup:
+    """프로세스 공용 중복 제출 색인"""
+    global _default_dedup
+    with _default_lock:
+        if _default_dedup is None:
+            _default_dedup = SubmissionDedup()
+            _default_dedup.purge_expired()
+    return _default_dedup
@@ -1,16 +1,27 @@
 """
 유아플랜 정책자금 1차 상담 설문
-v2025-12-09-gas-sync
+v2025-12-21-framework
 - GAS 컬럼 구조 완전 동기화 (23개 컬럼)
 - 추가 필드: 생년월일, 성별, 개업연월, 정책자금경험
+- 접수번호: 중복 없는 순번 발급 (YP + YYMMDD + 6자리, receipt_allocator)
+- 중복 제출 방지: 같은 연락처 + 같은 내용은 30분 내 기존 접수번호 반환 (submission_dedup)
+- URL 파라미터 프리필은 세션당 1회 해석 (survey_session)
+- 폼/검증/스타일을 공통 프레임워크로 이전 (survey_framework, static/survey.css)
 """
 
+import startup_timing
+startup_timing.install()  # STARTUP_TIMING=1일 때만 import 시간 기록
+
 import streamlit as st
-import re
-import requests
-from datetime import datetime
-import random
-import os
+
+from config_loader import get_config
+from receipt_allocator import ReceiptUnavailableError, allocate_receipt_no
+from submission_dedup import get_submission_dedup, payload_hash
+from survey_session import bootstrap_session
+from survey_framework import (
+    FormSchema, Field, Section, _digits_only, format_phone, post_to_gas,
+    apply_survey_style, render_header, render_success_box
+)
 
 st.set_page_config(
     page_title="유아플랜 정책자금 1차 상담",
@@ -22,12 +33,10 @@ st.set_page_config(
 # ==============================
 # 환경 설정
 # ==============================
-BRAND_NAME = "유아플랜"
-LOGO_URL = "https://raw.githubusercontent.com/youareplan-ceo/youareplan-survey/main/logo_white.png"
-RELEASE_VERSION = "v2025-12-09-gas-sync"
-APPS_SCRIPT_URL = os.getenv("FIRST_GAS_URL", "https://script.google.com/macros/s/AKfycbwb4rHgQepBGE4wwS-YIap8uY_4IUxGPLRhTQ960ITUA6KgfiWVZL91SOOMrdxpQ-WC/exec")
-API_TOKEN = os.getenv("API_TOKEN", "youareplan")
-KAKAO_CHANNEL_URL = "https://pf.kakao.com/_LWxexmn"
+RELEASE_VERSION = "v2025-12-21-framework"
+CFG = get_config()  # 스크립트 실행(rerun)마다 최신 설정 (설정 파일 변경 시 자동 반영)
+APPS_SCRIPT_URL = CFG.FIRST_GAS_URL
+API_TOKEN = CFG.API_TOKEN
 
 # ==============================
 # 선택지 정의 (GAS 컬럼 순서 기준)
@@ -42,77 +51,59 @@ FUNDING_AMOUNTS = ["3천만원 미만", "3천만원~1억원", "1-3억원", "3-5
 POLICY_EXPERIENCES = ["경험 없음", "신청했으나 탈락", "과거 수혜 경험 있음", "현재 수혜 중"]
 
 # ==============================
-# 유틸리티 함수
+# 폼 스키마 (GAS 컬럼 순서)
 # ==============================
-def _digits_only(s: str) -> str:
-    return re.sub(r"[^0-9]", "", s or "")
-
-def format_phone(d: str) -> str:
-    if len(d) == 11 and d.startswith("010"):
-        return f"{d[0:3]}-{d[3:7]}-{d[7:11]}"
-    return d
-
-def save_to_sheet(data: dict) -> dict:
-    try:
-        data['token'] = API_TOKEN
-        resp = requests.post(APPS_SCRIPT_URL, json=data, timeout=20)
-        return resp.json() if resp.status_code == 200 else {"status": "error", "message": f"HTTP {resp.status_code}"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+SURVEY1_SCHEMA = FormSchema([
+    Field("receipt_no", widget="meta"),
+    Field("name", "대표자 성함 *", placeholder="예: 홍길동", required="⚠️ 성함을 입력해주세요."),
+    Field("phone", "연락처 *", placeholder="숫자만 입력 (예: 01012345678)",
+          clean=_digits_only, normalize=format_phone,
+          pattern=r"^010\d{7,}$", invalid="⚠️ 연락처를 올바르게 입력해주세요."),
+    Field("email", "이메일 (선택)", placeholder="email@example.com", default=""),
+    Field("birthdate", "생년월일", placeholder="예: 1985-03-15 또는 850315", default=""),
+    Field("gender", "성별", widget="select", options=GENDERS),
+    Field("region", "사업장 지역", widget="select", options=REGIONS),
+    Field("industry", "주요 업종", widget="select", options=INDUSTRIES),
+    Field("business_type", "사업자 형태", widget="select", options=BUSINESS_TYPES),
+    Field("open_date", "개업연월", placeholder="예: 2022-05 또는 202205", default=""),
+    Field("employee_count", "직원 수", widget="select", options=EMPLOYEE_COUNTS),
+    Field("revenue", "연간 매출", widget="select", options=REVENUES),
+    Field("funding_amount", "필요 자금", widget="select", options=FUNDING_AMOUNTS),
+    Field("policy_experience", "정책자금 경험", widget="select", options=POLICY_EXPERIENCES),
+    Field("tax_status", "국세/지방세 체납", widget="select", options=["체납 없음", "체납 있음", "분납 중"]),
+    Field("credit_status", "대출 연체 이력", widget="select", options=["연체 없음", "30일 미만", "30일 이상"]),
+    Field("business_status", "현재 영업 상태", widget="select", options=["정상 영업", "휴업", "폐업 예정"]),
+    Field("privacy_agree", "개인정보 수집·이용 동의 (필수)", widget="checkbox", default=True,
+          required="⚠️ 개인정보 수집에 동의해야 합니다.", level="error"),
+    Field("marketing_agree", "마케팅 수신 동의 (선택)", widget="checkbox", default=False),
+    Field("release_version", widget="meta", default=RELEASE_VERSION),
+    Field("source", widget="meta"),
+])
+
+SURVEY1_LAYOUT = (
+    Section("👤 기본 정보", ("name", "phone", "email")),
+    Section("🎂 대표자 정보", (("birthdate", "gender"),)),
+    Section("🏢 사업 현황", ((("region", "industry"), ("business_type", "open_date")),)),
+    Section("💰 자금 현황", ((("employee_count", "revenue"), ("funding_amount", "policy_experience")),)),
+    Section("🚨 자격 자가진단", (("tax_status", "credit_status"), "business_status")),
+    Section(None, (("privacy_agree", "marketing_agree"),)),
+)
 
 # ==============================
-# 스타일링
+# 유틸리티 함수
 # ==============================
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Noto+Sans+KR:wght@400;500;700&display=swap');
-html, body, [class*="css"] { font-family: 'Noto Sans KR', sans-serif; }
-#MainMenu, footer, header { display: none !important; }
-.block-container { padding-top: 1rem !important; padding-bottom: 3rem !important; max-width: 700px !important; }
-
-.unified-header { 
-    background: #002855; 
-    padding: 24px 20px; 
-    text-align: center; 
-    border-radius: 12px; 
-    margin-bottom: 24px; 
-    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15); 
-}
-.unified-header img { height: 48px; margin-bottom: 12px; object-fit: contain; }
-.unified-header .gov-label { color: rgba(255, 255, 255, 0.85); font-size: 13px; font-weight: 500; }
-
-.section-header { 
-    font-size: 16px; 
-    font-weight: 700; 
-    margin-top: 20px; 
-    margin-bottom: 10px; 
-    border-bottom: 2px solid rgba(128, 128, 128, 0.2); 
-    padding-bottom: 6px; 
-}
+def resolve_prefill(params: dict) -> dict:
+    """URL 파라미터 → 프리필 (대시보드 1차 설문 링크 연동용)"""
+    return {
+        "receipt_no": params["r"] or None,
+        "name": params["name"],
+        "phone": params["phone"]
+    }
 
-div[data-testid="stFormSubmitButton"] button { 
-    background: #002855 !important; 
-    color: white !important; 
-    border: none !important; 
-    padding: 14px 24px !important; 
-    border-radius: 8px !important; 
-    font-weight: 700 !important; 
-    width: 100%; 
-    margin-top: 10px; 
-}
+def save_to_sheet(data: dict) -> dict:
+    return post_to_gas(APPS_SCRIPT_URL, {**data, 'token': API_TOKEN})
 
-.success-box {
-    padding: 20px; 
-    border-radius: 10px; 
-    background-color: rgba(0,40,85,0.05); 
-    border: 1px solid rgba(0,40,85,0.1); 
-    margin: 20px 0; 
-    text-align: center;
-}
-.success-box h3 { margin: 0; color: #002855; font-size: 24px; }
-.success-box p { margin-top: 10px; margin-bottom: 0; color: #555; }
-</style>
-""", unsafe_allow_html=True)
+apply_survey_style(max_width=700)
 
 # ==============================
 # 메인 함수
@@ -122,21 +113,13 @@ def main():
         st.session_state.submitted = False
     
     # 헤더
-    st.markdown(f"""
-    <div class="unified-header">
-        <img src="{LOGO_URL}" alt="{BRAND_NAME}">
-        <div class="gov-label">중소벤처기업부 · 소상공인시장진흥공단 협력 상담</div>
-    </div>
-    """, unsafe_allow_html=True)
+    render_header("중소벤처기업부 · 소상공인시장진흥공단 협력 상담")
 
-    # URL 파라미터 (대시보드 연동용)
-    try:
-        qp = st.query_params
-        pre_receipt = qp.get("r", None)
-        pre_name = qp.get("name", "")
-        pre_phone = qp.get("phone", "")
-    except:
-        pre_receipt, pre_name, pre_phone = None, "", ""
+    # URL 파라미터 (대시보드 연동용, 세션당 1회 해석)
+    prefill = bootstrap_session("survey1", ("r", "name", "phone"), resolve_prefill)
+    pre_receipt = prefill["receipt_no"]
+    pre_name = prefill["name"]
+    pre_phone = prefill["phone"]
 
     if pre_receipt:
         st.info(f"💡 기존 고객(접수번호: {pre_receipt}) 정보를 연동하여 작성합니다.")
@@ -146,12 +129,7 @@ def main():
         receipt_no = st.session_state.get('receipt_no', '알 수 없음')
         
         st.success("✅ 상담 신청이 완료되었습니다!")
-        st.markdown(f"""
-        <div class="success-box">
-            <h3>접수번호: {receipt_no}</h3>
-            <p>담당자가 1영업일 내 검토 후 연락드립니다.</p>
-        </div>
-        """, unsafe_allow_html=True)
+        render_success_box(f"접수번호: {receipt_no}", "담당자가 1영업일 내 검토 후 연락드립니다.")
         return
 
     # 설문 시작
@@ -159,119 +137,61 @@ def main():
     st.caption("우리 기업의 정책자금 지원 가능성을 검토하기 위한 기초 단계입니다.")
 
     with st.form("survey_form"):
-        
-        # ========== 섹션 1: 기본 정보 ==========
-        st.markdown('<div class="section-header">👤 기본 정보</div>', unsafe_allow_html=True)
-        
-        name = st.text_input("대표자 성함 *", value=pre_name, placeholder="예: 홍길동")
-        phone_raw = st.text_input("연락처 *", value=pre_phone, placeholder="숫자만 입력 (예: 01012345678)")
-        email = st.text_input("이메일 (선택)", placeholder="email@example.com")
-
-        # ========== 섹션 2: 대표자 정보 ==========
-        st.markdown('<div class="section-header">🎂 대표자 정보</div>', unsafe_allow_html=True)
-        
-        col_birth, col_gender = st.columns(2)
-        with col_birth:
-            birthdate = st.text_input("생년월일", placeholder="예: 1985-03-15 또는 850315")
-        with col_gender:
-            gender = st.selectbox("성별", GENDERS)
-
-        # ========== 섹션 3: 사업 현황 ==========
-        st.markdown('<div class="section-header">🏢 사업 현황</div>', unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            region = st.selectbox("사업장 지역", REGIONS)
-            industry = st.selectbox("주요 업종", INDUSTRIES)
-        with col2:
-            business_type = st.selectbox("사업자 형태", BUSINESS_TYPES)
-            open_date = st.text_input("개업연월", placeholder="예: 2022-05 또는 202205")
-
-        # ========== 섹션 4: 자금 현황 ==========
-        st.markdown('<div class="section-header">💰 자금 현황</div>', unsafe_allow_html=True)
-        
-        col3, col4 = st.columns(2)
-        with col3:
-            employee_count = st.selectbox("직원 수", EMPLOYEE_COUNTS)
-            revenue = st.selectbox("연간 매출", REVENUES)
-        with col4:
-            funding_amount = st.selectbox("필요 자금", FUNDING_AMOUNTS)
-            policy_experience = st.selectbox("정책자금 경험", POLICY_EXPERIENCES)
-
-        # ========== 섹션 5: 자격 자가진단 ==========
-        st.markdown('<div class="section-header">🚨 자격 자가진단</div>', unsafe_allow_html=True)
-        
-        col_a, col_b = st.columns(2)
-        with col_a:
-            tax_status = st.selectbox("국세/지방세 체납", ["체납 없음", "체납 있음", "분납 중"])
-        with col_b:
-            credit_status = st.selectbox("대출 연체 이력", ["연체 없음", "30일 미만", "30일 이상"])
-        
-        business_status = st.selectbox("현재 영업 상태", ["정상 영업", "휴업", "폐업 예정"])
-
-        # ========== 동의 ==========
-        st.markdown("---")
-        
-        col_p, col_m = st.columns(2)
-        with col_p:
-            privacy = st.checkbox("개인정보 수집·이용 동의 (필수)", value=True)
-        with col_m:
-            marketing = st.checkbox("마케팅 수신 동의 (선택)")
+        values = SURVEY1_SCHEMA.render(SURVEY1_LAYOUT, defaults={"name": pre_name, "phone": pre_phone})
 
         st.write("")
         submitted = st.form_submit_button("📩 상담 신청하기")
 
         if submitted:
-            phone_digits = _digits_only(phone_raw)
+            cleaned = SURVEY1_SCHEMA.clean(values)
+            failure = SURVEY1_SCHEMA.validate(cleaned)
             
-            # 유효성 검사
-            if not name.strip():
-                st.warning("⚠️ 성함을 입력해주세요.")
-            elif len(phone_digits) < 10 or not phone_digits.startswith("010"):
-                st.warning("⚠️ 연락처를 올바르게 입력해주세요.")
-            elif not privacy:
-                st.error("⚠️ 개인정보 수집에 동의해야 합니다.")
+            if failure:
+                SURVEY1_SCHEMA.show_error(failure)
             else:
                 with st.spinner("접수 중입니다... 잠시만 기다려주세요."):
-                    # 접수번호: 기존 형식 유지 (YPMMDD + 4자리)
+                    # 접수번호: 연동 고객은 기존 번호 유지, 신규는 순번 발급
                     if pre_receipt:
                         receipt_no = pre_receipt
                     else:
-                        receipt_no = f"YP{datetime.now().strftime('%m%d')}{random.randint(1000,9999)}"
+                        try:
+                            receipt_no = allocate_receipt_no()
+                        except ReceiptUnavailableError:
+                            st.error("❌ 접수번호 발급 서버에 연결할 수 없습니다. 잠시 후 다시 시도해주세요.")
+                            st.stop()
                     
-                    # GAS로 전송할 데이터 (컬럼 순서 일치)
-                    data = {
-                        'receipt_no': receipt_no,
-                        'name': name.strip(),
-                        'phone': format_phone(phone_digits),
-                        'email': email.strip() if email else '',
-                        'birthdate': birthdate.strip() if birthdate else '',
-                        'gender': gender,
-                        'region': region,
-                        'industry': industry,
-                        'business_type': business_type,
-                        'open_date': open_date.strip() if open_date else '',
-                        'employee_count': employee_count,
-                        'revenue': revenue,
-                        'funding_amount': funding_amount,
-                        'policy_experience': policy_experience,
-                        'tax_status': tax_status,
-                        'credit_status': credit_status,
-                        'business_status': business_status,
-                        'privacy_agree': True,
-                        'marketing_agree': marketing,
-                        'release_version': RELEASE_VERSION,
-                        'source': 'survey1_linked' if pre_receipt else 'survey1_new'
-                    }
+                    # GAS로 전송할 데이터 (스키마 = 컬럼 순서)
+                    cleaned.update(
+                        receipt_no=receipt_no,
+                        privacy_agree=True,
+                        source='survey1_linked' if pre_receipt else 'survey1_new'
+                    )
+                    data = SURVEY1_SCHEMA.build_payload(cleaned)
+                    phone = data['phone']
+                    
+                    # 중복 제출(더블클릭/재방문)이면 GAS 쓰기 없이 기존 접수번호로 완료 처리
+                    dedup = get_submission_dedup()
+                    digest = payload_hash(data)
+                    is_new, claimed_receipt_no = dedup.claim(phone, digest, receipt_no)
+                    if not is_new:
+                        st.session_state.submitted = True
+                        st.session_state.receipt_no = claimed_receipt_no
+                        st.rerun()
                     
                     result = save_to_sheet(data)
                     
-                    if result.get('status') == 'success':
+                    # pending: GAS 장애로 로컬 대기열에 저장됨 (복구 후 자동 전송)
+                    if result.get('status') in ('success', 'pending'):
+                        dedup.confirm(phone, digest, receipt_no)
                         st.session_state.submitted = True
                         st.session_state.receipt_no = receipt_no
                         st.rerun()
                     else:
+                        dedup.release(phone, digest, receipt_no)
                         st.error(f"❌ 서버 통신 오류: {result.get('message')}. 잠시 후 다시 시도해주세요.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        startup_timing.report_once("survey1")
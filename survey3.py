@@ -1,18 +1,27 @@
 """
 유아플랜 3차 심층 상담 (컨설턴트용)
-v2025-12-09-final
+v2025-12-21-framework
 - 인코딩 수정
 - CSS 스타일 1차와 통일 (다크/라이트 모드 대응)
 - GAS 필드명 동기화
 - [추가] 의사결정 메타데이터 섹션 (AI 학습용)
+- [추가] URL 파라미터 프리필은 세션당 1회 해석 (survey_session)
+- [추가] 필드 스키마/검증/스타일을 공통 프레임워크로 이전 (survey_framework)
 """
 
+import startup_timing
+startup_timing.install()  # STARTUP_TIMING=1일 때만 import 시간 기록
+
 import streamlit as st
-import requests
-import os
-import json
 from datetime import datetime
-from urllib.parse import unquote
+
+from attribution import record_touchpoint
+from config_loader import get_config
+from survey_session import bootstrap_session
+from survey_framework import (
+    FormSchema, Field, joined, post_to_gas,
+    apply_survey_style, render_header, render_section_header, render_success_box
+)
 
 st.set_page_config(
     page_title="유아플랜 3차 심층 상담",
@@ -24,12 +33,10 @@ st.set_page_config(
 # ==============================
 # 환경 설정
 # ==============================
-BRAND_NAME = "유아플랜"
-LOGO_URL = "https://raw.githubusercontent.com/youareplan-ceo/youareplan-survey/main/logo_white.png"
-RELEASE_VERSION = "v2025-12-09-final"
-APPS_SCRIPT_URL = os.getenv("THIRD_GAS_URL", "https://script.google.com/macros/s/YOUR_GAS_ID/exec")
-API_TOKEN = os.getenv("API_TOKEN_3", "youareplan_stage3")
-KAKAO_CHANNEL_URL = "https://pf.kakao.com/_LWxexmn"
+RELEASE_VERSION = "v2025-12-21-framework"
+CFG = get_config()  # 스크립트 실행(rerun)마다 최신 설정 (설정 파일 변경 시 자동 반영)
+APPS_SCRIPT_URL = CFG.THIRD_GAS_URL
+API_TOKEN = CFG.API_TOKEN_STAGE3
 
 # ==============================
 # [추가] 의사결정 옵션
@@ -41,6 +48,7 @@ DECISION_STATUS_OPTIONS = [
     "부적합 (지원 불가)",
     "고객 이탈"
 ]
+CONTRACT_DECISION = DECISION_STATUS_OPTIONS[1]   # 캠페인 퍼널의 계약 단계로 기록
 
 RECOMMENDED_FUND_OPTIONS = [
     "직접 입력",
@@ -58,100 +66,48 @@ RECOMMENDED_FUND_OPTIONS = [
     "기타"
 ]
 
+# ==============================
+# 폼 스키마 (GAS 필드명/컬럼 순서)
+# ==============================
+SURVEY3_SCHEMA = FormSchema([
+    Field("action", widget="meta", default="save_consultation"),
+    Field("name", required="⚠️ 고객 성함은 필수입니다."),
+    Field("phone", default=""),
+    Field("receipt_no", default=""),
+    Field("uuid", widget="meta", default=""),
+    # 상담 내용
+    Field("collateral", default=""),
+    Field("debt_info", default=""),
+    Field("financial_check", default=""),
+    Field("docs_check", normalize=joined()),
+    Field("consultant_note", required="⚠️ 종합 의견을 작성해주세요."),
+    # [추가] 의사결정 메타데이터
+    Field("recommended_fund", normalize=lambda v: v if v and v != "직접 입력" else ""),
+    Field("expected_limit", default=""),
+    Field("decision_status", required="⚠️ 진행 상태를 선택해주세요.", blank_values=("선택해주세요",)),
+    Field("readiness_score"),
+    # 메타 정보
+    Field("timestamp", widget="meta"),
+    Field("version", widget="meta", default=RELEASE_VERSION),
+])
+
 # ==============================
 # 유틸리티 함수
 # ==============================
 def get_prefill_params():
-    """URL 파라미터에서 프리필 데이터 추출"""
-    try:
-        qp = st.query_params
-        return {
-            "name": unquote(qp.get("name", "")),
-            "phone": unquote(qp.get("phone", "")),
-            "receipt_no": unquote(qp.get("r", "")),
-            "uuid": unquote(qp.get("u", ""))
-        }
-    except:
-        return {"name": "", "phone": "", "receipt_no": "", "uuid": ""}
+    """URL 파라미터에서 프리필 데이터 추출 (세션당 1회 해석)"""
+    return bootstrap_session("survey3", ("name", "phone", "r", "u"), lambda params: {
+        "name": params["name"],
+        "phone": params["phone"],
+        "receipt_no": params["r"],
+        "uuid": params["u"]
+    })
 
 def save_consultation_result(data: dict) -> dict:
     """3차 GAS로 상담 결과 전송"""
-    try:
-        data['token'] = API_TOKEN
-        response = requests.post(APPS_SCRIPT_URL, json=data, timeout=30)
-        return response.json() if response.status_code == 200 else {"status": "error", "message": f"HTTP {response.status_code}"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
-
-# ==============================
-# 스타일링 (1차와 통일 - 다크/라이트 모드 대응)
-# ==============================
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Noto+Sans+KR:wght@400;500;700&display=swap');
-html, body, [class*="css"] { font-family: 'Noto Sans KR', sans-serif; }
-#MainMenu, footer, header { display: none !important; }
-.block-container { padding-top: 1rem !important; padding-bottom: 3rem !important; }
-
-.unified-header { 
-    background: #002855; 
-    padding: 24px 20px; 
-    text-align: center; 
-    border-radius: 12px; 
-    margin-bottom: 24px; 
-    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15); 
-}
-.unified-header img { height: 48px; margin-bottom: 12px; object-fit: contain; }
-.unified-header .gov-label { color: rgba(255, 255, 255, 0.85); font-size: 13px; font-weight: 500; }
+    return post_to_gas(APPS_SCRIPT_URL, {**data, 'token': API_TOKEN})
 
-.section-header { 
-    font-size: 16px; 
-    font-weight: 700; 
-    margin-top: 20px; 
-    margin-bottom: 10px; 
-    border-bottom: 2px solid rgba(128, 128, 128, 0.2); 
-    padding-bottom: 6px; 
-}
-
-.prefilled-info { 
-    background: rgba(76, 175, 80, 0.1); 
-    border: 1px solid rgba(76, 175, 80, 0.3); 
-    border-radius: 8px; 
-    padding: 12px 16px; 
-    margin-bottom: 16px; 
-}
-
-.decision-box {
-    background: rgba(255, 152, 0, 0.1);
-    border: 2px solid rgba(255, 152, 0, 0.4);
-    border-radius: 12px;
-    padding: 16px;
-    margin: 16px 0;
-}
-
-div[data-testid="stFormSubmitButton"] button { 
-    background: #002855 !important; 
-    color: white !important; 
-    border: none !important; 
-    padding: 14px 24px !important; 
-    border-radius: 8px !important; 
-    font-weight: 700 !important; 
-    width: 100%; 
-    margin-top: 10px; 
-}
-
-.success-box {
-    padding: 20px; 
-    border-radius: 10px; 
-    background-color: rgba(0,40,85,0.05); 
-    border: 1px solid rgba(0,40,85,0.1); 
-    margin: 20px 0; 
-    text-align: center;
-}
-.success-box h3 { margin: 0; color: #002855; font-size: 24px; }
-.success-box p { margin-top: 10px; margin-bottom: 0; color: #555; }
-</style>
-""", unsafe_allow_html=True)
+apply_survey_style()
 
 # ==============================
 # 메인 함수
@@ -161,12 +117,7 @@ def main():
         st.session_state.submitted_3 = False
 
     # 헤더
-    st.markdown(f"""
-    <div class="unified-header">
-        <img src="{LOGO_URL}" alt="{BRAND_NAME}">
-        <div class="gov-label">3차 심층 상담 (컨설턴트 입력용)</div>
-    </div>
-    """, unsafe_allow_html=True)
+    render_header("3차 심층 상담 (컨설턴트 입력용)")
 
     # 제출 완료 화면
     if st.session_state.submitted_3:
@@ -174,19 +125,7 @@ def main():
         st.success(f"✅ {client_name} 님의 상담 내용이 저장되었습니다.")
         st.balloons()
         
-        st.markdown(f"""
-        <div class="success-box">
-            <h3>상담 결과 저장 완료</h3>
-            <p>대시보드에서 확인하실 수 있습니다.</p>
-        </div>
-        <div style="text-align: center; margin-top: 20px;">
-            <a href="{KAKAO_CHANNEL_URL}" target="_blank" 
-               style="display:inline-block; background:#FEE500; color:#3C1E1E; 
-                      padding:12px 25px; border-radius:8px; text-decoration:none; font-weight:bold;">
-                💬 카카오톡 문의하기
-            </a>
-        </div>
-        """, unsafe_allow_html=True)
+        render_success_box("상담 결과 저장 완료", "대시보드에서 확인하실 수 있습니다.", kakao=True)
         
         # 초기화 버튼
         if st.button("🔄 다른 고객 상담하기 (초기화)"):
@@ -209,7 +148,7 @@ def main():
     with st.form("admin_consult_form"):
         
         # ========== 섹션 1: 고객 정보 확인 ==========
-        st.markdown('<div class="section-header">👤 고객 정보 확인</div>', unsafe_allow_html=True)
+        render_section_header("👤 고객 정보 확인")
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -229,7 +168,7 @@ def main():
         
         with col_left:
             # 담보 및 자산 현황
-            st.markdown('<div class="section-header">🧱 담보 및 자산 현황</div>', unsafe_allow_html=True)
+            render_section_header("🧱 담보 및 자산 현황")
             collateral = st.text_area(
                 "담보 제공 계획", 
                 placeholder="부동산, 보증서, 신용보증재단 이용 가능 여부 등",
@@ -237,7 +176,7 @@ def main():
             )
             
             # 부채 및 신용
-            st.markdown('<div class="section-header">🏦 부채 및 신용</div>', unsafe_allow_html=True)
+            render_section_header("🏦 부채 및 신용")
             debt_info = st.text_area(
                 "기대출 및 신용 특이사항", 
                 placeholder="은행/기관명, 잔액, 금리, 상환 일정 등",
@@ -246,7 +185,7 @@ def main():
         
         with col_right:
             # 재무 및 가점 요인
-            st.markdown('<div class="section-header">📊 재무 및 가점 요인</div>', unsafe_allow_html=True)
+            render_section_header("📊 재무 및 가점 요인")
             financial_check = st.text_area(
                 "매출/이익/가점 사항", 
                 placeholder="매출 추이, 인증 현황, 특허/R&D, 고용 증가 등",
@@ -254,7 +193,7 @@ def main():
             )
             
             # 서류 준비 상태
-            st.markdown('<div class="section-header">📑 서류 준비 상태</div>', unsafe_allow_html=True)
+            render_section_header("📑 서류 준비 상태")
             docs_check = st.multiselect(
                 "보유 서류 확인",
                 [
@@ -272,7 +211,7 @@ def main():
         st.markdown("---")
         
         # ========== 컨설턴트 종합 의견 ==========
-        st.markdown('<div class="section-header">💡 컨설턴트 종합 의견</div>', unsafe_allow_html=True)
+        render_section_header("💡 컨설턴트 종합 의견")
         consultant_note = st.text_area(
             "분석 결과 및 향후 가이드", 
             height=150, 
@@ -350,45 +289,35 @@ def main():
         submitted = st.form_submit_button("💾 상담 결과 저장하기")
 
         if submitted:
-            # 유효성 검사
-            if not client_name.strip():
-                st.warning("⚠️ 고객 성함은 필수입니다.")
-            elif not consultant_note.strip():
-                st.warning("⚠️ 종합 의견을 작성해주세요.")
-            elif decision_status == "선택해주세요":
-                st.warning("⚠️ 진행 상태를 선택해주세요.")
+            cleaned = SURVEY3_SCHEMA.clean({
+                "name": client_name,
+                "phone": client_phone,
+                "receipt_no": receipt_no if receipt_no else prefill["receipt_no"],
+                "uuid": prefill["uuid"],
+                "collateral": collateral,
+                "debt_info": debt_info,
+                "financial_check": financial_check,
+                "docs_check": docs_check,
+                "consultant_note": consultant_note,
+                "recommended_fund": recommended_fund,
+                "expected_limit": expected_limit,
+                "decision_status": decision_status,
+                "readiness_score": readiness_score,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+            failure = SURVEY3_SCHEMA.validate(cleaned)
+            
+            if failure:
+                SURVEY3_SCHEMA.show_error(failure)
             else:
                 with st.spinner("저장 중..."):
+                    # GAS로 전송할 데이터 (action: save_consultation, 스키마 = 필드 순서)
+                    result = save_consultation_result(SURVEY3_SCHEMA.build_payload(cleaned))
                     
-                    # GAS로 전송할 데이터 (action: save_consultation)
-                    data = {
-                        "action": "save_consultation",
-                        "name": client_name.strip(),
-                        "phone": client_phone.strip() if client_phone else "",
-                        "receipt_no": receipt_no if receipt_no else prefill["receipt_no"],
-                        "uuid": prefill["uuid"],
-                        
-                        # 상담 내용 (GAS 필드명에 맞춤)
-                        "collateral": collateral.strip() if collateral else "",
-                        "debt_info": debt_info.strip() if debt_info else "",
-                        "financial_check": financial_check.strip() if financial_check else "",
-                        "docs_check": ", ".join(docs_check) if docs_check else "",
-                        "consultant_note": consultant_note.strip(),
-                        
-                        # [추가] 의사결정 메타데이터
-                        "recommended_fund": recommended_fund if recommended_fund != "직접 입력" else "",
-                        "expected_limit": expected_limit.strip() if expected_limit else "",
-                        "decision_status": decision_status,
-                        "readiness_score": readiness_score,
-                        
-                        # 메타 정보
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "version": RELEASE_VERSION
-                    }
-                    
-                    result = save_consultation_result(data)
-                    
-                    if result.get("status") == "success" or result.get("ok") == True:
+                    if result.get("status") in ("success", "pending") or result.get("ok") == True:
+                        record_touchpoint("stage3", cleaned["receipt_no"])
+                        if cleaned["decision_status"] == CONTRACT_DECISION:
+                            record_touchpoint("contract", cleaned["receipt_no"])
                         st.session_state.submitted_3 = True
                         st.session_state.client_name = client_name
                         st.rerun()
@@ -396,4 +325,7 @@ def main():
                         st.error(f"❌ 저장 실패: {result.get('message')}. 잠시 후 다시 시도해주세요.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        startup_timing.report_once("survey3")
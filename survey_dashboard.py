@@ -1,34 +1,59 @@
 """
-유아플랜 컨설턴트 대시보드 v3.8.2
-- v3.8.1 기반 + 1차 설문 링크 발급 기능 추가
-- 랜딩 접수번호 → 1차 상세 설문 연결 링크 생성
-- 2025-12-13 수정
+유아플랜 컨설턴트 대시보드 v3.10.1
+- v3.9.0: 낙관적 쓰기 (소통 기록/링크 발급)
+  저장 즉시 화면 반영 → GAS 쓰기는 백그라운드 전송 → 완료 시 확정 또는 롤백
+- v3.9.1: 통합 조회 캐시 + 프리페치
+  오늘 할 일/최근 조회 고객을 백그라운드로 미리 조회, 적중 시 즉시 표시
+- v3.9.2: 통합 조회 일괄 API (get_integrated_view_bulk)
+  내보내기/요약서 ZIP은 청크 단위 병렬 요청으로 처리 (상세 카드/프리페치는 단건 get_integrated_view만 사용)
+- v3.9.3: 고객 전체 내보내기 (CSV/Parquet 스트리밍 기록, 파일 다운로드)
+- v3.9.4: 요약서 일괄 생성 (선택 고객 → ZIP 1개)
+- v3.9.5: 신규 접수번호 형식 (YP + YYMMDD + 6자리) 지원, 접수일 기간 색인
+- v3.9.6: 시작 시간 단축 (pypdf/pyarrow는 사용 시점 import), STARTUP_TIMING=1 시 import 시간 측정
+- v3.9.7: 설정 통합 (config_loader) - API_CACHE_TTL/REQUEST_TIMEOUT/MAX_RETRY_ATTEMPTS 적용, 설정 파일 변경 자동 반영
+- v3.9.8: GAS 서킷 브레이커 + 적응형 타임아웃 - 장애 시 조회는 마지막 데이터, 저장은 로컬 대기열(outbox)
+- v3.9.9: 헤지 조회 (HEDGED_REQUESTS=1) - 전체 고객/통합 조회가 p90 안에 응답 없으면 1건 추가 요청, 먼저 온 응답 사용
+- v3.10.0: 고객 목록 증분 동기화 (get_clients_delta) - 변경분만 gzip 수신해 로컬 목록에 적용
+- v3.10.1: 캠페인 퍼널 (조회→신청→2차→3차→계약) - 로컬 귀속 저장소의 사전 집계 사용
 """
 
+import startup_timing
+startup_timing.install()  # STARTUP_TIMING=1일 때만 import 시간 기록
+
 import streamlit as st
-import requests
-import json
 from datetime import datetime, timedelta, date
 from typing import Dict, Any, Optional, List, Tuple
-import base64
 import os
 import re
 import io
 import html
+import importlib.util
 import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config_loader import get_config
+from request_helper import json_get, json_post, json_write, endpoint_health, hedge_metrics
+from outbox import get_outbox
+from view_cache import ViewCache, Prefetcher
+from integrated_bulk import BulkUnsupportedError, fetch_integrated_views
+from client_sync import ClientSync
+from attribution import get_attribution_store
+from client_export import STAGE_FIELDS, HAS_PYARROW, export_clients
+from doc_batch import render_summary, summary_filename, build_summary_zip
+from receipt_allocator import is_valid_receipt_no, ReceiptTimeIndex
 
 # ==============================
-# PDF 라이브러리 체크
+# PDF 라이브러리 체크 (import는 PDF 섹션 사용 시점에)
 # ==============================
-try:
-    from pypdf import PdfReader
-    HAS_PYPDF = True
-except ImportError:
+HAS_PYPDF = any(importlib.util.find_spec(m) is not None for m in ("pypdf", "PyPDF2"))
+
+def _pdf_reader_class():
     try:
-        from PyPDF2 import PdfReader
-        HAS_PYPDF = True
+        from pypdf import PdfReader
     except ImportError:
-        HAS_PYPDF = False
+        from PyPDF2 import PdfReader
+    return PdfReader
 
 # ==============================
 # 페이지 설정
@@ -43,45 +68,39 @@ st.set_page_config(
 # 환경 설정
 # ==============================
 BRAND_NAME = "유아플랜"
-DEFAULT_LOGO_URL = "https://raw.githubusercontent.com/youareplan-ceo/youaplan-site/main/logo.png"
-
-def _get_secret(key: str, default: str = "") -> str:
-    """st.secrets 우선, 없으면 os.getenv 사용"""
-    try:
-        val = st.secrets.get(key)
-        if val:
-            return str(val)
-    except Exception:
-        pass
-    return os.getenv(key, default)
+# 설정: st.secrets → 환경변수 → .env → 기본값 (config_loader, 설정 파일 변경 시 rerun에서 자동 반영)
+CFG = get_config()
 
 # GAS 엔드포인트 (기본값 유지 - 공개 URL)
-INTEGRATED_GAS_URL = _get_secret(
-    "FIRST_GAS_URL",
-    "https://script.google.com/macros/s/AKfycbwb4rHgQepBGE4wwS-YIap8uY_4IUxGPLRhTQ960ITUA6KgfiWVZL91SOOMrdxpQ-WC/exec"
-)
+INTEGRATED_GAS_URL = CFG.FIRST_GAS_URL
 
-# API 토큰 (기본값 제거 - 보안 강화)
-API_TOKEN = _get_secret("API_TOKEN", "")
+# API 토큰 (기본값 제거 - 보안 강화: 명시적으로 설정된 경우에만 사용)
+API_TOKEN = CFG.API_TOKEN if CFG.is_set("API_TOKEN") else ""
 
 # Gemini API
-GEMINI_API_KEY = _get_secret("GEMINI_API_KEY", "")
+GEMINI_API_KEY = CFG.GEMINI_API_KEY
 
 # 카카오톡 채널
-KAKAO_CHANNEL_ID = "_LWxexmn"
-KAKAO_CHANNEL_URL = f"https://pf.kakao.com/{KAKAO_CHANNEL_ID}"
-KAKAO_CHAT_URL = f"https://pf.kakao.com/{KAKAO_CHANNEL_ID}/chat"
+KAKAO_CHANNEL_ID = CFG.KAKAO_CHANNEL_ID
+KAKAO_CHANNEL_URL = CFG.KAKAO_CHANNEL_URL
+KAKAO_CHAT_URL = CFG.KAKAO_CHAT_URL
 
 # 접속 비밀번호 (기본값 제거 - 보안 강화)
-DASHBOARD_PASSWORD = _get_secret("DASHBOARD_PW", "")
+DASHBOARD_PASSWORD = CFG.DASHBOARD_PW
 
 # 결과 저장용 대표 비밀번호
-RESULT_PASSWORD = _get_secret("RESULT_PW", "")
+RESULT_PASSWORD = CFG.RESULT_PW
 
 # 설문 URL
 FIRST_SURVEY_URL = "https://youareplan-survey.onrender.com"
 SECOND_SURVEY_BASE_URL = "https://youareplan-survey2.onrender.com"
 
+# 통합 조회 캐시/프리페치
+VIEW_CACHE_TTL = CFG.API_CACHE_TTL
+VIEW_CACHE_MAX_ENTRIES = 200
+PREFETCH_TODO_COUNT = 5
+RECENT_RECEIPTS_MAX = 10
+
 # ==============================
 # 보안 유틸리티 함수
 # ==============================
@@ -92,10 +111,8 @@ def safe_html(text: Any) -> str:
     return html.escape(str(text)) if text else "-"
 
 def validate_receipt_no(receipt_no: str) -> bool:
-    """접수번호 형식 검증 (YP + 숫자 8자리)"""
-    if not receipt_no:
-        return False
-    return bool(re.match(r'^YP\d{8}$', receipt_no.strip()))
+    """접수번호 형식 검증 (YP + 숫자 12자리 신규 / 8자리 기존)"""
+    return is_valid_receipt_no(receipt_no)
 
 def sanitize_input(text: str, max_length: int = 500) -> str:
     """입력값 정제 (길이 제한 + 공백 정리)"""
@@ -398,7 +415,12 @@ def init_session_state():
         "policy_text": None,
         "all_clients": None,
         "all_clients_loaded": False,
-        "pipeline_stats": None
+        "pipeline_stats": None,
+        "pending_writes": [],
+        "recent_receipts": [],
+        "export_paths": None,
+        "summary_zip": None,
+        "receipt_index": None
     }
     for key, val in defaults.items():
         if key not in st.session_state:
@@ -408,7 +430,7 @@ def init_session_state():
 # 유틸리티 함수
 # ==============================
 def get_logo_url() -> str:
-    return _get_secret("YOUAREPLAN_LOGO_URL", DEFAULT_LOGO_URL)
+    return CFG.YOUAREPLAN_LOGO_URL
 
 def format_progress_bar(progress: int) -> str:
     # progress는 숫자이므로 XSS 위험 없음
@@ -420,10 +442,22 @@ def format_progress_bar(progress: int) -> str:
     </div>
     """
 
-def create_download_link(content: str, filename: str) -> str:
-    b64 = base64.b64encode(content.encode('utf-8')).decode()
-    safe_filename = safe_html(filename)
-    return f'<a href="data:text/plain;base64,{b64}" download="{safe_filename}" class="action-btn action-btn-primary">📥 {safe_filename}</a>'
+def render_file_download(path: str, label: str, mime: str = "application/octet-stream"):
+    """디스크 파일 다운로드 (요청 시에만 파일을 읽어 버튼 생성 → 재실행마다 파일 전송 없음)"""
+    filename = os.path.basename(path)
+    key = f"download_ready_{filename}"
+    if not st.session_state.get(key):
+        if st.button(f"📥 {label} 다운로드 준비", key=f"prepare_{filename}", use_container_width=True):
+            st.session_state[key] = True
+            st.rerun()
+        return
+    
+    def _done():
+        st.session_state[key] = False
+    
+    with open(path, "rb") as f:
+        st.download_button(f"📥 {label}", data=f, file_name=filename, mime=mime,
+                           use_container_width=True, key=f"download_{filename}", on_click=_done)
 
 # ==============================
 # GAS API 함수 (v3.8.1 수정)
@@ -439,13 +473,111 @@ def fetch_integrated_data(receipt_no: str) -> Dict[str, Any]:
             "receipt_no": sanitized_receipt_no,
             "api_token": API_TOKEN
         }
-        resp = requests.get(INTEGRATED_GAS_URL, params=params, timeout=30)
-        return resp.json()
+        ok, _, data, err = json_get(INTEGRATED_GAS_URL, params=params, hedge=get_config().HEDGED_REQUESTS)
+        return data if ok else {"status": "error", "message": err}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-# [v3.8] 캐싱 적용 - 5분(300초) TTL
-@st.cache_data(ttl=300, show_spinner=False)
+# ==============================
+# 통합 조회 캐시 + 프리페치 (v3.9.1)
+# ==============================
+def _is_cacheable_view(result: Dict[str, Any]) -> bool:
+    # _stale: GAS 장애로 받은 마지막 정상 응답 → 캐시에 다시 넣지 않음
+    return isinstance(result, dict) and result.get("status") == "success" and not result.get("_stale")
+
+@st.cache_resource
+def get_view_cache() -> ViewCache:
+    """통합 조회 캐시 (프로세스 공유)"""
+    return ViewCache(max_entries=VIEW_CACHE_MAX_ENTRIES, ttl=VIEW_CACHE_TTL)
+
+@st.cache_resource
+def get_prefetcher() -> Prefetcher:
+    """통합 조회 프리페처 (프로세스 공유) - 상세 카드 캐시는 단건 조회 결과만 (일괄 응답은 내보내기 전용)"""
+    return Prefetcher(get_view_cache(), fetch_integrated_data, _is_cacheable_view)
+
+def _fetch_integrated_bulk(receipt_nos: List[str]) -> Dict[str, Dict[str, Any]]:
+    # GAS 일괄 액션 미지원 시 BulkUnsupportedError
+    sanitized = [sanitize_input(r, 20) for r in receipt_nos]
+    return fetch_integrated_views(INTEGRATED_GAS_URL, API_TOKEN, sanitized)
+
+def fetch_integrated_data_bulk(receipt_nos: List[str]) -> Dict[str, Dict[str, Any]]:
+    """통합 고객 데이터 일괄 조회 (청크 단위 병렬 요청, 일괄 액션 미지원 GAS는 단건 병렬 조회)
+    내보내기/요약서 ZIP 전용 - 결과를 상세 카드 캐시에 넣지 않음"""
+    try:
+        return _fetch_integrated_bulk(receipt_nos)
+    except BulkUnsupportedError:
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="gas-single") as executor:
+            return dict(zip(receipt_nos, executor.map(fetch_integrated_data, receipt_nos)))
+
+def load_integrated_view(receipt_no: str, force: bool = False) -> Dict[str, Any]:
+    """캐시 우선 통합 조회 (force=True면 GAS 재조회)"""
+    cache = get_view_cache()
+    if not force:
+        cached = cache.get(receipt_no)
+        if cached is not None:
+            return cached
+    result = fetch_integrated_data(receipt_no)
+    if _is_cacheable_view(result):
+        cache.put(receipt_no, result)
+    else:
+        cache.invalidate(receipt_no)
+    return result
+
+def remember_recent_receipt(receipt_no: str) -> None:
+    recent = [r for r in st.session_state.recent_receipts if r != receipt_no]
+    st.session_state.recent_receipts = ([receipt_no] + recent)[:RECENT_RECEIPTS_MAX]
+
+def schedule_prefetch(clients: List[Dict]) -> None:
+    """오늘 할 일 상위 고객 + 최근 조회 고객 프리페치 예약"""
+    todo_receipts = [t["receipt_no"] for t in collect_todos(clients)[:PREFETCH_TODO_COUNT]]
+    current = st.session_state.searched_receipt_no
+    keys = [r for r in todo_receipts + st.session_state.recent_receipts if r and r != current]
+    get_prefetcher().schedule(keys)
+
+def _sync_view_cache() -> None:
+    """현재 화면의 조회 결과를 캐시에 반영 (낙관적 쓰기 이후)"""
+    result = st.session_state.search_result
+    if _is_cacheable_view(result):
+        get_view_cache().put(_current_receipt_no(), result)
+
+def render_gas_health():
+    """GAS 서킷 상태 + 쓰기 대기열 (이상이 있을 때만 표시)"""
+    health = endpoint_health().get(INTEGRATED_GAS_URL)
+    queued = get_outbox().stats()
+    if health and health["state"] != "closed":
+        st.warning(
+            f"⚠️ GAS 응답 장애 감지 (연속 실패 {health['consecutive_failures']}회) - "
+            "조회는 마지막 데이터로, 저장은 대기열로 처리 중입니다."
+        )
+    if queued["queued"] or queued["dead"]:
+        st.caption(f"📮 전송 대기 {queued['queued']}건" + (f" · 시트 기록 여부 확인 필요 {queued['dead']}건" if queued["dead"] else ""))
+    render_hedge_stats()
+
+def render_hedge_stats():
+    """헤지 조회 효과 (p99: 실제 vs 첫 요청만 기다렸을 때)"""
+    if not get_config().HEDGED_REQUESTS:
+        return
+    m = hedge_metrics()
+    if not m["requests"]:
+        return
+    tail = ""
+    if m["p99"] is not None and m["p99_primary"] is not None:
+        tail = f" · p99 {m['p99']:.2f}s (헤지 없을 때 {m['p99_primary']:.2f}s)"
+    st.caption(
+        f"🪝 헤지 조회 {m['hedged']}/{m['requests']}건 (추가 부하 {m['extra_load'] * 100:.0f}%) · "
+        f"추가 요청 우선 응답 {m['hedge_wins']}건 · 단축 {m['saved_seconds']:.1f}s{tail}"
+    )
+
+def render_cache_stats():
+    stats = get_view_cache().stats()
+    st.caption(
+        f"⚡ 조회 캐시 적중률 {stats['hit_rate'] * 100:.0f}% "
+        f"({stats['hits']}/{stats['hits'] + stats['misses']}) · "
+        f"보관 {stats['size']}건 · 미리 불러옴 {stats['prefetched']}건"
+    )
+
+# [v3.8] 캐싱 적용 - API_CACHE_TTL (기본 5분)
+@st.cache_data(ttl=CFG.API_CACHE_TTL, show_spinner=False)
 def fetch_all_clients_cached(_api_token: str) -> Dict[str, Any]:
     """전체 고객 목록 조회 (캐싱 적용)
     
@@ -456,19 +588,20 @@ def fetch_all_clients_cached(_api_token: str) -> Dict[str, Any]:
         고객 목록 데이터
     
     Note:
-        - 5분간 캐시 유지로 GAS 응답 지연 해소
+        - API_CACHE_TTL 동안 캐시 유지로 GAS 응답 지연 해소
         - 새로고침 버튼으로 캐시 무효화 가능
+        - [v3.10.0] 첫 조회 이후에는 변경분만 수신 (client_sync)
     """
     try:
-        params = {
-            "action": "get_all_clients",
-            "api_token": _api_token
-        }
-        resp = requests.get(INTEGRATED_GAS_URL, params=params, timeout=30)
-        return resp.json()
+        return get_client_sync().sync(_api_token, hedge=get_config().HEDGED_REQUESTS)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@st.cache_resource
+def get_client_sync() -> ClientSync:
+    """고객 목록 증분 동기화 스냅샷 (프로세스 공유)"""
+    return ClientSync(INTEGRATED_GAS_URL)
+
 def issue_survey_link(receipt_no: str, stage: int = 2) -> Dict[str, Any]:
     """설문 링크 발급"""
     try:
@@ -481,8 +614,10 @@ def issue_survey_link(receipt_no: str, stage: int = 2) -> Dict[str, Any]:
             "issued_by": "dashboard",
             "api_token": API_TOKEN
         }
-        resp = requests.post(INTEGRATED_GAS_URL, json=payload, timeout=30)
-        result = resp.json()
+        # 발급 결과(링크)가 바로 필요하므로 대기열 저장 없이 전송 (서킷 열림 시 즉시 실패)
+        ok, _, result, err = json_post(INTEGRATED_GAS_URL, payload, retries=0)
+        if not ok and not result:
+            return {"status": "error", "message": err}
         
         # GAS 응답 형식을 기존 형식으로 변환
         if result.get("ok"):
@@ -513,11 +648,152 @@ def add_comm_log(receipt_no: str, author: str, content: str) -> Dict[str, Any]:
             "content": sanitized_content,
             "api_token": API_TOKEN
         }
-        resp = requests.post(INTEGRATED_GAS_URL, json=payload, timeout=30)
-        return resp.json()
+        # GAS 장애 시 로컬 대기열 저장 → {"status": "pending"} (복구 후 자동 전송)
+        ok, _, result, err = json_write(INTEGRATED_GAS_URL, payload)
+        if result.get("status") == "pending":
+            return {**result, "ok": True}
+        return result if ok else {"ok": False, "error": result.get("error") or err}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+# ==============================
+# 낙관적 쓰기 (v3.9)
+# ==============================
+@st.cache_resource
+def get_write_executor() -> ThreadPoolExecutor:
+    """GAS 쓰기 전용 백그라운드 워커 (프로세스 공유)"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="gas-write")
+
+def _current_receipt_no() -> str:
+    result = st.session_state.search_result or {}
+    return (result.get("data") or {}).get("receipt_no", "")
+
+def _with_comm_log(result: Dict[str, Any], log: Dict[str, Any]) -> Dict[str, Any]:
+    """조회 결과 사본에 소통 기록 추가 (원본 불변)"""
+    data = dict(result.get("data") or {})
+    data["comm_logs"] = list(data.get("comm_logs") or []) + [log]
+    return {**result, "data": data}
+
+def _without_comm_log(result: Dict[str, Any], local_id: str) -> Dict[str, Any]:
+    """조회 결과 사본에서 낙관적 소통 기록 제거 (롤백용)"""
+    data = dict(result.get("data") or {})
+    data["comm_logs"] = [log for log in (data.get("comm_logs") or []) if log.get("local_id") != local_id]
+    return {**result, "data": data}
+
+def _confirm_comm_log(result: Dict[str, Any], local_id: str) -> Dict[str, Any]:
+    """낙관적 소통 기록을 확정 상태로 변경"""
+    data = dict(result.get("data") or {})
+    data["comm_logs"] = [
+        {**log, "pending": False} if log.get("local_id") == local_id else log
+        for log in (data.get("comm_logs") or [])
+    ]
+    return {**result, "data": data}
+
+def optimistic_add_comm_log(receipt_no: str, author: str, content: str) -> None:
+    """소통 기록을 화면에 즉시 반영하고 GAS 저장은 백그라운드로 전송"""
+    local_id = uuid.uuid4().hex
+    log = {
+        "author": sanitize_input(author, 50),
+        "content": sanitize_input(content, 2000),
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "pending": True,
+        "local_id": local_id
+    }
+    if st.session_state.search_result and _current_receipt_no() == receipt_no:
+        st.session_state.search_result = _with_comm_log(st.session_state.search_result, log)
+        _sync_view_cache()
+    else:
+        get_view_cache().invalidate(receipt_no)
+    
+    future = get_write_executor().submit(add_comm_log, receipt_no, author, content)
+    st.session_state.pending_writes.append({
+        "kind": "comm_log",
+        "receipt_no": receipt_no,
+        "local_id": local_id,
+        "future": future
+    })
+
+def optimistic_issue_survey_link(receipt_no: str, stage: int) -> None:
+    """링크 발급 상태를 즉시 표시하고 GAS 발급은 백그라운드로 전송"""
+    local_id = uuid.uuid4().hex
+    st.session_state.issued_link = {"stage": stage, "link": "", "pending": True, "local_id": local_id}
+    
+    future = get_write_executor().submit(issue_survey_link, receipt_no, stage)
+    st.session_state.pending_writes.append({
+        "kind": "issue_link",
+        "receipt_no": receipt_no,
+        "stage": stage,
+        "local_id": local_id,
+        "future": future
+    })
+
+def reconcile_pending_writes() -> None:
+    """완료된 백그라운드 쓰기를 화면 상태에 확정 또는 롤백"""
+    remaining = []
+    for write in st.session_state.pending_writes:
+        future = write["future"]
+        if not future.done():
+            remaining.append(write)
+            continue
+        
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"ok": False, "status": "error", "error": str(e), "message": str(e)}
+        
+        is_current = _current_receipt_no() == write["receipt_no"]
+        local_id = write["local_id"]
+        
+        if write["kind"] == "comm_log":
+            if result.get("status") == "pending":
+                st.info(f"📮 GAS 응답 불가로 소통 기록을 대기열에 저장했습니다 ({safe_html(write['receipt_no'])}). 복구되면 자동 전송됩니다.")
+            if result.get("ok"):
+                if is_current:
+                    st.session_state.search_result = _confirm_comm_log(st.session_state.search_result, local_id)
+                    _sync_view_cache()
+                else:
+                    get_view_cache().invalidate(write["receipt_no"])
+            else:
+                if is_current:
+                    st.session_state.search_result = _without_comm_log(st.session_state.search_result, local_id)
+                    _sync_view_cache()
+                else:
+                    get_view_cache().invalidate(write["receipt_no"])
+                st.warning(f"⚠️ 소통 기록 저장 실패로 화면에서 되돌렸습니다 ({safe_html(write['receipt_no'])}): {safe_html(result.get('error'))}")
+        
+        elif write["kind"] == "issue_link":
+            link_info = st.session_state.issued_link or {}
+            is_shown = link_info.get("local_id") == local_id
+            if result.get("status") == "success":
+                if is_shown:
+                    st.session_state.issued_link = {"stage": write["stage"], "link": result.get("link", "")}
+            else:
+                if is_shown:
+                    st.session_state.issued_link = None
+                st.warning(f"⚠️ {int(write['stage'])}차 설문 링크 발급 실패로 되돌렸습니다: {safe_html(result.get('message'))}")
+    
+    st.session_state.pending_writes = remaining
+
+if hasattr(st, "fragment"):
+    @st.fragment(run_every=1.0)
+    def _watch_pending_writes():
+        pending = st.session_state.pending_writes
+        if any(w["future"].done() for w in pending):
+            st.rerun()
+        if pending:
+            st.caption(f"⏳ 백그라운드 저장 중 {len(pending)}건")
+else:
+    _watch_pending_writes = None
+
+def render_pending_writes_watcher():
+    """진행 중인 백그라운드 쓰기 표시 (완료 시 자동 갱신)"""
+    if not st.session_state.pending_writes:
+        return
+    if _watch_pending_writes is not None:
+        _watch_pending_writes()
+    else:
+        st.caption(f"⏳ 백그라운드 저장 중 {len(st.session_state.pending_writes)}건 (화면을 다시 조작하면 반영됩니다)")
+
 # ==============================
 # 파이프라인 통계
 # ==============================
@@ -557,25 +833,22 @@ def calculate_pipeline_stats(clients: List[Dict]) -> Dict[str, int]:
 # ==============================
 # 오늘 할 일 섹션
 # ==============================
-def render_todo_section(clients: List[Dict]):
-    """오늘 할 일 섹션"""
-    st.markdown("""
-    <div class="todo-section">
-        <h3>📋 오늘 할 일</h3>
-    """, unsafe_allow_html=True)
-    
+def collect_todos(clients: List[Dict]) -> List[Dict]:
+    """오늘 할 일 목록 (표시 순서 = 프리페치 우선순위)"""
     todos = []
     
     if clients:
         for c in clients:
             progress = c.get("progress_pct", 0)
             name = safe_html(c.get("name", "-"))
-            receipt_no = safe_html(c.get("receipt_no", "-"))
+            raw_receipt_no = str(c.get("receipt_no", "") or "")
+            receipt_no = safe_html(raw_receipt_no or "-")
             
             # 2차 완료 → 3차 대기
             if 66 <= progress < 100:
                 todos.append({
                     "priority": "urgent",
+                    "receipt_no": raw_receipt_no,
                     "text": f"🔴 {name} ({receipt_no}) - 3차 설문 발송 필요"
                 })
             
@@ -583,9 +856,21 @@ def render_todo_section(clients: List[Dict]):
             elif 33 <= progress < 66:
                 todos.append({
                     "priority": "important", 
+                    "receipt_no": raw_receipt_no,
                     "text": f"🟡 {name} ({receipt_no}) - 2차 설문 대기"
                 })
     
+    return todos
+
+def render_todo_section(clients: List[Dict]):
+    """오늘 할 일 섹션"""
+    st.markdown("""
+    <div class="todo-section">
+        <h3>📋 오늘 할 일</h3>
+    """, unsafe_allow_html=True)
+    
+    todos = collect_todos(clients)
+    
     if not todos:
         st.markdown('<div class="todo-item todo-normal">✅ 오늘 처리할 긴급 업무가 없습니다</div>', unsafe_allow_html=True)
     else:
@@ -724,43 +1009,8 @@ def render_stage_card(title: str, data: Optional[Dict], stage: int):
         <div class="data-grid">
     """, unsafe_allow_html=True)
     
-    # 단계별 표시 필드
-    if stage == 1:
-        fields = [
-            ("name", "성명"),
-            ("phone", "연락처"),
-            ("gender", "성별"),
-            ("birthdate", "생년월일"),
-            ("business_type", "사업자유형"),
-            ("region", "지역"),
-            ("interest", "관심사항"),
-            ("referral_source", "유입경로")
-        ]
-    elif stage == 2:
-        fields = [
-            ("company_name", "상호명"),
-            ("business_number", "사업자번호"),
-            ("open_date", "개업연월"),
-            ("employee_count", "직원수"),
-            ("annual_revenue", "연매출"),
-            ("business_category", "업종"),
-            ("funding_purpose", "자금용도"),
-            ("desired_amount", "희망금액"),
-            ("past_policy_fund", "정책자금이력"),
-            ("additional_info", "추가정보")
-        ]
-    else:  # stage 3
-        fields = [
-            ("funding_timeline", "자금시기"),
-            ("collateral_type", "담보유형"),
-            ("credit_status", "신용상태"),
-            ("tax_status", "세금상태"),
-            ("consulting_request", "상담요청"),
-            ("recommended_fund", "추천자금"),
-            ("expected_limit", "예상한도"),
-            ("decision_status", "의사결정"),
-            ("readiness_score", "준비도")
-        ]
+    # 단계별 표시 필드 (내보내기와 공용 정의)
+    fields = STAGE_FIELDS.get(stage, STAGE_FIELDS[3])
     
     for key, label in fields:
         value = safe_html(data.get(key, "-") or "-")
@@ -798,37 +1048,28 @@ def render_link_issue_section(receipt_no: str, customer_name: str, customer_phon
             st.session_state.issued_link = {"stage": 1, "link": link}
             st.success("✅ 1차 설문 링크 생성 완료!")
     
+    # [v3.9] 2차/3차는 낙관적 발급 (백그라운드 전송 → 완료 시 링크 표시)
     with col2:
         if st.button("📑 2차 설문 링크 발급", type="primary", use_container_width=True):
-            with st.spinner("링크 생성 중..."):
-                result = issue_survey_link(receipt_no, 2)
-                if result.get("status") == "success":
-                    link = result.get("link", "")
-                    st.session_state.issued_link = {"stage": 2, "link": link}
-                    st.success("✅ 2차 설문 링크 발급 완료!")
-                else:
-                    st.error(f"❌ 실패: {safe_html(result.get('message'))}")
+            optimistic_issue_survey_link(receipt_no, 2)
     
     with col3:
         if st.button("📋 3차 설문 링크 발급", use_container_width=True):
-            with st.spinner("링크 생성 중..."):
-                result = issue_survey_link(receipt_no, 3)
-                if result.get("status") == "success":
-                    link = result.get("link", "")
-                    st.session_state.issued_link = {"stage": 3, "link": link}
-                    st.success("✅ 3차 설문 링크 발급 완료!")
-                else:
-                    st.error(f"❌ 실패: {safe_html(result.get('message'))}")
+            optimistic_issue_survey_link(receipt_no, 3)
     
     # 발급된 링크 표시
     if st.session_state.issued_link:
         link_info = st.session_state.issued_link
-        safe_link = safe_html(link_info['link'])
         stage_num = int(link_info['stage'])
         
         # 1차는 상세 설문, 2차/3차는 기존 표현
         stage_label = "1차 상세 설문" if stage_num == 1 else f"{stage_num}차 설문"
         
+        if link_info.get("pending"):
+            st.info(f"⏳ {stage_label} 링크 발급 중...")
+            return
+        
+        safe_link = safe_html(link_info['link'])
         st.markdown(f"""
         <div class="link-box">
             <strong>🔎 {stage_label} 링크</strong><br>
@@ -850,12 +1091,13 @@ def render_comm_logs_section(logs: List[Dict], receipt_no: str):
             author = safe_html(log.get('author', '-'))
             created_at = safe_html(log.get('created_at', '-'))
             content = safe_html(log.get('content', '-'))
+            pending_mark = " · ⏳ 저장 중" if log.get('pending') else ""
             
             st.markdown(f"""
             <div class="comm-log-item">
                 <div class="comm-log-header">
                     <span class="comm-log-author">{author}</span>
-                    <span class="comm-log-date">{created_at}</span>
+                    <span class="comm-log-date">{created_at}{pending_mark}</span>
                 </div>
                 <div class="comm-log-content">{content}</div>
             </div>
@@ -871,13 +1113,9 @@ def render_comm_logs_section(logs: List[Dict], receipt_no: str):
             
             if st.form_submit_button("💾 저장"):
                 if content:
-                    result = add_comm_log(receipt_no, author, content)
-                    if result.get("ok"):
-                        st.success("✅ 저장되었습니다.")
-                        st.session_state.search_result = fetch_integrated_data(receipt_no)
-                        st.rerun()
-                    else:
-                        st.error(f"❌ 저장 실패: {safe_html(result.get('error'))}")
+                    # [v3.9] 화면 즉시 반영 후 백그라운드 저장 (재조회 없음)
+                    optimistic_add_comm_log(receipt_no, author, content)
+                    st.rerun()
                 else:
                     st.warning("내용을 입력해주세요.")
 
@@ -939,6 +1177,7 @@ def render_ai_analysis_section(data: Dict):
 
 def run_ai_analysis(data: Dict, analysis_type: str) -> str:
     """Gemini AI 분석 실행"""
+    import requests  # AI 분석 시점에만 import (대시보드 시작 시간 단축)
     try:
         stage1 = data.get("stage1") or {}
         stage2 = data.get("stage2") or {}
@@ -1055,7 +1294,7 @@ def render_pdf_upload_section():
     
     if uploaded and HAS_PYPDF:
         try:
-            pdf_reader = PdfReader(io.BytesIO(uploaded.read()))
+            pdf_reader = _pdf_reader_class()(io.BytesIO(uploaded.read()))
             text = ""
             for page in pdf_reader.pages:
                 text += page.extract_text() or ""
@@ -1075,46 +1314,123 @@ def render_pdf_upload_section():
 # 문서 생성
 # ==============================
 def generate_doc_content(data: Dict) -> str:
-    """문서 내용 생성"""
-    stage1 = data.get("stage1") or {}
-    stage2 = data.get("stage2") or {}
-    stage3 = data.get("stage3") or {}
-    
+    """문서 내용 생성 (일괄 생성과 같은 컴파일된 템플릿 사용)"""
     # 문서 내용은 다운로드용이므로 이스케이프 불필요
-    content = f"""
-=====================================
-유아플랜 고객 정보 요약서
-=====================================
-접수번호: {data.get('receipt_no', '-')}
-작성일자: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
-[1차 설문 - 기본정보]
-- 성명: {stage1.get('name', '-')}
-- 연락처: {stage1.get('phone', '-')}
-- 성별: {stage1.get('gender', '-')}
-- 생년월일: {stage1.get('birthdate', '-')}
-- 사업자유형: {stage1.get('business_type', '-')}
-- 지역: {stage1.get('region', '-')}
+    return render_summary(data)
 
-[2차 설문 - 사업정보]
-- 상호명: {stage2.get('company_name', '-')}
-- 사업자번호: {stage2.get('business_number', '-')}
-- 개업연월: {stage2.get('open_date', '-')}
-- 업종: {stage2.get('business_category', '-')}
-- 연매출: {stage2.get('annual_revenue', '-')}
-- 직원수: {stage2.get('employee_count', '-')}
-- 자금용도: {stage2.get('funding_purpose', '-')}
-- 희망금액: {stage2.get('desired_amount', '-')}
+# ==============================
+# 요약서 일괄 생성 (v3.9.4)
+# ==============================
+def render_batch_doc_section(clients: List[Dict]):
+    """선택 고객 요약서 ZIP 일괄 생성"""
+    with st.expander("🗂 요약서 일괄 생성 (ZIP)", expanded=False):
+        if not clients:
+            st.info("고객 데이터가 없습니다.")
+            return
+        
+        labels = {}
+        for c in clients:
+            receipt_no = str(c.get("receipt_no", "") or "")
+            if receipt_no:
+                labels[receipt_no] = f"{c.get('name', '-')} ({receipt_no})"
+        
+        today_str = datetime.now().strftime("%Y-%m-%d")
+        today_only = st.checkbox("오늘 접수 고객 전체", value=False)
+        if today_only:
+            selected = [
+                str(c.get("receipt_no")) for c in clients
+                if c.get("receipt_no") and today_str in str(c.get("created_at", ""))
+            ]
+            st.caption(f"오늘 접수 {len(selected)}명")
+        else:
+            selected = st.multiselect("고객 선택", list(labels.keys()), format_func=lambda r: labels.get(r, r))
+        
+        if st.button(f"🗂 {len(selected)}건 요약서 생성", disabled=not selected):
+            progress = st.progress(0.0, text="요약서 생성 중...")
+            
+            def _on_progress(done: int, total: int):
+                progress.progress(done / total if total else 1.0, text=f"요약서 생성 중... {done}/{total}")
+            
+            path, failed = build_summary_zip(selected, fetch_integrated_data_bulk, on_progress=_on_progress)
+            progress.empty()
+            st.session_state.summary_zip = path
+            if failed:
+                st.warning(f"⚠️ 조회 실패로 제외된 고객 {len(failed)}명: {safe_html(', '.join(failed[:10]))}")
+        
+        zip_path = st.session_state.summary_zip
+        if zip_path and os.path.exists(zip_path):
+            render_file_download(zip_path, os.path.basename(zip_path), "application/zip")
 
-[3차 설문 - 추가정보]
-- 자금시기: {stage3.get('funding_timeline', '-')}
-- 담보유형: {stage3.get('collateral_type', '-')}
-- 신용상태: {stage3.get('credit_status', '-')}
-- 세금상태: {stage3.get('tax_status', '-')}
+# ==============================
+# 고객 전체 내보내기 (v3.9.3)
+# ==============================
+EXPORT_MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
 
-=====================================
-"""
-    return content
+def get_receipt_index(clients: List[Dict]) -> ReceiptTimeIndex:
+    """접수일 색인 (고객 목록 로드 시 1회 생성)"""
+    if st.session_state.receipt_index is None:
+        st.session_state.receipt_index = ReceiptTimeIndex(
+            str(c.get("receipt_no", "") or "") for c in (clients or [])
+        )
+    return st.session_state.receipt_index
+
+def render_funnel_section(days: int = 30):
+    """캠페인 퍼널 (funnel_daily 사전 집계 - 새 기록만 반영 후 조회)"""
+    with st.expander(f"📈 캠페인 퍼널 (최근 {days}일)", expanded=False):
+        try:
+            store = get_attribution_store()
+            funnels = store.campaign_funnels(days=days)
+        except Exception as e:
+            st.warning(f"⚠️ 귀속 저장소에 연결할 수 없어 퍼널을 표시하지 못했습니다: {e}")
+            return
+        if not store.shared:
+            st.caption("⚠️ 로컬 귀속 저장소: 랜딩/설문 앱과 같은 호스트의 기록만 집계됩니다. "
+                       "분리 배포 시 ATTRIBUTION_DB_URL(PostgreSQL)을 설정하세요.")
+        if not funnels:
+            st.caption("아직 기록된 유입이 없습니다.")
+            return
+        st.dataframe([{
+            "소스": f["utm_source"], "캠페인": f["utm_campaign"],
+            "조회": f["view"], "신청": f["lead"], "2차": f["stage2"], "3차": f["stage3"], "계약": f["contract"],
+            "신청률": f"{f['lead_rate'] * 100:.1f}%" if f["lead_rate"] is not None else "-",
+            "계약률": f"{f['contract_rate'] * 100:.1f}%" if f["contract_rate"] is not None else "-",
+        } for f in funnels], use_container_width=True, hide_index=True)
+
+def render_export_section(clients: List[Dict]):
+    """고객 전체 CSV/Parquet 내보내기"""
+    with st.expander("📦 고객 전체 내보내기 (CSV / Parquet)", expanded=False):
+        if not clients:
+            st.info("내보낼 고객 데이터가 없습니다.")
+            return
+        
+        # 접수일 기간 필터 (색인 이진 탐색)
+        if st.checkbox("접수일 기간 지정", value=False):
+            today = date.today()
+            period = st.date_input("접수일 기간", value=(today - timedelta(days=30), today))
+            if isinstance(period, (list, tuple)) and len(period) == 2:
+                in_range = set(get_receipt_index(clients).between(period[0], period[1]))
+                clients = [c for c in clients if str(c.get("receipt_no", "")) in in_range]
+            st.caption(f"대상 고객 {len(clients)}명")
+        
+        options = ["csv", "parquet"] if HAS_PYARROW else ["csv"]
+        formats = st.multiselect("파일 형식", options, default=options)
+        if not HAS_PYARROW:
+            st.caption("Parquet 내보내기는 pyarrow 설치 시 사용할 수 있습니다.")
+        
+        if st.button(f"📦 {len(clients)}명 내보내기", disabled=not formats):
+            progress = st.progress(0.0, text="내보내는 중...")
+            
+            def _on_progress(done: int, total: int):
+                progress.progress(done / total if total else 1.0, text=f"내보내는 중... {done}/{total}")
+            
+            st.session_state.export_paths = export_clients(
+                clients, fetch_integrated_data_bulk, formats=formats, on_progress=_on_progress
+            )
+            progress.empty()
+        
+        for fmt, path in (st.session_state.export_paths or {}).items():
+            if os.path.exists(path):
+                render_file_download(path, os.path.basename(path), EXPORT_MIME.get(fmt, "application/octet-stream"))
 
 # ==============================
 # 결과 저장 섹션
@@ -1156,13 +1472,9 @@ def render_result_save_section(receipt_no: str):
                 if result_memo:
                     content += f" / 메모: {result_memo}"
                 
-                result = add_comm_log(receipt_no, "대표", content)
-                if result.get("ok"):
-                    st.success(f"✅ 결과 저장 완료")
-                    st.session_state.search_result = fetch_integrated_data(receipt_no)
-                    st.rerun()
-                else:
-                    st.error(f"❌ 저장 실패: {safe_html(result.get('error'))}")
+                # [v3.9] 화면 즉시 반영 후 백그라운드 저장 (재조회 없음)
+                optimistic_add_comm_log(receipt_no, "대표", content)
+                st.rerun()
             else:
                 st.warning("정책자금명과 승인금액은 필수입니다.")
 
@@ -1198,6 +1510,8 @@ def main():
     # ========== 초기화 (main 내에서 호출) ==========
     init_session_state()
     apply_custom_css()
+    reconcile_pending_writes()
+    get_view_cache().ttl = VIEW_CACHE_TTL  # 설정 파일 변경(API_CACHE_TTL) 즉시 반영
     
     # ========== 보안 설정 체크 ==========
     is_secure, security_errors = check_security_config()
@@ -1243,7 +1557,7 @@ def main():
             <h1>📊 유아플랜 컨설턴트 대시보드</h1>
         </div>
         <div class="version">
-            <div>v3.8.2</div>
+            <div>v3.10.1</div>
             <div style="font-size: 11px; opacity: 0.7;">{safe_html(current_time)}</div>
         </div>
     </div>
@@ -1251,6 +1565,8 @@ def main():
     
     # 로그아웃
     col_spacer, col_logout = st.columns([8, 1])
+    with col_spacer:
+        render_pending_writes_watcher()
     with col_logout:
         if st.button("🚪 로그아웃"):
             st.session_state.authenticated = False
@@ -1262,9 +1578,12 @@ def main():
         with st.spinner("📊 데이터 로딩..."):
             # [v3.8] 캐싱된 함수 호출
             result = fetch_all_clients_cached(API_TOKEN)
+            if result.get("_stale"):
+                st.warning("⚠️ GAS 응답 불가 - 마지막으로 받은 고객 목록을 표시합니다. (새로고침으로 재시도)")
             if result.get("ok"):
                 st.session_state.all_clients = result.get("data", [])
                 st.session_state.pipeline_stats = calculate_pipeline_stats(st.session_state.all_clients)
+                st.session_state.receipt_index = None
             st.session_state.all_clients_loaded = True
     
     # ========== 오늘 할 일 + 레이더 ==========
@@ -1287,6 +1606,11 @@ def main():
         """, unsafe_allow_html=True)
         st.code(FIRST_SURVEY_URL)
     
+    # ========== 고객 전체 내보내기 / 요약서 일괄 생성 ==========
+    render_export_section(st.session_state.all_clients)
+    render_funnel_section()
+    render_batch_doc_section(st.session_state.all_clients)
+    
     # ========== 고객 조회 ==========
     st.markdown("""
     <div class="search-section">
@@ -1300,7 +1624,7 @@ def main():
         receipt_no_input = st.text_input(
             "접수번호",
             value=st.session_state.searched_receipt_no,
-            placeholder="예: YP12091234",
+            placeholder="예: YP251213000042",
             label_visibility="collapsed",
             max_chars=20
         )
@@ -1313,7 +1637,7 @@ def main():
             # [v3.8] 캐시 무효화 후 재로딩
             fetch_all_clients_cached.clear()
             if st.session_state.searched_receipt_no:
-                st.session_state.search_result = fetch_integrated_data(st.session_state.searched_receipt_no)
+                st.session_state.search_result = load_integrated_view(st.session_state.searched_receipt_no, force=True)
             st.session_state.all_clients_loaded = False
             st.rerun()
     
@@ -1322,7 +1646,7 @@ def main():
         sanitized_input = sanitize_input(receipt_no_input, 20)
         
         if not validate_receipt_no(sanitized_input):
-            st.warning("⚠️ 접수번호 형식이 올바르지 않습니다. (예: YP12091234)")
+            st.warning("⚠️ 접수번호 형식이 올바르지 않습니다. (예: YP251213000042)")
         else:
             st.session_state.searched_receipt_no = sanitized_input
             st.session_state.issued_link = None
@@ -1332,14 +1656,23 @@ def main():
             st.session_state.result_auth = False
             
             with st.spinner("🔄 조회 중..."):
-                st.session_state.search_result = fetch_integrated_data(sanitized_input)
+                st.session_state.search_result = load_integrated_view(sanitized_input)
+            remember_recent_receipt(sanitized_input)
             st.rerun()
     
+    render_cache_stats()
+    render_gas_health()
+    
+    # [v3.9.1] 조회 결과를 읽는 동안 다음 후보 고객 미리 조회
+    schedule_prefetch(st.session_state.all_clients)
+    
     # ========== 조회 결과 ==========
     if st.session_state.search_result:
         result = st.session_state.search_result
         
         if result.get("status") == "success":
+            if result.get("_stale"):
+                st.caption("🕓 GAS 응답 불가 - 마지막으로 조회한 데이터를 표시합니다.")
             data = result.get("data", {})
             receipt_no = data.get("receipt_no", "")
             progress = data.get("progress_pct", 0)
@@ -1403,8 +1736,8 @@ def main():
             # 문서 다운로드
             st.markdown("### 📄 문서 다운로드")
             doc_content = generate_doc_content(data)
-            filename = f"유아플랜_{receipt_no}_{datetime.now().strftime('%Y%m%d')}.txt"
-            st.markdown(create_download_link(doc_content, filename), unsafe_allow_html=True)
+            filename = summary_filename(receipt_no)
+            st.download_button(f"📥 {filename}", data=doc_content.encode("utf-8"), file_name=filename, mime="text/plain")
         
         elif result.get("status") == "error":
             st.error(f"❌ 조회 실패: {safe_html(result.get('message'))}")
@@ -1416,4 +1749,7 @@ def main():
         st.warning("⚠️ 접수번호를 입력해주세요.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        startup_timing.report_once("dashboard")
@@ -0,0 +1,252 @@
+"""
+유아플랜 설문 공통 프레임워크 (survey / survey2 / survey3)
+- 공통 CSS: static/survey.css 정적 파일 → <link> 1줄만 전송, 폰트/스타일은 브라우저 캐시
+  (.streamlit/config.toml enableStaticServing 미설정 환경, .css를 text/plain + nosniff로 보내는 구버전 Streamlit에서는
+   인라인 <style>로 대체)
+- 폼 스키마: GAS 컬럼 순서대로 Field 선언 → 정규화/검증/전송 데이터 순서를 한 곳에서 처리
+- 검증 규칙은 스키마 생성 시 1회 컴파일 (제출마다 분기/정규식 재구성 없음)
+- 공통 유틸: 연락처(identity)/사업자번호 포맷, GAS 전송 (장애 시 로컬 대기열 → {"status": "pending"})
+"""
+
+from __future__ import annotations
+import os
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from uuid import uuid4
+
+import streamlit as st
+
+from identity import _digits_only, format_phone  # 설문 앱 공용 (survey/survey2가 이 모듈에서 import)
+from request_helper import json_write
+
+BRAND_NAME = "유아플랜"
+LOGO_URL = "https://raw.githubusercontent.com/youareplan-ceo/youareplan-survey/main/logo_white.png"
+KAKAO_CHANNEL_URL = "https://pf.kakao.com/_LWxexmn"
+
+STATIC_CSS_URL = "app/static/survey.css"
+STATIC_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "survey.css")
+
+# ==============================
+# 공통 유틸 (연락처 정규화는 identity 모듈 - 랜딩 CAPI와 공용)
+# ==============================
+def format_biz_no(d: str) -> str:
+    return f"{d[0:3]}-{d[3:5]}-{d[5:10]}" if len(d) == 10 else d
+
+def idempotency_key(prefix: str) -> str:
+    return f"{prefix}-{int(time.time()*1000)}-{uuid4().hex[:8]}"
+
+def post_to_gas(url: str, payload: Dict[str, Any], timeout: Optional[float] = None,
+                idempotency_prefix: str = "") -> Dict[str, Any]:
+    """GAS JSON POST → 응답 dict (실패 시 {"status": "error", "message": ...})
+
+    쓰기 요청이므로 자동 재시도하지 않음 (중복 행 방지)
+    GAS 장애(서킷 열림)면 로컬 대기열에 저장 후 {"status": "pending"} 반환
+    타임아웃은 엔드포인트별 적응형 (request_helper, 상한 REQUEST_TIMEOUT)
+    """
+    headers = {"X-Idempotency-Key": idempotency_key(idempotency_prefix)} if idempotency_prefix else None
+    ok, _, data, err = json_write(url, payload, headers=headers, timeout=timeout)
+    if ok and isinstance(data, dict):
+        return data
+    return {"status": "error", "message": err or "전송 실패"}
+
+# ==============================
+# 스타일 / 공통 화면
+# ==============================
+@lru_cache(maxsize=1)
+def _inline_css() -> str:
+    with open(STATIC_CSS_PATH, encoding="utf-8") as f:
+        return f.read()
+
+def _static_serving_enabled() -> bool:
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+@lru_cache(maxsize=1)
+def _static_css_served() -> bool:
+    # 구버전 정적 핸들러: 허용 확장자 외 파일은 text/plain + nosniff → 브라우저가 스타일시트를 무시
+    try:
+        from streamlit.web.server.app_static_file_handler import SAFE_APP_STATIC_FILE_EXTENSIONS
+    except ImportError:
+        return True
+    return ".css" in SAFE_APP_STATIC_FILE_EXTENSIONS
+
+def apply_survey_style(max_width: Optional[int] = None):
+    """공통 CSS 적용 (정적 파일 링크 우선)"""
+    if _static_serving_enabled() and _static_css_served():
+        st.markdown(f'<link rel="stylesheet" href="{STATIC_CSS_URL}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{_inline_css()}</style>", unsafe_allow_html=True)
+    if max_width:
+        st.markdown(f"<style>.block-container {{ max-width: {max_width}px !important; }}</style>",
+                    unsafe_allow_html=True)
+
+def render_header(label: str):
+    st.markdown(f"""
+    <div class="unified-header">
+        <img src="{LOGO_URL}" alt="{BRAND_NAME}">
+        <div class="gov-label">{label}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_section_header(title: str):
+    st.markdown(f'<div class="section-header">{title}</div>', unsafe_allow_html=True)
+
+def render_success_box(title: str, body: str, kakao: bool = False):
+    kakao_html = f"""
+    <div style="text-align: center; margin-top: 20px;">
+        <a href="{KAKAO_CHANNEL_URL}" target="_blank"
+           style="display:inline-block; background:#FEE500; color:#3C1E1E;
+                  padding:12px 25px; border-radius:8px; text-decoration:none; font-weight:bold;">
+            💬 카카오톡 문의하기
+        </a>
+    </div>""" if kakao else ""
+    st.markdown(f"""
+    <div class="success-box">
+        <h3>{title}</h3>
+        <p>{body}</p>
+    </div>{kakao_html}
+    """, unsafe_allow_html=True)
+
+# ==============================
+# 폼 스키마
+# ==============================
+def _strip(value: Any) -> Any:
+    return value.strip() if isinstance(value, str) else value
+
+def joined(empty: str = "") -> Callable[[Any], str]:
+    """multiselect 값 → 'a, b' (선택 없으면 empty)"""
+    return lambda values: ", ".join(values) if values else empty
+
+def or_default(empty: str) -> Callable[[Any], Any]:
+    """빈 입력 → empty"""
+    return lambda value: value if value else empty
+
+
+@dataclass(frozen=True)
+class Field:
+    """GAS 컬럼 1개
+
+    widget: text | textarea | select | multiselect | checkbox | meta(화면 없음, 호출 측이 값 전달)
+    clean: 입력값 → 검증용 값 (기본: 문자열 strip)
+    normalize: 검증된 값 → 전송값
+    required: 비었을 때(또는 blank_values일 때) 표시할 문구
+    pattern/invalid: clean 값이 pattern에 맞지 않을 때 표시할 문구
+    """
+    key: str
+    label: str = ""
+    widget: str = "text"
+    options: Sequence[Any] = ()
+    placeholder: str = ""
+    default: Any = None
+    help: Optional[str] = None
+    clean: Optional[Callable[[Any], Any]] = None
+    normalize: Optional[Callable[[Any], Any]] = None
+    required: str = ""
+    blank_values: Tuple[Any, ...] = ()
+    pattern: Optional[str] = None
+    invalid: str = ""
+    level: str = "warning"
+
+
+# (key, 통과 여부 함수, 문구, 표시 레벨)
+_Check = Tuple[str, Callable[[Any], bool], str, str]
+
+
+def _is_filled(value: Any, blanks: frozenset) -> bool:
+    # multiselect(list) 값은 blank_values가 아닌 선택이 1개 이상이면 입력된 것으로 봄
+    if isinstance(value, (list, tuple, set)):
+        return any(v not in blanks for v in value)
+    return bool(value) and value not in blanks
+
+
+def _compile_checks(f: Field) -> List[_Check]:
+    checks: List[_Check] = []
+    if f.required:
+        blanks = frozenset(f.blank_values)
+        checks.append((f.key, lambda v: _is_filled(v, blanks), f.required, f.level))
+    if f.pattern:
+        match = re.compile(f.pattern).match
+        checks.append((f.key, lambda v: bool(match(v or "")), f.invalid or f.required, f.level))
+    return checks
+
+
+# 레이아웃: 행(row)은 필드 key 1개 또는 컬럼 튜플, 컬럼은 key 1개 또는 key 튜플(세로 배치)
+Row = Union[str, Tuple[Union[str, Tuple[str, ...]], ...]]
+
+
+@dataclass(frozen=True)
+class Section:
+    title: Optional[str]   # None이면 구분선만
+    rows: Tuple[Row, ...]
+
+
+class FormSchema:
+    """GAS 컬럼 순서의 필드 목록 → 정규화/검증/전송 데이터 생성"""
+
+    def __init__(self, fields: Sequence[Field]):
+        self.fields: Tuple[Field, ...] = tuple(fields)
+        self.keys: Tuple[str, ...] = tuple(f.key for f in self.fields)
+        self._by_key: Dict[str, Field] = {f.key: f for f in self.fields}
+        self._cleaners = tuple((f.key, f.clean or _strip, f.default) for f in self.fields)
+        self._normalizers = tuple((f.key, f.normalize) for f in self.fields)
+        self._checks: Tuple[_Check, ...] = tuple(c for f in self.fields for c in _compile_checks(f))
+
+    def clean(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: cleaner(values.get(key, default)) for key, cleaner, default in self._cleaners}
+
+    def validate(self, cleaned: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """첫 번째 실패 → (레벨, 문구), 통과 시 None"""
+        for key, check, message, level in self._checks:
+            if not check(cleaned.get(key)):
+                return level, message
+        return None
+
+    def build_payload(self, cleaned: Dict[str, Any]) -> Dict[str, Any]:
+        """GAS 컬럼 순서의 전송 데이터"""
+        return {
+            key: (normalize(cleaned[key]) if normalize else cleaned[key])
+            for key, normalize in self._normalizers
+        }
+
+    # ---------- 렌더링 ----------
+    def _render_field(self, key: str, defaults: Dict[str, Any]) -> Any:
+        f = self._by_key[key]
+        value = defaults.get(key, f.default)
+        if f.widget == "select":
+            index = list(f.options).index(value) if value in f.options else 0
+            return st.selectbox(f.label, f.options, index=index, help=f.help, key=f"f_{key}")
+        if f.widget == "multiselect":
+            return st.multiselect(f.label, f.options, default=value or [], help=f.help, key=f"f_{key}")
+        if f.widget == "checkbox":
+            return st.checkbox(f.label, value=bool(value), help=f.help, key=f"f_{key}")
+        if f.widget == "textarea":
+            return st.text_area(f.label, value=value or "", placeholder=f.placeholder, help=f.help, key=f"f_{key}")
+        return st.text_input(f.label, value=value or "", placeholder=f.placeholder, help=f.help, key=f"f_{key}")
+
+    def render(self, layout: Sequence[Section], defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """레이아웃대로 위젯 렌더링 → {key: 입력값} (st.form 안에서 호출)"""
+        defaults = defaults or {}
+        values: Dict[str, Any] = {}
+        for section in layout:
+            if section.title:
+                render_section_header(section.title)
+            else:
+                st.markdown("---")
+            for row in section.rows:
+                if isinstance(row, str):
+                    values[row] = self._render_field(row, defaults)
+                    continue
+                for col, keys in zip(st.columns(len(row)), row):
+                    with col:
+                        for key in ((keys,) if isinstance(keys, str) else keys):
+                            values[key] = self._render_field(key, defaults)
+        return values
+
+    def show_error(self, failure: Tuple[str, str]):
+        level, message = failure
+        (st.error if level == "error" else st.warning)(message)
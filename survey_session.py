@@ -0,0 +1,50 @@
+"""
+유아플랜 설문 공통 세션 부트스트랩
+- URL 파라미터 프리필 / 토큰 검증 / 연결 1차 접수번호를 브라우저 세션당 1회만 계산
+- 이후 rerun은 session_state의 결과를 그대로 사용 (파라미터 재해석/네트워크 검증 없음)
+- URL 파라미터가 바뀐 경우에만 다시 계산
+- should_cache가 False인 결과(토큰 검증 실패 등)는 저장하지 않음 → 다음 rerun에서 다시 계산
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import unquote
+
+import streamlit as st
+
+SESSION_KEY_PREFIX = "_bootstrap_"
+
+
+def read_query_params(keys: Iterable[str]) -> Dict[str, str]:
+    """지정한 URL 파라미터만 읽어 디코딩 (없으면 빈 문자열)"""
+    try:
+        qp = st.query_params
+        return {k: unquote(qp.get(k, "") or "") for k in keys}
+    except Exception:
+        return {k: "" for k in keys}
+
+
+def bootstrap_session(app: str, keys: Iterable[str],
+                      resolver: Callable[[Dict[str, str]], Dict[str, Any]],
+                      should_cache: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Any]:
+    """세션당 1회 resolver 실행 후 결과 재사용
+
+    Args:
+        app: 앱 구분자 (session_state 키에 사용)
+        keys: resolver에 넘길 URL 파라미터 이름
+        resolver: 파라미터 → 부트스트랩 결과 (프리필/검증 결과 등)
+        should_cache: 결과 → 저장 여부 (미지정 시 항상 저장)
+    """
+    session_key = f"{SESSION_KEY_PREFIX}{app}"
+    params = read_query_params(keys)
+    cached: Optional[Dict[str, Any]] = st.session_state.get(session_key)
+    if cached is not None and cached["params"] == params:
+        return cached["result"]
+
+    result = resolver(params)
+    if should_cache is None or should_cache(result):
+        st.session_state[session_key] = {"params": params, "result": result}
+    else:
+        st.session_state.pop(session_key, None)
+    return result
+
@@ -3,19 +3,23 @@
 - 설문 제출 알림
 - 상태 변경 알림
 - 오류 알림
+- 정책자금 공고 알림 다이제스트 (program_alerts)
 """
 import requests
 from datetime import datetime
+import html
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+
+MAX_MESSAGE_CHARS = 4000   # 텔레그램 메시지 상한 4096자 (여유분 제외)
 
 class TelegramNotifier:
     """텔레그램 알림 전송 클래스"""
     
-    def __init__(self):
-        # 텔레그램 봇 설정
-        self.bot_token = "8475264602:AAFQLZN6XAzPDZofqvYRrvz5liWUFdD8RDM"
-        self.chat_id = "7518089474"  # CEO 텔레그램 ID
+    def __init__(self, bot_token: Optional[str] = None, chat_id: Optional[str] = None):
+        # 텔레그램 봇 설정 (미지정 시 기본 봇/CEO 채팅방)
+        self.bot_token = bot_token or "8475264602:AAFQLZN6XAzPDZofqvYRrvz5liWUFdD8RDM"
+        self.chat_id = chat_id or "7518089474"  # CEO 텔레그램 ID
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
         
         # 구글 시트 URL (대시보드용)
@@ -25,12 +29,13 @@ class TelegramNotifier:
             "3차": "https://docs.google.com/spreadsheets/d/1UwfACtxDU7BQM_lwuOKtlosdV8xBiXZ-aaJBfhh9FNc"
         }
     
-    def send_message(self, text: str, parse_mode: str = "HTML") -> bool:
+    def send_message(self, text: str, parse_mode: str = "HTML", chat_id: Optional[str] = None) -> bool:
         """텔레그램 메시지 전송
         
         Args:
             text: 전송할 메시지
             parse_mode: 파싱 모드 (HTML, Markdown)
+            chat_id: 받을 채팅방 (기본: self.chat_id)
             
         Returns:
             성공 여부
@@ -38,7 +43,7 @@ class TelegramNotifier:
         try:
             url = f"{self.base_url}/sendMessage"
             payload = {
-                "chat_id": self.chat_id,
+                "chat_id": chat_id or self.chat_id,
                 "text": text,
                 "parse_mode": parse_mode,
                 "disable_web_page_preview": False
@@ -211,6 +216,56 @@ class TelegramNotifier:
 """
         return self.send_message(message)
     
+    def notify_program_digest(self, alerts: List[Dict[str, Any]], chat_id: Optional[str] = None) -> Tuple[int, int]:
+        """정책자금 공고 알림 다이제스트 (메시지당 MAX_MESSAGE_CHARS 이하로 나눠 전송)
+        
+        Args:
+            alerts: program_alerts.evaluate() 결과 [{event, program, old_apply_to, rules}]
+            chat_id: 받을 채팅방 (기본: self.chat_id)
+            
+        Returns:
+            (전송 성공 메시지 수, 실패 메시지 수)
+        """
+        if not alerts:
+            return 0, 0
+        
+        blocks = []
+        for alert in alerts:
+            p = alert['program']
+            title = html.escape(str(p.get('title') or '제목 없음'))
+            link = f'<a href="{html.escape(p["url"], quote=True)}">{title}</a>' if p.get('url') else f"<b>{title}</b>"
+            meta = " · ".join(html.escape(str(v)) for v in (p.get('org'), p.get('region')) if v)
+            if alert['event'] == 'deadline':
+                when = f"⏰ 마감 변경: {html.escape(str(alert.get('old_apply_to') or '미정'))} → {html.escape(str(p.get('apply_to') or '미정'))}"
+            else:
+                when = f"📅 접수: {html.escape(str(p.get('apply_from') or '-'))} ~ {html.escape(str(p.get('apply_to') or '-'))}"
+            icon = "🔔" if alert['event'] == 'deadline' else "🆕"
+            lines = [f"{icon} {link}"] + ([f"• {meta}"] if meta else []) + [
+                f"• {when}", f"🏷 {html.escape(', '.join(alert.get('rules') or []))}"
+            ]
+            blocks.append("\n".join(lines)[:MAX_MESSAGE_CHARS - 200])
+        
+        pages, page, size = [], [], 0
+        for block in blocks:
+            if page and size + len(block) + 2 > MAX_MESSAGE_CHARS - 200:
+                pages.append(page)
+                page, size = [], 0
+            page.append(block)
+            size += len(block) + 2
+        pages.append(page)
+        
+        new_count = sum(1 for a in alerts if a['event'] != 'deadline')
+        header = (f"📢 <b>정책자금 공고 알림</b> (신규 {new_count}건 · 마감 변경 {len(alerts) - new_count}건)\n"
+                  f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+        sent = failed = 0
+        for i, page in enumerate(pages, 1):
+            suffix = f" [{i}/{len(pages)}]" if len(pages) > 1 else ""
+            if self.send_message(header + suffix + "\n\n" + "\n\n".join(page), chat_id=chat_id):
+                sent += 1
+            else:
+                failed += 1
+        return sent, failed
+    
     def test_connection(self) -> bool:
         """연결 테스트"""
         
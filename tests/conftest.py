@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 저장소 루트 모듈(policy_store 등)을 패키지 설치 없이 import
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
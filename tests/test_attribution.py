@@ -0,0 +1,54 @@
+import os
+from datetime import date, datetime
+
+import pytest
+
+from attribution import open_attribution_store
+
+PG_DSN = os.getenv('TEST_POSTGRES_DSN', '')
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return open_attribution_store(str(tmp_path / 'state.db'))
+    if not PG_DSN:
+        pytest.skip('TEST_POSTGRES_DSN 미설정')
+    store = open_attribution_store(PG_DSN)
+    store._run(lambda cur: cur.execute("TRUNCATE touchpoints, funnel_daily, funnel_state RESTART IDENTITY"))
+    return store
+
+
+def test_later_stages_copy_lead_utm_and_count_once(store):
+    when = datetime(2026, 10, 19, 10, 0)
+    utm = {'utm_source': 'meta', 'utm_campaign': 'fall'}
+    assert store.record('view', '', utm, when)
+    assert store.record('lead', 'YP261019000001', utm, when)
+    assert store.record('stage2', 'YP261019000001', None, when)
+    assert not store.record('stage2', 'YP261019000001', None, when)
+
+    funnels = store.campaign_funnels(days=7, today=date(2026, 10, 19))
+
+    assert [(f['utm_source'], f['utm_campaign'], f['view'], f['lead'], f['stage2']) for f in funnels] == [
+        ('meta', 'fall', 1, 1, 1)
+    ]
+    assert store.refresh_funnel() == 0
+
+
+def test_failed_open_is_not_retried_on_every_call(monkeypatch):
+    import attribution
+    calls = []
+
+    def unreachable(url=None):
+        calls.append(url)
+        raise RuntimeError('connection refused')
+    monkeypatch.setattr(attribution, 'open_attribution_store', unreachable)
+    monkeypatch.setattr(attribution, '_default_store', None)
+    monkeypatch.setattr(attribution, '_open_failure', None)
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            attribution.get_attribution_store()
+    assert len(calls) == 1
+    assert attribution.record_touchpoint('view') is False
+    assert len(calls) == 1
@@ -0,0 +1,22 @@
+import os
+import time
+
+from client_export import prune_exports
+
+
+def test_prune_exports_removes_only_old_export_files(tmp_path):
+    old = tmp_path / 'youareplan_clients_20260101_000000.csv'
+    new = tmp_path / 'youareplan_summaries_20261019_000000.zip'
+    other = tmp_path / 'notes.txt'
+    for path in (old, new, other):
+        path.write_text('x')
+    stale = time.time() - 3 * 24 * 3600
+    os.utime(old, (stale, stale))
+    os.utime(other, (stale, stale))
+
+    assert prune_exports(str(tmp_path), max_age=24 * 3600) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([new.name, other.name])
+
+
+def test_prune_exports_ignores_missing_dir(tmp_path):
+    assert prune_exports(str(tmp_path / 'missing')) == 0
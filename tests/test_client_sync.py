@@ -0,0 +1,53 @@
+import client_sync
+from client_sync import DELTA_ACTION, FULL_ACTION, ClientSync
+
+
+def _fake_get(monkeypatch, replies):
+    calls = []
+
+    def json_get(url, params=None, **kwargs):
+        calls.append(params['action'])
+        return replies[params['action']](params)
+
+    monkeypatch.setattr(client_sync, 'json_get', json_get)
+    return calls
+
+
+def _delta(params):
+    return True, 200, {'ok': True, 'version': 3, 'full': True, 'upserts': [{'receipt_no': 'YP261019000001'}]}, None
+
+
+def _full(params):
+    return True, 200, {'ok': True, 'data': [{'receipt_no': 'YP261019000001'}]}, None
+
+
+def test_error_without_version_keeps_delta(monkeypatch):
+    calls = _fake_get(monkeypatch, {DELTA_ACTION: lambda p: (True, 200, {'ok': False, 'error': 'Service busy'}, None),
+                                    FULL_ACTION: _full})
+    sync = ClientSync('u')
+
+    result = sync.sync('t')
+
+    assert calls == [DELTA_ACTION]
+    assert result == {'status': 'error', 'message': 'Service busy'}
+    assert sync.delta_supported
+
+
+def test_unknown_action_falls_back_and_reprobes(monkeypatch):
+    replies = {DELTA_ACTION: lambda p: (True, 200, {'status': 'error', 'message': 'Unknown action'}, None),
+               FULL_ACTION: _full}
+    calls = _fake_get(monkeypatch, replies)
+    sync = ClientSync('u', reprobe_seconds=3600)
+
+    assert sync.sync('t')['data'] == [{'receipt_no': 'YP261019000001'}]
+    sync.sync('t')
+    assert calls == [DELTA_ACTION, FULL_ACTION, FULL_ACTION]
+    assert not sync.delta_supported
+
+    # GAS 재배포 후 재확인 시점이 지나면 증분으로 복귀
+    replies[DELTA_ACTION] = _delta
+    sync.reprobe_seconds = 0
+    result = sync.sync('t')
+
+    assert calls[-1] == DELTA_ACTION
+    assert sync.delta_supported and result['version'] == 3
@@ -0,0 +1,73 @@
+import os
+import re
+
+import pytest
+
+import integrated_bulk
+from client_export import STAGE_FIELDS
+from integrated_bulk import BulkUnsupportedError, fetch_integrated_views
+from view_cache import Prefetcher, ViewCache
+
+RECEIPTS = [f"YP261019{i:06d}" for i in range(1, 101)]
+GS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'apps', 'bulk_integrated_view.gs')
+
+
+def _fake_post(monkeypatch, reply):
+    calls = []
+
+    def json_post(url, payload, timeout=None, retries=None):
+        calls.append(len(payload['receipt_nos']))
+        return reply(payload['receipt_nos'])
+
+    monkeypatch.setattr(integrated_bulk, 'json_post', json_post)
+    return calls
+
+
+def test_gas_error_reply_is_not_split(monkeypatch):
+    calls = _fake_post(monkeypatch, lambda nos: (True, 200, {'ok': False, 'error': 'unauthorized'}, None))
+
+    results = fetch_integrated_views('u', 't', RECEIPTS, chunk_size=100)
+
+    assert calls == [100]
+    assert {r['message'] for r in results.values()} == {'unauthorized'}
+
+
+@pytest.mark.parametrize('reply', [
+    (False, 503, {}, 'HTTP 503'),
+    (False, None, {}, 'HTTPSConnectionPool(host=x): Read timed out. (read timeout=90)'),
+])
+def test_timeout_and_5xx_are_split(monkeypatch, reply):
+    calls = _fake_post(monkeypatch, lambda nos: reply)
+
+    fetch_integrated_views('u', 't', RECEIPTS, chunk_size=100, max_workers=1)
+
+    assert calls[0] == 100 and min(calls) == 25 and len(calls) > 1
+
+
+def test_unknown_action_raises_and_prefetcher_falls_back(monkeypatch):
+    _fake_post(monkeypatch, lambda nos: (True, 200, {'status': 'error', 'message': 'Unknown action: get_integrated_view_bulk'}, None))
+    with pytest.raises(BulkUnsupportedError):
+        fetch_integrated_views('u', 't', RECEIPTS[:2])
+
+    cache = ViewCache()
+    single = []
+
+    def loader(key):
+        single.append(key)
+        return {'status': 'success', 'data': {'receipt_no': key}}
+
+    prefetcher = Prefetcher(cache, loader, lambda v: v.get('status') == 'success',
+                            bulk_loader=lambda keys: fetch_integrated_views('u', 't', keys))
+    prefetcher._load_bulk(RECEIPTS[:3])
+
+    assert single == RECEIPTS[:3]
+    assert all(cache.is_fresh(k) for k in RECEIPTS[:3])
+    assert not prefetcher.bulk_supported
+
+
+def test_bulk_gas_maps_every_dashboard_field():
+    with open(GS_PATH, encoding='utf-8') as f:
+        mapped = set(re.findall(r":\s*'(\w+)'", f.read()))
+    for fields in STAGE_FIELDS.values():
+        for key, _ in fields:
+            assert key in mapped, key
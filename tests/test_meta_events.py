@@ -0,0 +1,102 @@
+import sqlite3
+import time
+
+from meta_events import EventBuffer
+
+
+def _event(i):
+    return {'event_name': 'Lead', 'event_id': f'e{i}', 'event_time': int(time.time())}
+
+
+def _buffer(tmp_path, monkeypatch):
+    buffer = EventBuffer('123', str(tmp_path / 'state.db'))
+    monkeypatch.setattr(EventBuffer, 'start_worker', lambda self: None)
+    return buffer
+
+
+def test_post_exception_spools_popped_events(tmp_path, monkeypatch):
+    buffer = _buffer(tmp_path, monkeypatch)
+    buffer.add(_event(1))
+    buffer.add(_event(2))
+
+    def boom(self, events):
+        raise ValueError('bad response')
+    monkeypatch.setattr(EventBuffer, '_post', boom)
+
+    counts = buffer.flush()
+
+    assert counts['failed'] == 2
+    stats = buffer.stats()
+    assert stats['buffered'] == 0 and stats['on_disk'] == 2
+
+
+def test_claim_failure_keeps_popped_events(tmp_path, monkeypatch):
+    buffer = _buffer(tmp_path, monkeypatch)
+    buffer.add(_event(1))
+
+    def locked(self, limit):
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(EventBuffer, '_claim', locked)
+
+    assert buffer.flush()['failed'] == 1
+    assert buffer.stats()['on_disk'] == 1
+
+
+def test_disk_failure_returns_events_to_buffer(tmp_path, monkeypatch):
+    buffer = _buffer(tmp_path, monkeypatch)
+    buffer.add(_event(1))
+    buffer.add(_event(2))
+
+    def locked(self, *args, **kwargs):
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(EventBuffer, '_claim', locked)
+    monkeypatch.setattr(EventBuffer, '_spool', locked)
+
+    buffer.flush()
+
+    assert [e['event_id'] for e in buffer._buffer] == ['e1', 'e2']
+
+
+def test_rejected_event_is_dropped_and_rest_of_batch_sent(tmp_path, monkeypatch):
+    buffer = _buffer(tmp_path, monkeypatch)
+    for i in range(8):
+        buffer.add(_event(i))
+    posted = []
+
+    def graph(self, events):
+        posted.append(len(events))
+        if any(e['event_id'] == 'e5' for e in events):
+            return False, 'Invalid parameter', True
+        return True, None, False
+    monkeypatch.setattr(EventBuffer, '_post', graph)
+
+    counts = buffer.flush()
+
+    assert counts == {'sent': 7, 'failed': 0, 'dropped': 1}
+    assert buffer.stats()['on_disk'] == 0
+    assert posted[0] == 8 and len(posted) <= 1 + 2 * 3
+
+
+def test_transient_failure_keeps_whole_batch(tmp_path, monkeypatch):
+    buffer = _buffer(tmp_path, monkeypatch)
+    for i in range(4):
+        buffer.add(_event(i))
+    monkeypatch.setattr(EventBuffer, '_post', lambda self, events: (False, 'rate limited', False))
+
+    assert buffer.flush() == {'sent': 0, 'failed': 4, 'dropped': 0}
+    assert buffer.stats()['on_disk'] == 4
+
+
+def test_only_event_specific_4xx_counts_as_rejected(tmp_path, monkeypatch):
+    import meta_events
+    import request_helper
+    buffer = _buffer(tmp_path, monkeypatch)
+    monkeypatch.setattr(meta_events, 'get_config', lambda: type('Cfg', (), {'META_ACCESS_TOKEN': 'x'})())
+    replies = {
+        'bad event': (False, 400, {'error': {'message': 'Invalid parameter', 'code': 100}}, 'HTTP 400'),
+        'bad token': (False, 400, {'error': {'message': 'Invalid OAuth token', 'code': 190}}, 'HTTP 400'),
+        'throttled': (False, 429, {}, 'HTTP 429'),
+    }
+    for name, expected in (('bad event', True), ('bad token', False), ('throttled', False)):
+        monkeypatch.setattr(request_helper, 'json_post', lambda *a, **k: replies[name])
+        assert buffer._post([_event(1)])[2] is expected
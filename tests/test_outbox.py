@@ -0,0 +1,91 @@
+import socket
+import threading
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+import outbox
+import request_helper
+from outbox import Outbox
+from request_helper import _not_sent, json_write
+
+
+@pytest.fixture
+def box(tmp_path, monkeypatch):
+    box = Outbox(str(tmp_path / 'state.db'))
+    monkeypatch.setattr(Outbox, 'start_worker', lambda self: None)
+    monkeypatch.setattr(outbox, '_default_outbox', box)
+    return box
+
+
+def test_only_connect_phase_errors_count_as_not_sent():
+    refused = MaxRetryError(None, 'http://x', reason=NewConnectionError(None, 'Connection refused'))
+    aborted = ProtocolError('Connection aborted.', ConnectionResetError(104, 'reset'))
+
+    assert _not_sent(requests.ConnectTimeout())
+    assert _not_sent(requests.ConnectionError(refused))
+    assert not _not_sent(requests.ConnectionError(aborted))
+    assert not _not_sent(requests.ReadTimeout())
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_refused_write_is_queued(box):
+    ok, _, data, _ = json_write(f'http://127.0.0.1:{_closed_port()}/exec', {'receipt_no': 'YP261019000001'}, timeout=2)
+
+    assert ok and data['status'] == 'pending'
+    assert box.stats()['queued'] == 1
+
+
+def test_disconnect_after_send_is_not_replayed(box):
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def accept_and_drop():
+        conn, _ = server.accept()
+        conn.recv(65536)      # 요청은 받았지만 응답 없이 끊음
+        conn.close()
+
+    t = threading.Thread(target=accept_and_drop, daemon=True)
+    t.start()
+    try:
+        ok, status, _, err = json_write(f'http://127.0.0.1:{server.getsockname()[1]}/exec',
+                                        {'receipt_no': 'YP261019000002'}, timeout=5)
+    finally:
+        t.join(5)
+        server.close()
+
+    assert not ok and status is None and err
+    assert box.stats()['queued'] == 0
+
+
+def test_flush_keeps_rows_when_gas_body_reports_error(box, monkeypatch):
+    box.enqueue('http://gas', {'receipt_no': 'YP261019000003'})
+    replies = iter([(True, 200, {'status': 'error', 'message': 'sheet locked'}, None),
+                    (True, 200, {'status': 'success'}, None)])
+    monkeypatch.setattr(request_helper, 'json_send', lambda *a, **k: (next(replies), False))
+
+    assert box.flush() == {'sent': 0, 'failed': 1, 'deferred': 0, 'dead': 0}
+    conn = box._connect()
+    conn.execute("UPDATE outbox SET next_attempt_at = 0")
+    assert conn.execute("SELECT last_error FROM outbox").fetchone()[0] == 'sheet locked'
+    conn.close()
+    assert box.flush() == {'sent': 1, 'failed': 0, 'deferred': 0, 'dead': 0}
+    assert box.stats()['queued'] == 0
+
+
+def test_flush_retries_only_unsent_rows(box, monkeypatch):
+    box.enqueue('http://gas', {'receipt_no': 'YP261019000004'})
+    box.enqueue('http://gas', {'receipt_no': 'YP261019000005'})
+    replies = iter([((False, None, {}, 'Connection refused'), True),
+                    ((False, None, {}, 'Read timed out'), False)])
+    monkeypatch.setattr(request_helper, 'json_send', lambda *a, **k: next(replies))
+
+    assert box.flush() == {'sent': 0, 'failed': 1, 'deferred': 0, 'dead': 1}
+    assert box.stats() == {'queued': 1, 'dead': 1}
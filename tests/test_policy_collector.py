@@ -0,0 +1,21 @@
+from policy_collector import upsert_program
+from policy_store import SQLiteProgramStore
+from program_sources import BUILTIN, normalize_one
+
+
+def test_upsert_program_writes_date_columns(tmp_path):
+    store = SQLiteProgramStore(str(tmp_path / 'policy.db'))
+    item = normalize_one(BUILTIN['kstartup'], {
+        'PBLANC_TITLE_NM': '스마트공장 보급사업', 'PBLANC_INST_NM': '중소벤처기업부',
+        'RCEPT_BGNDE': '20261001', 'RCEPT_ENDDE': '2026.11.30',
+    })
+    conn = store.connect()
+    upsert_program(conn, item)
+    conn.commit()
+    conn.close()
+
+    program = store.get_programs([item['program_id']])[item['program_id']]
+
+    assert program['apply_from_date'] == '2026-10-01'
+    assert program['apply_to_date'] == '2026-11-30'
+    assert program['status'] is not None
@@ -0,0 +1,141 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from policy_store import (
+    CHANGE_INSERT, CHANGE_UPDATE, STATUS_CLOSED, STATUS_OPEN, STATUS_UPCOMING,
+    ProgramStore, SQLiteProgramStore, copy_csv, make_program_id, open_store,
+)
+from program_dedup import dedupe_changes
+
+PG_DSN = os.getenv('TEST_POSTGRES_DSN', '')
+SINCE = '2000-01-01 00:00:00'
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        store = SQLiteProgramStore(str(tmp_path / 'policy.db'))
+    else:
+        if not PG_DSN:
+            pytest.skip('TEST_POSTGRES_DSN 미설정')
+        pytest.importorskip('psycopg2')
+        store = open_store(PG_DSN)
+        conn = store.pool.getconn()
+        try:
+            store._ensure_schema(conn)
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE programs, program_changes, program_lsh")
+            conn.commit()
+        finally:
+            store.pool.putconn(conn)
+    yield store
+    store.close()
+
+
+def _item(source, title, apply_from='', apply_to='', **extra):
+    url = extra.pop('url', f"https://example.com/{source}/{abs(hash(title))}")
+    return {'program_id': make_program_id(source, title, '중소벤처기업부', url), 'source': source,
+            'title': title, 'org': '중소벤처기업부', 'url': url,
+            'apply_from': apply_from, 'apply_to': apply_to, 'attachments': [], **extra}
+
+
+def _ymd(d):
+    return d.strftime('%Y%m%d')
+
+
+def test_incomplete_store_cannot_be_instantiated():
+    class PartialStore(ProgramStore):
+        def get_programs(self, program_ids):
+            return {}
+
+    with pytest.raises(TypeError, match='_apply'):
+        PartialStore()
+
+
+def test_copy_csv_keeps_empty_string_apart_from_null():
+    assert copy_csv([['a', '', None, 3, 'x"y\nz']]) == '"a","",,3,"x""y\nz"\n'
+
+
+def test_empty_string_and_null_round_trip(store):
+    item = _item('bizinfo', '스마트공장 구축 지원', summary='', contact=None)
+    store.upsert_many([item], 'r1')
+
+    program = store.get_programs([item['program_id']])[item['program_id']]
+
+    assert program['summary'] == ''
+    assert program['contact'] is None
+    # 같은 내용 재수집은 변경 없음 ('' ↔ NULL 차이로 update가 생기지 않음)
+    assert store.upsert_many([dict(item)], 'r2') == []
+
+
+def test_merge_and_changes_since(store):
+    a = _item('bizinfo', '수출바우처 1차 모집', apply_to='20301130')
+    b = _item('kstartup', '예비창업패키지 모집', apply_to='20301231')
+    first = store.upsert_many([a, b], 'r1')
+    second = store.upsert_many([dict(a, apply_to='20301215'), b], 'r2')
+
+    assert sorted(c['change_type'] for c in first) == [CHANGE_INSERT, CHANGE_INSERT]
+    assert [(c['program_id'], c['change_type'], c['changed_fields']) for c in second] == [
+        (a['program_id'], CHANGE_UPDATE, {'apply_to': ['20301130', '20301215']})
+    ]
+    logged = store.changes_since(SINCE)
+    assert [(c['run_id'], c['change_type']) for c in logged] == [
+        ('r1', CHANGE_INSERT), ('r1', CHANGE_INSERT), ('r2', CHANGE_UPDATE)
+    ]
+    assert store.get_programs([a['program_id']])[a['program_id']]['apply_to_date'] == '2030-12-15'
+
+
+def test_sweep_moves_status_by_date(store):
+    today = date.today()
+    ending = _item('bizinfo', '곧 마감 공고', _ymd(today - timedelta(days=3)), _ymd(today + timedelta(days=1)))
+    starting = _item('bizinfo', '곧 시작 공고', _ymd(today + timedelta(days=3)), _ymd(today + timedelta(days=30)))
+    store.upsert_many([ending, starting], 'r1')
+    before = store.get_programs([ending['program_id'], starting['program_id']])
+    assert (before[ending['program_id']]['status'], before[starting['program_id']]['status']) == (
+        STATUS_OPEN, STATUS_UPCOMING
+    )
+
+    assert store.sweep(today + timedelta(days=5)) == {'closed': 1, 'opened': 1}
+
+    after = store.get_programs([ending['program_id'], starting['program_id']])
+    assert after[ending['program_id']]['status'] == STATUS_CLOSED
+    assert after[starting['program_id']]['status'] == STATUS_OPEN
+
+
+def test_cross_source_duplicates_share_cluster(store):
+    due = _ymd(date.today() + timedelta(days=20))
+    a = _item('bizinfo', '2026년 스마트공장 보급확산사업 참여기업 모집', apply_to=due)
+    b = _item('kstartup', '2026년 스마트공장 보급확산사업 참여기업 모집(재공고)', apply_to=due)
+    other = _item('kstartup', '청년창업사관학교 입교생 모집', apply_to=due)
+    dedupe_changes(store, store.upsert_many([a], 'r1'))
+    dedupe_changes(store, store.upsert_many([b, other], 'r2'))
+
+    programs = store.get_programs([a['program_id'], b['program_id'], other['program_id']])
+
+    assert programs[a['program_id']]['cluster_id'] == a['program_id']
+    assert programs[b['program_id']]['cluster_id'] == a['program_id']
+    assert programs[other['program_id']]['cluster_id'] == other['program_id']
+    assert store.unclustered_ids() == []
+    assert sorted(p['program_id'] for p in store.open_programs()) == sorted([a['program_id'], other['program_id']])
+
+
+def test_retitled_root_releases_former_members(store):
+    due = _ymd(date.today() + timedelta(days=20))
+    a = _item('bizinfo', '2026년 스마트공장 보급확산사업 참여기업 모집', apply_to=due)
+    b = _item('kstartup', '2026년 스마트공장 보급확산사업 참여기업 모집(재공고)', apply_to=due)
+    dedupe_changes(store, store.upsert_many([a, b], 'r1'))
+    assert store.get_programs([b['program_id']])[b['program_id']]['cluster_id'] == a['program_id']
+
+    # 대표 공고 제목이 전혀 다른 사업으로 바뀜 (같은 URL → 같은 program_id)
+    retitled = dict(a, title='2026년 수출바우처 지원사업 공고')
+    stats = dedupe_changes(store, store.upsert_many([retitled], 'r2'), backfill=False)
+
+    assert stats['detached'] == 1
+    programs = store.get_programs([a['program_id'], b['program_id']])
+    assert programs[a['program_id']]['cluster_id'] == a['program_id']
+    assert programs[b['program_id']]['cluster_id'] is None
+    # 다음 실행에서 묶음 없는 공고로 다시 처리
+    dedupe_changes(store, [])
+    assert store.get_programs([b['program_id']])[b['program_id']]['cluster_id'] == b['program_id']
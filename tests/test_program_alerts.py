@@ -0,0 +1,76 @@
+import sqlite3
+
+from policy_store import CHANGE_UPDATE, SQLiteProgramStore
+from program_alerts import DEFAULT_RULES, EVENT_DEADLINE, evaluate
+from program_dedup import dedupe_changes
+from program_sources import BUILTIN, normalize_batch
+
+KSTARTUP_RAW = {
+    'PBLANC_TITLE_NM': '2026년 창업도약패키지 참여기업 모집',
+    'PBLANC_INST_NM': '창업진흥원',
+    'PBLANC_URL': 'https://www.k-startup.go.kr/web/contents/bizpbanc-ongoing.do?pbancSn=170001',
+    'RCEPT_BGNDE': '20261001',
+    'RCEPT_ENDDE': '20261110',
+}
+
+
+def _collect(store, raws, run_id):
+    changes = store.upsert_many(normalize_batch(BUILTIN['kstartup'], raws), run_id)
+    dedupe_changes(store, changes)
+    return changes
+
+
+def _program_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM programs").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_deadline_extension_is_update_and_alerts(tmp_path):
+    path = str(tmp_path / 'policy.db')
+    store = SQLiteProgramStore(path)
+    _collect(store, [KSTARTUP_RAW], 'r1')
+
+    changes = _collect(store, [dict(KSTARTUP_RAW, RCEPT_ENDDE='20261130')], 'r2')
+
+    assert [c['change_type'] for c in changes] == [CHANGE_UPDATE]
+    assert changes[0]['changed_fields']['apply_to'] == ['20261110', '20261130']
+    alerts = evaluate(store, changes, DEFAULT_RULES)[None]
+    assert [a['event'] for a in alerts] == [EVENT_DEADLINE]
+    assert alerts[0]['old_apply_to'] == '20261110'
+    assert alerts[0]['program']['apply_to_date'] == '2026-11-30'
+    assert _program_count(path) == 1
+
+
+def test_deadline_extension_without_url_keys_on_title_and_org(tmp_path):
+    store = SQLiteProgramStore(str(tmp_path / 'policy.db'))
+    raw = {k: v for k, v in KSTARTUP_RAW.items() if k != 'PBLANC_URL'}
+    _collect(store, [raw], 'r1')
+
+    changes = _collect(store, [dict(raw, RCEPT_ENDDE='20261130')], 'r2')
+
+    assert [c['change_type'] for c in changes] == [CHANGE_UPDATE]
+    assert [a['event'] for a in evaluate(store, changes, DEFAULT_RULES)[None]] == [EVENT_DEADLINE]
+
+
+def test_old_deadline_keyed_rows_are_rekeyed_once(tmp_path):
+    path = str(tmp_path / 'policy.db')
+    store = SQLiteProgramStore(path)
+    items = normalize_batch(BUILTIN['kstartup'], [KSTARTUP_RAW, dict(KSTARTUP_RAW, RCEPT_ENDDE='20261130')])
+    new_id = items[0]['program_id']
+    # 예전 키(제목|기관|마감일)로 저장된 같은 공고 2건
+    store.upsert_many([dict(items[0], program_id='old-1110')], 'r1')
+    store.upsert_many([dict(items[1], program_id='old-1130')], 'r2')
+    conn = store.connect()
+    conn.execute("UPDATE programs SET updated_at = '2000-01-01 00:00:00' WHERE program_id = 'old-1110'")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    programs = SQLiteProgramStore(path).get_programs([new_id, 'old-1110', 'old-1130'])
+
+    assert list(programs) == [new_id]
+    assert programs[new_id]['apply_to'] == '20261130'
+    assert _program_count(path) == 1
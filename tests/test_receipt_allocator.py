@@ -0,0 +1,101 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from receipt_allocator import FALLBACK_BASE, ReceiptAllocator, ReceiptUnavailableError, is_valid_receipt_no
+
+CLOCK = lambda: datetime(2026, 10, 19, 0, 0)
+
+
+class SharedCounter:
+    """GAS reserve_receipt_block 대역 (앱 간 공용 카운터)"""
+
+    def __init__(self):
+        self.next = {}
+        self.down = False
+        self._lock = threading.Lock()
+
+    def __call__(self, day, count):
+        if self.down:
+            return None
+        with self._lock:
+            start = self.next.get(day, 1)
+            self.next[day] = start + count
+            return start, start + count
+
+
+def _issue(allocator, n):
+    return [allocator.next() for _ in range(n)]
+
+
+def test_apps_with_separate_state_dbs_share_remote_counter(tmp_path):
+    remote = SharedCounter()
+    landing = ReceiptAllocator(str(tmp_path / 'landing.db'), block_size=5, clock=CLOCK, remote=remote)
+    survey = ReceiptAllocator(str(tmp_path / 'survey.db'), block_size=5, clock=CLOCK, remote=remote)
+
+    issued = _issue(landing, 7) + _issue(survey, 7) + _issue(landing, 7)
+
+    assert len(set(issued)) == len(issued)
+    assert all(is_valid_receipt_no(r) and r.startswith('YP261019') for r in issued)
+
+
+def test_wiped_state_db_does_not_restart_sequence(tmp_path):
+    remote = SharedCounter()
+    before = _issue(ReceiptAllocator(str(tmp_path / 'a.db'), block_size=3, clock=CLOCK, remote=remote), 4)
+    # 재배포로 디스크 초기화 → 새 상태 파일
+    after = _issue(ReceiptAllocator(str(tmp_path / 'b.db'), block_size=3, clock=CLOCK, remote=remote), 4)
+
+    assert not set(before) & set(after)
+
+
+def test_fallback_uses_per_instance_range(tmp_path):
+    remote = SharedCounter()
+    online = _issue(ReceiptAllocator(str(tmp_path / 'x.db'), block_size=3, clock=CLOCK, remote=remote), 3)
+    remote.down = True
+    node1 = _issue(ReceiptAllocator(str(tmp_path / 'n1.db'), block_size=3, clock=CLOCK, remote=remote, node_id=1), 5)
+    node2 = _issue(ReceiptAllocator(str(tmp_path / 'n2.db'), block_size=3, clock=CLOCK, remote=remote, node_id=2), 5)
+
+    assert node1[0] == f"YP261019{FALLBACK_BASE + 10_001}"
+    assert node2[0] == f"YP261019{FALLBACK_BASE + 20_001}"
+    assert len(set(online + node1 + node2)) == 13
+
+
+def test_fallback_block_retries_remote_when_exhausted(tmp_path):
+    remote = SharedCounter()
+    remote.down = True
+    allocator = ReceiptAllocator(str(tmp_path / 's.db'), block_size=2, clock=CLOCK, remote=remote, node_id=0)
+    fallback = _issue(allocator, 2)
+    remote.down = False
+
+    assert all(int(r[8:]) >= FALLBACK_BASE for r in fallback)
+    assert allocator.next() == 'YP261019000001'
+
+
+def test_node_id_must_be_single_digit(tmp_path):
+    with pytest.raises(ValueError):
+        ReceiptAllocator(str(tmp_path / 's.db'), node_id=10)
+
+
+def test_no_local_fallback_without_explicit_node_id(tmp_path):
+    remote = SharedCounter()
+    remote.down = True
+    allocator = ReceiptAllocator(str(tmp_path / 's.db'), clock=CLOCK, remote=remote)
+
+    with pytest.raises(ReceiptUnavailableError):
+        allocator.next()
+
+
+def test_wiped_fallback_counter_skips_earlier_numbers(tmp_path):
+    remote = SharedCounter()
+    remote.down = True
+    clock = [datetime(2026, 10, 19, 9, 0)]
+    morning = _issue(ReceiptAllocator(str(tmp_path / 'a.db'), block_size=5, clock=lambda: clock[0],
+                                      remote=remote, node_id=3), 20)
+    clock[0] = datetime(2026, 10, 19, 9, 30)
+    # 재배포로 상태 파일 초기화
+    later = _issue(ReceiptAllocator(str(tmp_path / 'b.db'), block_size=5, clock=lambda: clock[0],
+                                    remote=remote, node_id=3), 20)
+
+    assert not set(morning) & set(later)
+    assert later[0] == f"YP261019{FALLBACK_BASE + 30_000 + 1 + 34200 * 9999 // 86400}"
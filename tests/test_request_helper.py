@@ -0,0 +1,56 @@
+import pytest
+import requests
+
+import request_helper
+from request_helper import MIN_SAMPLES, MIN_TIMEOUT, get_breaker, json_get, json_post
+
+
+class _Response:
+    status_code = 200
+    text = '{}'
+
+    def json(self):
+        return {'status': 'success'}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    calls = []
+
+    def fake_request(method, url, timeout=None, **kwargs):
+        calls.append((method, timeout))
+        return _Response()
+    monkeypatch.setattr(requests, 'request', fake_request)
+    monkeypatch.setattr(request_helper, '_breakers', {})
+    return calls
+
+
+def _fast_samples(url, action):
+    breaker = get_breaker(url)
+    for _ in range(MIN_SAMPLES):
+        breaker.record_success(action, 0.1)
+    return breaker
+
+
+def test_writes_keep_configured_timeout_after_fast_samples(sent):
+    _fast_samples('http://gas/write', 'save')
+
+    json_post('http://gas/write', {'action': 'save'}, timeout=30, retries=0)
+    json_get('http://gas/write', params={'action': 'save'}, timeout=30, retries=0)
+
+    assert sent == [('POST', 30), ('GET', MIN_TIMEOUT)]
+
+
+def test_read_timeouts_feed_latency_samples(monkeypatch):
+    monkeypatch.setattr(request_helper, '_breakers', {})
+    breaker = _fast_samples('http://gas/read', 'view')
+
+    def slow(method, url, timeout=None, **kwargs):
+        raise requests.ReadTimeout()
+    monkeypatch.setattr(requests, 'request', slow)
+    monkeypatch.setattr(request_helper.time, 'monotonic', iter(range(0, 1000, 8)).__next__)
+
+    json_get('http://gas/read', params={'action': 'view'}, timeout=30, retries=0, use_last_good=False)
+
+    assert breaker.snapshot()['latency']['view']['samples'] == MIN_SAMPLES + 1
+    assert breaker.timeout_for('view', 30) > MIN_TIMEOUT
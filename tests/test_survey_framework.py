@@ -0,0 +1,18 @@
+from survey_framework import Field, FormSchema
+
+
+def test_required_multiselect_accepts_list_values():
+    schema = FormSchema([
+        Field('interest', widget='multiselect', required='관심사항을 선택해주세요.', blank_values=('선택해주세요',)),
+    ])
+
+    assert schema.validate({'interest': ['정책자금']}) is None
+    assert schema.validate({'interest': []}) == ('warning', '관심사항을 선택해주세요.')
+    assert schema.validate({'interest': ['선택해주세요']}) == ('warning', '관심사항을 선택해주세요.')
+
+
+def test_required_scalar_rejects_blank_values():
+    schema = FormSchema([Field('decision_status', required='선택', blank_values=('선택해주세요',))])
+
+    assert schema.validate({'decision_status': '선택해주세요'}) == ('warning', '선택')
+    assert schema.validate({'decision_status': '진행'}) is None
@@ -0,0 +1,31 @@
+import streamlit as st
+
+from access_token import sign_access_token, verify_access_token
+from survey_session import bootstrap_session
+
+
+def test_key_problems_are_flagged_for_remote_fallback():
+    token = sign_access_token('YP261019000001', 'u-1', secret='old-secret')
+
+    assert verify_access_token(token, secret='new-secret')['key_error']
+    assert verify_access_token(token, secret='')['key_error']
+    assert verify_access_token(token, secret='old-secret')['ok']
+    expired = sign_access_token('YP261019000001', secret='s', ttl_minutes=1, now=0)
+    assert 'key_error' not in verify_access_token(expired, secret='s')
+
+
+def test_failed_resolution_is_not_cached():
+    calls = []
+
+    def resolver(params):
+        calls.append(params)
+        return {'mode': 'invalid' if len(calls) == 1 else 'token'}
+
+    def run():
+        return bootstrap_session('test_app', ('t',), resolver, should_cache=lambda a: a['mode'] != 'invalid')
+
+    st.session_state.clear()
+    assert run()['mode'] == 'invalid'
+    assert run()['mode'] == 'token'
+    assert run()['mode'] == 'token'
+    assert len(calls) == 2
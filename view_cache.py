@@ -0,0 +1,141 @@
+"""
+유아플랜 통합 조회 캐시
+- 접수번호별 통합 조회 결과를 크기 제한 + TTL로 보관 (프로세스 공유)
+- 오늘 할 일/최근 조회 고객을 백그라운드에서 미리 불러오는 프리페처
+  (일괄 로더가 NotImplementedError(일괄 액션 미지원)를 내면 단건 로더로 대체, 이후 단건만 사용)
+- 적중률 통계 제공 (대시보드 표시용)
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+class ViewCache:
+    """크기 제한(LRU) + TTL 캐시. 여러 세션/스레드에서 동시에 사용"""
+
+    def __init__(self, max_entries: int = 200, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def is_fresh(self, key: str) -> bool:
+        """통계에 반영하지 않는 존재 여부 확인 (프리페치 중복 방지용)"""
+        with self._lock:
+            entry = self._items.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def put(self, key: str, value: Dict[str, Any], prefetched: bool = False) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            if prefetched:
+                self.prefetched += 1
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "prefetched": self.prefetched,
+                "evictions": self.evictions
+            }
+
+
+class Prefetcher:
+    """다음에 열어볼 가능성이 높은 접수번호를 백그라운드에서 캐시에 적재"""
+
+    def __init__(self, cache: ViewCache, loader: Callable[[str], Dict[str, Any]],
+                 is_cacheable: Callable[[Dict[str, Any]], bool], max_workers: int = 3,
+                 bulk_loader: Optional[Callable[[List[str]], Dict[str, Dict[str, Any]]]] = None):
+        self.cache = cache
+        self.loader = loader
+        self.bulk_loader = bulk_loader
+        self.bulk_supported = True
+        self.is_cacheable = is_cacheable
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._inflight: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, keys: Iterable[str]) -> int:
+        """캐시에 없고 진행 중이 아닌 키만 예약. 예약 건수 반환
+
+        bulk_loader가 있고 2건 이상이면 한 번의 일괄 요청으로 적재
+        """
+        pending = []
+        for key in dict.fromkeys(keys):
+            if not key or self.cache.is_fresh(key):
+                continue
+            with self._lock:
+                if key in self._inflight:
+                    continue
+                self._inflight.add(key)
+            pending.append(key)
+
+        if self.bulk_loader is not None and self.bulk_supported and len(pending) > 1:
+            self._executor.submit(self._load_bulk, pending)
+        else:
+            for key in pending:
+                self._executor.submit(self._load, key)
+        return len(pending)
+
+    def _load_bulk(self, keys: List[str]) -> None:
+        try:
+            for key, value in self.bulk_loader(keys).items():
+                if self.is_cacheable(value):
+                    self.cache.put(key, value, prefetched=True)
+        except NotImplementedError:
+            self.bulk_supported = False
+            for key in keys:
+                self._load(key)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._inflight.difference_update(keys)
+
+    def _load(self, key: str) -> None:
+        try:
+            value = self.loader(key)
+            if self.is_cacheable(value):
+                self.cache.put(key, value, prefetched=True)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._inflight.discard(key)